@@ -0,0 +1,248 @@
+import asyncio
+import db
+import time
+from datetime import datetime
+
+# ============================================================
+# ALERT DISPATCHER
+# Deals go out once per (channel, lot_id, score band) through
+# pluggable sinks (Discord / SMS / stdout), batched and rate
+# limited. A channel is dispatcher name + sink ("bidder/discord"),
+# so one sender's alerts never suppress another's and profit bands
+# never collide with edge-score bands.
+# ============================================================
+
+DB_NAME = "hibid_lots.db"
+
+DISCORD_MAX_EMBEDS = 10   # Discord rejects messages with more than 10 embeds
+
+
+# ------------------------------
+# Ledger ("already alerted")
+# ------------------------------
+def score_band(score, band_size):
+    return int((score or 0) // band_size)
+
+
+class AlertLedger:
+    def __init__(self, db_path=DB_NAME):
+        self.conn = db.connect(db_path)
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(alert_ledger)")}
+        if cols and "channel" not in cols:
+            # Ledger from before channels: keep its rows as channel '' (sent everywhere)
+            self.conn.execute("ALTER TABLE alert_ledger RENAME TO alert_ledger_old")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS alert_ledger (
+                channel TEXT,
+                lot_id TEXT,
+                score_band INTEGER,
+                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (channel, lot_id, score_band)
+            )
+        """)
+        if cols and "channel" not in cols:
+            self.conn.execute("""
+                INSERT OR IGNORE INTO alert_ledger (channel, lot_id, score_band, sent_at)
+                SELECT '', lot_id, score_band, sent_at FROM alert_ledger_old
+            """)
+            self.conn.execute("DROP TABLE alert_ledger_old")
+        self.conn.commit()
+
+    def unsent(self, channel, deals):
+        if not deals:
+            return []
+        seen = set()
+        keys = [(d["lot_id"], d["band"]) for d in deals]
+        # Look them all up in one query rather than one per deal
+        for i in range(0, len(keys), 400):
+            chunk = keys[i:i + 400]
+            where = " OR ".join(["(lot_id=? AND score_band=?)"] * len(chunk))
+            params = [channel] + [v for key in chunk for v in key]
+            seen.update(self.conn.execute(
+                f"SELECT lot_id, score_band FROM alert_ledger WHERE channel IN (?, '') AND ({where})", params
+            ).fetchall())
+        return [d for d in deals if (d["lot_id"], d["band"]) not in seen]
+
+    def mark_sent(self, channel, deals):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO alert_ledger (channel, lot_id, score_band) VALUES (?, ?, ?)",
+            [(channel, d["lot_id"], d["band"]) for d in deals]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------------------
+# Rate Limiting
+# ------------------------------
+class RateLimiter:
+    """
+    At most one send per `interval` seconds for a sink.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = time.monotonic() + self.interval
+
+
+# ------------------------------
+# Sinks
+# send(deals, delivered) calls delivered(batch) as soon as each batch is
+# out, so a failure part way through only retries what didn't go out.
+# ------------------------------
+class StdoutSink:
+    name = "stdout"
+
+    async def send(self, deals, delivered):
+        for d in deals:
+            print(f"🔥 HIGH EDGE DEAL: {d['lot_id']} | {d['title']} | {d['label']}")
+        delivered(deals)
+
+
+class DiscordSink:
+    name = "discord"
+
+    def __init__(self, webhook_url, client, interval=2.0):
+        self.webhook_url = webhook_url
+        self.client = client
+        self.limiter = RateLimiter(interval)
+
+    def build_embed(self, d):
+        embed = {
+            "title": f"💰 {d['label']}",
+            "description": f"**{d['title']}**\n[👉 Click to Bid]({d.get('url', '')})",
+            "color": 5763719, # Green Color
+            "fields": [
+                {"name": "Est. Profit", "value": f"${d.get('profit') or 0:.2f}", "inline": True},
+                {"name": "Lot ID", "value": str(d["lot_id"]), "inline": True}
+            ],
+            "footer": {"text": f"Auction Bot • {datetime.now().strftime('%I:%M %p')}"}
+        }
+        if d.get("image_url"):
+            embed["thumbnail"] = {"url": d["image_url"]}
+        return embed
+
+    async def send(self, deals, delivered):
+        if not self.webhook_url or "YOUR_WEBHOOK" in self.webhook_url:
+            # No webhook configured: nothing to retry later either
+            delivered(deals)
+            return
+
+        for i in range(0, len(deals), DISCORD_MAX_EMBEDS):
+            batch = deals[i:i + DISCORD_MAX_EMBEDS]
+            data = {
+                "content": f"🚨 **{len(batch)} New Deal{'s' if len(batch) > 1 else ''} Found!**",
+                "embeds": [self.build_embed(d) for d in batch]
+            }
+
+            await self.limiter.wait()
+            resp = await self.client.post(self.webhook_url, json=data)
+
+            if resp.status_code == 429:
+                # Discord tells us how long to back off
+                retry = float(resp.json().get("retry_after", 1))
+                await asyncio.sleep(retry)
+                resp = await self.client.post(self.webhook_url, json=data)
+
+            if not resp.is_success:
+                # Still throttled (or any other non-2xx) after the retry
+                raise RuntimeError(f"Discord webhook returned {resp.status_code}")
+            delivered(batch)
+
+
+class SmsSink:
+    name = "sms"
+
+    def __init__(self, account_sid, auth_token, from_number, to_number, interval=1.0):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.to_number = to_number
+        self.limiter = RateLimiter(interval)
+        self._client = None
+
+    def client(self):
+        # One Twilio client for the life of the sink
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    async def send(self, deals, delivered):
+        for d in deals:
+            body = f"🔥 High Edge Deal\nLot: {d['lot_id']}\n{d['label']}\n{d['title'][:80]}"
+            await self.limiter.wait()
+            # Twilio's client is blocking, keep it off the event loop
+            await asyncio.to_thread(
+                self.client().messages.create,
+                body=body, from_=self.from_number, to=self.to_number
+            )
+            delivered([d])
+
+
+# ------------------------------
+# Dispatcher
+# ------------------------------
+class AlertDispatcher:
+    def __init__(self, sinks, db_path=DB_NAME, band_size=10, name="alerts"):
+        self.sinks = sinks
+        self.band_size = band_size
+        self.name = name
+        self.ledger = AlertLedger(db_path)
+
+    def channel(self, sink):
+        return f"{self.name}/{sink.name}"
+
+    def make_deal(self, lot_id, title, score, label, **extra):
+        return dict(
+            lot_id=lot_id,
+            title=title or "",
+            score=score,
+            label=label,
+            band=score_band(score, self.band_size),
+            **extra
+        )
+
+    async def dispatch(self, deals):
+        """
+        Sends every deal through each sink that hasn't had it yet, all sinks
+        at once. Returns the number of deals newly sent by at least one sink.
+        """
+        pending = [(sink, self.ledger.unsent(self.channel(sink), deals)) for sink in self.sinks]
+        pending = [(sink, fresh) for sink, fresh in pending if fresh]
+        if not pending:
+            return 0
+
+        sent = set()
+
+        def delivered(sink):
+            channel = self.channel(sink)
+
+            def mark(batch):
+                self.ledger.mark_sent(channel, batch)
+                sent.update(d["lot_id"] for d in batch)
+            return mark
+
+        results = await asyncio.gather(
+            *(sink.send(fresh, delivered(sink)) for sink, fresh in pending),
+            return_exceptions=True
+        )
+
+        for (sink, fresh), result in zip(pending, results):
+            if isinstance(result, Exception):
+                # Only this sink's undelivered deals retry next cycle
+                print(f"[!] {sink.name} alert failed: {result}")
+        return len(sent)
+
+    def close(self):
+        self.ledger.close()
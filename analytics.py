@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import db
+import pricing
+import archive_history
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import duckdb  # Optional: exact medians in SQL. Without it pyarrow's group_by is used
+except ImportError:
+    duckdb = None
+
+# ============================================================
+# SOLD-HISTORY ANALYTICS MIRROR
+#   python analytics.py sync [--rebuild]
+#   python analytics.py stats
+# Sold lots copied into Parquet (analytics/sold/) in increments:
+# new lots_history rows are appended as a part file by rowid
+# watermark, sold rows still in the hot lots table are rewritten
+# as one small overlay. Category / bucket / location aggregates
+# run on the columns there instead of scanning SQLite rows.
+# SQLite stays the source of truth; delete the folder to drop it.
+# Nothing uses the mirror until the first `sync` creates it.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+MIRROR_DIR = os.path.join("analytics", "sold")
+MANIFEST = "manifest.json"
+HOT_FILE = "hot.parquet"
+
+CHUNK_SIZE = 250_000
+MAX_PARTS = 16            # More part files than this get compacted into one
+
+COLUMNS = ["lot_id", "final_price", "bid_count", "predicted_category", "location", "last_seen"]
+SCHEMA = None if pa is None else pa.schema([
+    ("lot_id", pa.string()),
+    ("final_price", pa.float64()),
+    ("bid_count", pa.float64()),
+    ("predicted_category", pa.string()),
+    ("location", pa.string()),
+    ("last_seen", pa.string()),
+])
+
+
+def enabled(mirror=MIRROR_DIR):
+    return pa is not None and os.path.exists(os.path.join(mirror, MANIFEST))
+
+
+# ------------------------------
+# Manifest
+# ------------------------------
+def _read_manifest(mirror):
+    path = os.path.join(mirror, MANIFEST)
+    if not os.path.exists(path):
+        return {"history_rowid": 0, "history_rows": 0, "parts": [], "shadowed": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(mirror, manifest):
+    path = os.path.join(mirror, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+# ------------------------------
+# Reading From SQLite
+# ------------------------------
+def _select_list(conn, table):
+    have = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    return ", ".join(c if c in have else f"NULL AS {c}" for c in COLUMNS)
+
+
+def _to_table(rows):
+    cols = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+    return pa.table([pa.array(list(col), type=SCHEMA.field(i).type) for i, col in enumerate(cols)],
+                    schema=SCHEMA)
+
+
+def _history_chunks(conn, after_rowid):
+    """(table, last_rowid) chunks of sold lots_history rows past the watermark."""
+    select = _select_list(conn, archive_history.HISTORY_TABLE)
+    while True:
+        rows = conn.execute(f"""
+            SELECT rowid, {select} FROM {archive_history.HISTORY_TABLE}
+            WHERE rowid > ? AND status='sold_history'
+            ORDER BY rowid LIMIT ?
+        """, (after_rowid, CHUNK_SIZE)).fetchall()
+        if not rows:
+            return
+        after_rowid = rows[-1][0]
+        yield _to_table([r[1:] for r in rows]), after_rowid
+        if len(rows) < CHUNK_SIZE:
+            return
+
+
+def _history_ids(mirror, manifest):
+    if not manifest["parts"]:
+        return pa.array([], type=pa.string())
+    return pa.concat_arrays([
+        pq.read_table(os.path.join(mirror, p), columns=["lot_id"])["lot_id"].combine_chunks()
+        for p in manifest["parts"]
+    ])
+
+
+# ------------------------------
+# Sync
+# ------------------------------
+def compact(mirror=MIRROR_DIR, manifest=None):
+    """All history parts into one, keeping the newest copy of each lot."""
+    manifest = manifest or _read_manifest(mirror)
+    if len(manifest["parts"]) <= 1:
+        return manifest
+
+    table = pa.concat_tables([pq.read_table(os.path.join(mirror, p), schema=SCHEMA) for p in manifest["parts"]])
+    # Parts are in rowid order, so the last occurrence is the newest
+    ids = table["lot_id"].to_numpy(zero_copy_only=False)[::-1]
+    _, first = np.unique(ids, return_index=True)
+    keep = np.sort(len(ids) - 1 - first)
+    table = table.take(pa.array(keep))
+
+    name = f"history-{manifest['history_rowid']}.parquet"
+    pq.write_table(table, os.path.join(mirror, name + ".tmp"))
+    os.replace(os.path.join(mirror, name + ".tmp"), os.path.join(mirror, name))
+    for p in manifest["parts"]:
+        if p != name:
+            os.remove(os.path.join(mirror, p))
+
+    manifest.update(parts=[name], history_rows=table.num_rows)
+    return manifest
+
+
+def sync(path=DB, mirror=MIRROR_DIR, rebuild=False):
+    """Brings the mirror up to date. Returns the number of history rows appended."""
+    if pa is None:
+        raise RuntimeError("analytics needs pyarrow (pip install pyarrow)")
+
+    start = time.perf_counter()
+    if rebuild:
+        shutil.rmtree(mirror, ignore_errors=True)
+    os.makedirs(mirror, exist_ok=True)
+    manifest = _read_manifest(mirror)
+
+    conn = db.connect(path, readonly=True)
+    try:
+        appended = 0
+        has_history = archive_history.all_lots(conn) != "lots"
+
+        if has_history:
+            known = None
+            for table, last_rowid in _history_chunks(conn, manifest["history_rowid"]):
+                # A lot archived again (DELETE + INSERT) shows up with a new rowid
+                if known is None:
+                    known = _history_ids(mirror, manifest)
+                dupes = len(known) > 0 and pc.any(pc.is_in(table["lot_id"], value_set=known)).as_py()
+
+                name = f"history-{last_rowid}.parquet"
+                pq.write_table(table, os.path.join(mirror, name))
+                manifest["parts"].append(name)
+                manifest["history_rowid"] = last_rowid
+                manifest["history_rows"] += table.num_rows
+                appended += table.num_rows
+
+                if dupes or len(manifest["parts"]) > MAX_PARTS:
+                    manifest = compact(mirror, manifest)
+                    known = None
+
+        # Sold rows not archived yet: few, so simply rewritten every sync
+        hot = _to_table(conn.execute(f"""
+            SELECT {_select_list(conn, 'lots')} FROM lots WHERE status='sold_history'
+        """).fetchall())
+    finally:
+        conn.close()
+
+    pq.write_table(hot, os.path.join(mirror, HOT_FILE + ".tmp"))
+    os.replace(os.path.join(mirror, HOT_FILE + ".tmp"), os.path.join(mirror, HOT_FILE))
+
+    # Same rule as lots_all: a lot in both places counts once, from lots
+    shadowed = []
+    if hot.num_rows and manifest["parts"]:
+        ids = _history_ids(mirror, manifest)
+        shadowed = pc.filter(ids, pc.is_in(ids, value_set=hot["lot_id"])).to_pylist()
+    manifest["shadowed"] = shadowed
+    _write_manifest(mirror, manifest)
+
+    print(f"Analytics mirror: +{appended:,} history rows ({manifest['history_rows']:,} total, "
+          f"{len(manifest['parts'])} parts), {hot.num_rows:,} hot sold rows "
+          f"in {time.perf_counter() - start:.2f}s")
+    return appended
+
+
+# ------------------------------
+# Loading
+# ------------------------------
+_cache = {"key": None, "table": None}
+
+
+def load(mirror=MIRROR_DIR):
+    """Every mirrored sold lot as one Arrow table (cached until the next sync)."""
+    manifest_path = os.path.join(mirror, MANIFEST)
+    key = (mirror, os.path.getmtime(manifest_path))
+    if _cache["key"] == key:
+        return _cache["table"]
+
+    manifest = _read_manifest(mirror)
+    parts = [pq.read_table(os.path.join(mirror, p), schema=SCHEMA) for p in manifest["parts"]]
+    history = pa.concat_tables(parts) if parts else _to_table([])
+    if manifest["shadowed"]:
+        history = history.filter(pc.invert(pc.is_in(history["lot_id"], value_set=pa.array(manifest["shadowed"]))))
+
+    table = pa.concat_tables([history, pq.read_table(os.path.join(mirror, HOT_FILE), schema=SCHEMA)])
+    _cache.update(key=key, table=table)
+    return table
+
+
+def _priced(mirror):
+    table = load(mirror)
+    return table.filter(pc.is_valid(table["final_price"]))
+
+
+DUCKDB_AGGS = {
+    "median": "median(final_price)", "mean": "avg(final_price)",
+    "count": "count(final_price)", "bid_mean": "avg(bid_count)",
+}
+ARROW_AGGS = {
+    # tdigest-based; within a fraction of a percent of the exact median
+    "median": ("final_price", "approximate_median"), "mean": ("final_price", "mean"),
+    "count": ("final_price", "count"), "bid_mean": ("bid_count", "mean"),
+}
+
+
+def _aggregate(table, key, aggs, names):
+    """GROUP BY key -> DataFrame[key, *names]. DuckDB (exact median) when installed."""
+    if duckdb is not None:
+        con = duckdb.connect()
+        con.register("sold", table)
+        select = ", ".join(f"{DUCKDB_AGGS[a]} AS {n}" for a, n in zip(aggs, names))
+        return con.execute(f"SELECT {key}, {select} FROM sold GROUP BY {key}").df()
+
+    specs = [ARROW_AGGS[a] for a in aggs]
+    out = table.group_by(key).aggregate(specs).to_pandas()
+    out = out.rename(columns={f"{col}_{fn}": n for (col, fn), n in zip(specs, names)})
+    return out[[key] + names]
+
+
+# ------------------------------
+# Aggregates
+# ------------------------------
+def category_stats(mirror=MIRROR_DIR):
+    """Same columns compute_category_stats writes to category_stats."""
+    table = _priced(mirror)
+    table = table.filter(pc.is_valid(table["predicted_category"]))
+    df = _aggregate(table, "predicted_category", ["median", "mean", "bid_mean", "count"],
+                    ["median_price", "avg_price", "avg_bid_count", "total_sold"])
+    return df.rename(columns={"predicted_category": "category"}).fillna({"avg_bid_count": 0})
+
+
+def bucket_stats(mirror=MIRROR_DIR):
+    """Same columns compute_bucket_stats writes to bucket_stats."""
+    table = _priced(mirror)
+    idx = pricing.bucket_index(table["final_price"].to_numpy())
+    table = table.append_column("bucket", pa.array(idx.astype("int8")))
+    df = _aggregate(table, "bucket", ["median", "count"], ["median_price", "total_sold"])
+    df["bucket"] = np.take(pricing.BUCKET_LABELS, df["bucket"].astype(int))
+    return df.sort_values("bucket").reset_index(drop=True)
+
+
+def location_stats(mirror=MIRROR_DIR):
+    table = _priced(mirror)
+    table = table.filter(pc.is_valid(table["location"]))
+    df = _aggregate(table, "location", ["median", "mean", "count"], ["median_price", "avg_price", "total_sold"])
+    return df.sort_values("total_sold", ascending=False).reset_index(drop=True)
+
+
+def sold_prices(mirror=MIRROR_DIR):
+    return pd.Series(_priced(mirror)["final_price"].to_numpy(), name="final_price")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sold-history analytics mirror")
+    parser.add_argument("command", choices=["sync", "stats"], nargs="?", default="sync")
+    parser.add_argument("--rebuild", action="store_true", help="drop the mirror and copy everything again")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        sync(rebuild=args.rebuild)
+    else:
+        for name, fn in [("Categories", category_stats), ("Buckets", bucket_stats), ("Locations", location_stats)]:
+            start = time.perf_counter()
+            df = fn()
+            print(f"\n{name} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+            print(df.to_string(index=False))
@@ -0,0 +1,124 @@
+import time
+import db
+import title_search
+import lot_events
+
+# ============================================================
+# HOT / COLD SPLIT
+# `lots` stays small: only what the pipeline still works on.
+# Sold / archived rows are moved in batches to `lots_history`.
+# `lots_all` (view) = both, for anything that reads history.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+HISTORY_TABLE = "lots_history"
+ALL_VIEW = "lots_all"
+
+ARCHIVE_STATUSES = ("sold_history", "archived")
+BATCH_SIZE = 5000
+
+
+def _columns(conn, table):
+    return [(r[1], r[2]) for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def setup(conn):
+    """
+    Creates/extends lots_history to match lots (lots grows columns over time
+    via ALTER TABLE) and rebuilds the lots_all view over both.
+    """
+    hot = _columns(conn, "lots")
+    if not hot:
+        return
+
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (lot_id TEXT PRIMARY KEY)")
+
+    have = {name for name, _ in _columns(conn, HISTORY_TABLE)}
+    for name, col_type in hot:
+        if name not in have:
+            conn.execute(f"ALTER TABLE {HISTORY_TABLE} ADD COLUMN {name} {col_type}")
+
+    cols = ", ".join(name for name, _ in hot)
+    conn.execute(f"DROP VIEW IF EXISTS {ALL_VIEW}")
+    conn.execute(f"""
+        CREATE VIEW {ALL_VIEW} AS
+        SELECT {cols} FROM lots
+        UNION ALL
+        SELECT {cols} FROM {HISTORY_TABLE}
+        WHERE lot_id NOT IN (SELECT lot_id FROM lots)
+    """)
+
+    # History reads filter on status/category; hot reads on status + time left
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_history_status ON {HISTORY_TABLE}(status)")
+    if "minutes_left" in {name for name, _ in hot}:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_status_minutes ON lots(status, minutes_left)")
+
+    # Title index has to watch lots_history too, now that it exists
+    title_search.setup(conn)
+
+
+def all_lots(conn):
+    """
+    Table name for queries that need history: the view once it exists,
+    plain `lots` on a DB that has never been archived.
+    """
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='view' AND name=?", (ALL_VIEW,)
+    ).fetchone()
+    return ALL_VIEW if row else "lots"
+
+
+def archive_batch(conn, batch_size=BATCH_SIZE):
+    """
+    Moves up to batch_size archivable rows from lots to lots_history in one
+    transaction. Returns the number moved.
+    """
+    cols = ", ".join(name for name, _ in _columns(conn, "lots"))
+    marks = ", ".join("?" * len(ARCHIVE_STATUSES))
+
+    rows = conn.execute(
+        f"SELECT lot_id, status FROM lots WHERE status IN ({marks}) LIMIT ?",
+        (*ARCHIVE_STATUSES, batch_size)
+    ).fetchall()
+    ids = [lot_id for lot_id, _ in rows]
+    if not ids:
+        return 0
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_ids (lot_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM archive_ids")
+    conn.executemany("INSERT INTO archive_ids VALUES (?)", [(i,) for i in ids])
+
+    # Plain DELETE + INSERT rather than INSERT OR REPLACE: REPLACE doesn't fire
+    # delete triggers, which would leave stale rows in the title index
+    conn.execute(f"DELETE FROM {HISTORY_TABLE} WHERE lot_id IN (SELECT lot_id FROM archive_ids)")
+    conn.execute(f"""
+        INSERT INTO {HISTORY_TABLE} ({cols})
+        SELECT {cols} FROM lots WHERE lot_id IN (SELECT lot_id FROM archive_ids)
+    """)
+    conn.execute("DELETE FROM lots WHERE lot_id IN (SELECT lot_id FROM archive_ids)")
+
+    # Gone from `lots`: dashboards holding these rows drop them
+    lot_events.setup(conn)
+    lot_events.publish_many(conn, [(lot_id, {"status": status}) for lot_id, status in rows])
+    return len(ids)
+
+
+def run_archive(batch_size=BATCH_SIZE):
+    start = time.perf_counter()
+    db.run_write(setup, path=DB)
+
+    moved = 0
+    while True:
+        # Each batch is its own short write transaction so the scraper never waits long
+        n = db.run_write(archive_batch, batch_size, path=DB)
+        moved += n
+        if n < batch_size:
+            break
+
+    print(f"Archive: {moved} rows moved to {HISTORY_TABLE} in {time.perf_counter() - start:.1f}s.")
+    return moved
+
+
+if __name__ == "__main__":
+    run_archive()
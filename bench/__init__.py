@@ -0,0 +1,8 @@
+# ============================================================
+# OFFLINE BENCHMARKS
+#   python -m bench.run --rows 100000
+# synth.py builds a synthetic lots DB, mock_sites.py serves
+# HiBid / eBay look-alike pages from fixtures/, run.py runs each
+# pipeline stage against them and appends the results to
+# bench/results.jsonl (compared with the last run of that size).
+# ============================================================
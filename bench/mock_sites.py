@@ -0,0 +1,160 @@
+import os
+import re
+import sys
+import html
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from bench import synth
+
+# ============================================================
+# MOCK HIBID / EBAY
+#   python -m bench.mock_sites [port]
+# Look-alike pages rendered from fixtures/ with the same markup
+# the scrapers read (app-lot-tile, page-link Next, s-item), so
+# scraper_v9 / validator_v6 run unchanged against localhost.
+# Content is seeded by the URL: the same page is the same page.
+# ============================================================
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+MOCK_HOST = "127.0.0.1"
+MOCK_PORT = 9400
+
+TILES_PER_PAGE = 100
+PAGES_PER_ZIP = 10
+EBAY_RESULTS = 30
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _fill(template, **values):
+    for key, value in values.items():
+        template = template.replace("{{" + key + "}}", str(value))
+    return template
+
+
+def _rng(*parts):
+    return np.random.default_rng(zlib.crc32("|".join(map(str, parts)).encode()))
+
+
+# ------------------------------
+# Pages
+# ------------------------------
+def lot_tiles(zip_code, page):
+    """The page's lots in scraper_v9's tile shape (bench uses these without a browser)."""
+    rng = _rng("hibid", zip_code, page)
+    start = int(zip_code) * 10_000 + (page - 1) * TILES_PER_PAGE
+
+    tiles = []
+    for i in range(TILES_PER_PAGE):
+        lot_id = str(start + i)
+        title = synth.make_title(rng, rng.integers(len(synth.PRODUCTS)))
+        bid = round(float(rng.uniform(1, 150)), 2)
+        bids = int(rng.poisson(6))
+        minutes = int(rng.integers(1, 7 * 1440))
+        slug = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+        tiles.append((lot_id, title, bid, bids, synth.format_time_left(minutes), minutes,
+                      f"/lot/{lot_id}/{slug}", f"/img/{lot_id}.jpg", "pending"))
+    return tiles
+
+
+def lots_page(zip_code, miles, page):
+    tile = _fixture("hibid_tile.html")
+    tiles = [
+        _fill(tile, LOT_ID=lot_id, URL=html.escape(url), TITLE=html.escape(title),
+              BID=f"{bid:,.2f}", BIDS=bids, TIME_LEFT=time_left)
+        for lot_id, title, bid, bids, time_left, _, url, _, _ in lot_tiles(zip_code, page)
+    ]
+
+    nxt = ""
+    if page < PAGES_PER_ZIP:
+        nxt = _fill(_fixture("hibid_next.html"),
+                    HREF=html.escape(f"/lots?zip={zip_code}&miles={miles}&lot_type=ONLINE&apage={page + 1}"))
+
+    return _fill(_fixture("hibid_lots.html"), ZIP=zip_code, MILES=miles, PAGE=page,
+                 TILES="\n".join(tiles), NEXT=nxt)
+
+
+def ebay_page(query):
+    rng = _rng("ebay", query)
+    level = float(rng.lognormal(3.4, 0.9))
+
+    item = _fixture("ebay_item.html")
+    items = [
+        _fill(
+            item,
+            ITEM_ID=int(rng.integers(10**11, 10**12)),
+            TITLE=html.escape(f"{query.title()} {synth.ADJECTIVES[i % len(synth.ADJECTIVES)]}".strip()),
+            SOLD_DATE=f"Sep {1 + i % 28}, 2026",
+            PRICE=f"{level * rng.lognormal(0, 0.3):,.2f}",
+        )
+        for i in range(EBAY_RESULTS)
+    ]
+    return _fill(_fixture("ebay_sold.html"), QUERY=html.escape(query), ITEMS="\n".join(items))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, code, body, content_type="text/html; charset=utf-8"):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/lots":
+            return self._reply(200, lots_page(q.get("zip", "62629"), q.get("miles", "50"),
+                                              int(q.get("apage", 1))))
+        if url.path == "/sch/i.html":
+            return self._reply(200, ebay_page(q.get("_nkw", "")))
+        # Images, CSS, item pages: empty, the lean browser blocks most of them anyway
+        self._reply(404, b"", "text/plain")
+
+    def log_message(self, *args):
+        pass
+
+
+# ------------------------------
+# Server
+# ------------------------------
+class MockSites:
+    """with MockSites() as sites: sites.lots_url / sites.ebay_url"""
+
+    def __init__(self, port=MOCK_PORT):
+        self.server = ThreadingHTTPServer((MOCK_HOST, port), _Handler)
+        self.base = f"http://{MOCK_HOST}:{self.server.server_port}"
+        self.lots_url = f"{self.base}/lots"
+        self.ebay_url = f"{self.base}/sch/i.html"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else MOCK_PORT
+    with MockSites(port) as sites:
+        print(f"Mock HiBid: {sites.lots_url}?zip=62629&miles=50")
+        print(f"Mock eBay:  {sites.ebay_url}?_nkw=dewalt+drill")
+        try:
+            sites.thread.join()
+        except KeyboardInterrupt:
+            pass
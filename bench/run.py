@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+from bench import synth
+from bench import stages
+from bench.mock_sites import MockSites
+
+# ============================================================
+# BENCH RUNNER
+#   python -m bench.run --rows 100000
+#   python -m bench.run --rows 5000000 --stages lifecycle,export,dashboard
+# Builds (once per size/seed) the synthetic DB, starts the mock
+# sites, runs every stage in order against a fresh copy --repeat
+# times and appends the per-stage medians to bench/results.jsonl.
+# A stage whose median is more than --tolerance slower than the
+# last run of the same size is a regression: it's flagged and the
+# exit code is 1.
+# ============================================================
+
+WORK_DIR = os.path.join(stages.REPO, "bench_work")
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+
+TOLERANCE = 0.25
+REPEAT = 3             # Pipeline passes per run; each stage is compared on its median
+MIN_SECONDS = 0.5      # Faster than this is noise, never a regression
+SHORT_SECONDS = 1.0    # Below this, process start / disk cache jitter is a big share...
+SHORT_TOLERANCE = 0.5  # ...so short stages get a wider tolerance
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=stages.REPO,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def base_db(rows, seed, rebuild=False):
+    path = os.path.join(WORK_DIR, f"synth_{rows}_{seed}.db")
+    if rebuild or not os.path.exists(path):
+        print(f"Building synthetic DB ({rows:,} lots)...")
+        synth.build(path, rows, seed)
+    return path
+
+
+def fresh_run_dir(base):
+    run_dir = os.path.join(WORK_DIR, "run")
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    shutil.copyfile(base, os.path.join(run_dir, stages.DB))
+    return run_dir
+
+
+def run_one(name, run_dir, env):
+    out = os.path.join(run_dir, f"{name}.json")
+    with open(os.path.join(run_dir, f"{name}.log"), "w") as log:
+        proc = subprocess.run([sys.executable, "-m", "bench.stages", name, out],
+                              cwd=run_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if not os.path.exists(out):
+        return {"stage": name, "status": "error", "reason": f"exit code {proc.returncode}, see {name}.log"}
+    with open(out) as f:
+        return json.load(f)
+
+
+def median_result(runs):
+    """
+    One result per stage from its repeats: the median seconds, with the ops
+    and counters of the pass closest to it. Any failed pass fails the stage.
+    """
+    failed = [r for r in runs if r.get("status") != "ok"]
+    if failed:
+        return failed[0]
+    samples = [r["seconds"] for r in runs]
+    median = statistics.median(samples)
+    result = dict(min(runs, key=lambda r: abs(r["seconds"] - median)))
+    result.update(seconds=median, samples=samples)
+    return result
+
+
+# ------------------------------
+# Regressions
+# ------------------------------
+def previous_run(rows, path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if run.get("rows") == rows:
+                last = run
+    return last
+
+
+def regressions(results, previous, tolerance=TOLERANCE):
+    if not previous:
+        return []
+    before = {r["stage"]: r for r in previous["stages"] if r.get("status") == "ok"}
+    slow = []
+    for r in results:
+        old = before.get(r["stage"])
+        if r.get("status") != "ok" or not old or r["seconds"] < MIN_SECONDS:
+            continue
+        allowed = max(tolerance, SHORT_TOLERANCE) if old["seconds"] < SHORT_SECONDS else tolerance
+        if r["seconds"] > old["seconds"] * (1 + allowed):
+            slow.append((r["stage"], old["seconds"], r["seconds"]))
+    return slow
+
+
+def print_table(results):
+    print(f"\n{'stage':<16}{'status':<9}{'seconds':>9}{'items/s':>12}{'peak MB':>9}  slowest op")
+    for r in results:
+        if r["status"] != "ok":
+            print(f"{r['stage']:<16}{r['status']:<9}  {r.get('reason', '')}")
+            continue
+        ops = sorted(r["ops"].items(), key=lambda kv: -kv[1]["total_s"])
+        top = f"{ops[0][0]} (p95 {ops[0][1]['p95_s'] * 1000:.1f} ms)" if ops else ""
+        rate = f"{r['items_per_s']:,.0f}" if r["items_per_s"] else "-"
+        print(f"{r['stage']:<16}{'ok':<9}{r['seconds']:>9.2f}{rate:>12}{r['peak_rss_mb'] or 0:>9.0f}  {top}")
+
+
+# ------------------------------
+# Main
+# ------------------------------
+def run(rows, seed=1, only=None, rebuild=False, tolerance=TOLERANCE, repeat=REPEAT):
+    os.makedirs(WORK_DIR, exist_ok=True)
+    names = [s for s in stages.ORDER if not only or s in only]
+    unknown = set(only or ()) - set(stages.ORDER)
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}, expected some of {stages.ORDER}")
+
+    base = base_db(rows, seed, rebuild)
+    passes = {name: [] for name in names}
+
+    with MockSites(port=0) as sites:
+        env = dict(os.environ, PYTHONPATH=stages.REPO, BENCH_LOTS_URL=sites.lots_url,
+                   BENCH_EBAY_URL=sites.ebay_url, HIBID_PROFILE="")
+        # Stages change the DB as they go, so each pass starts from a fresh copy
+        for i in range(max(repeat, 1)):
+            run_dir = fresh_run_dir(base)
+            for name in names:
+                print(f"[bench] pass {i + 1}/{repeat} {name}...", flush=True)
+                passes[name].append(run_one(name, run_dir, env))
+
+    results = [median_result(passes[name]) for name in names]
+
+    previous = previous_run(rows)
+    record = {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "rows": rows,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stages": results,
+    }
+    with open(RESULTS_FILE, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    print_table(results)
+    print(f"\nLogs: {run_dir}  |  Results appended to {RESULTS_FILE}")
+
+    slow = regressions(results, previous, tolerance)
+    for name, old, new in slow:
+        print(f"⚠️ REGRESSION {name}: {old:.2f}s -> {new:.2f}s (+{new / old - 1:.0%}) vs {previous['commit']}")
+    if not previous:
+        print(f"(first run at {rows:,} rows, nothing to compare with)")
+    return results, slow
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--rows", type=int, default=10_000, help="synthetic lots (10k to 5M)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--stages", default="", help=f"comma list, default all: {','.join(stages.ORDER)}")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the synthetic DB")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="passes per stage, compared on the median")
+    args = parser.parse_args()
+
+    only = [s.strip() for s in args.stages.split(",") if s.strip()]
+    _, slow = run(args.rows, args.seed, only, args.rebuild, args.tolerance, args.repeat)
+    sys.exit(1 if slow else 0)
@@ -0,0 +1,360 @@
+import os
+import sys
+import json
+import time
+import runpy
+
+import numpy as np
+
+import db
+import metrics
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+# ============================================================
+# BENCH STAGES
+#   python -m bench.stages <stage> <result.json>   (run.py does this)
+# Each stage runs in its own process, in the bench work dir
+# (hibid_lots.db there is the synthetic copy), so peak memory is
+# that stage's alone. Result: time, items/s, peak RSS, and the
+# per-operation latency percentiles metrics.py recorded.
+# ============================================================
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB = "hibid_lots.db"
+
+# Order matters: same order as one real cycle (runner.py)
+ORDER = [
+    "scrape_write", "scrape", "normalize", "lifecycle", "archive", "comps", "price_model", "forecast",
+    "velocity", "category_stats", "bucket_stats", "edge_score", "alerts", "validate", "export",
+    "dashboard", "analytics",
+]
+
+DASHBOARD_REPEAT = 5
+SCRAPE_WRITE_PASSES = 3       # First pass inserts, later ones mostly skip unchanged tiles
+CHANGED_PER_PASS = 0.1
+
+STAGES = {}
+
+
+class Skipped(Exception):
+    pass
+
+
+def stage(name):
+    def register(fn):
+        STAGES[name] = fn
+        return fn
+    return register
+
+
+def _count_lots():
+    import archive_history
+    conn = db.connect(DB, readonly=True)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {archive_history.all_lots(conn)}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _script(name):
+    runpy.run_path(os.path.join(REPO, name), run_name="__main__")
+
+
+def _need_browser():
+    import browser_profile
+    if not os.path.exists(browser_profile.CHROMIUM_PATH):
+        raise Skipped(f"no browser at {browser_profile.CHROMIUM_PATH}")
+
+
+class _NoWait:
+    """
+    Stand-in for a stage module's `time`: fixed politeness sleeps are
+    pointless against localhost and would swamp what we measure.
+    """
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+# ------------------------------
+# Stages (each returns items processed, plus optional latency samples)
+# ------------------------------
+@stage("scrape_write")
+def scrape_write():
+    # scraper_v9's parse -> change filter -> write path, no browser needed
+    import scraper_v9
+    import coverage_planner
+    from bench import mock_sites
+
+    rng = np.random.default_rng(1)
+    seen = scraper_v9.TileFilter()
+    tiles = 0
+
+    for _ in range(SCRAPE_WRITE_PASSES):
+        cycle = coverage_planner.SeenSet()
+        for zip_code in scraper_v9.ZIP_CODES:
+            for page in range(1, mock_sites.PAGES_PER_ZIP + 1):
+                page_tiles = cycle.filter(mock_sites.lot_tiles(zip_code, page))
+                # Bids move on some lots between passes
+                page_tiles = [
+                    t[:2] + (t[2] + 1.0, t[3] + 1) + t[4:] if rng.random() < CHANGED_PER_PASS else t
+                    for t in page_tiles
+                ]
+                with metrics.timer("split"):
+                    changed, bump = seen.split(page_tiles)
+                with metrics.timer("db_write"):
+                    db.run_write(scraper_v9.save_page, changed, bump, path=DB)
+                seen.commit(changed, bump)
+                tiles += len(page_tiles)
+        # Make every unchanged tile due for a bump again on the next pass
+        seen.bumped.clear()
+    return tiles
+
+
+@stage("scrape")
+def scrape():
+    _need_browser()
+    import scraper_v9
+    import checkpoints
+    import coverage_planner
+    import browser_profile
+
+    scraper_v9.LOTS_URL = os.environ["BENCH_LOTS_URL"]
+    scraper_v9.time = _NoWait()
+
+    driver = browser_profile.get_driver()
+    seen = scraper_v9.TileFilter()
+    cycle = coverage_planner.SeenSet()
+    job = checkpoints.Job("bench_scrape")
+    try:
+        for zip_code in scraper_v9.ZIP_CODES:
+            with metrics.timer("zip_total"):
+                scraper_v9.scrape_zip(driver, zip_code, seen, cycle, job)
+    finally:
+        driver.quit()
+        job.finish()
+    return metrics.REGISTRY.counters.get("tiles", 0)
+
+
+@stage("normalize")
+def normalize():
+    import title_normalizer
+    title_normalizer.run_normalize()
+    return _count_lots()
+
+
+@stage("lifecycle")
+def lifecycle():
+    import lifecycle_manager
+    items = _count_lots()
+    lifecycle_manager.run_lifecycle()
+    return items
+
+
+@stage("archive")
+def archive():
+    import archive_history
+    items = _count_lots()
+    archive_history.run_archive()
+    return items
+
+
+@stage("comps")
+def comps():
+    import comps
+    comps.run_comps()
+    return _count_lots()
+
+
+@stage("price_model")
+def price_model():
+    import price_model
+    with metrics.timer("train_total"):
+        price_model.train()
+    with metrics.timer("score_total"):
+        return price_model.score()
+
+
+@stage("forecast")
+def forecast():
+    import price_forecast
+    with metrics.timer("fit_total"):
+        price_forecast.fit()
+    with metrics.timer("score_total"):
+        return price_forecast.score()
+
+
+@stage("velocity")
+def velocity():
+    _script("compute_velocity.py")
+    return _count_lots()
+
+
+@stage("category_stats")
+def category_stats():
+    _script("compute_category_stats.py")
+    return _count_lots()
+
+
+@stage("bucket_stats")
+def bucket_stats():
+    _script("compute_bucket_stats.py")
+    return _count_lots()
+
+
+@stage("edge_score")
+def edge_score():
+    _script("compute_edge_score.py")
+    return _count_lots()
+
+
+@stage("alerts")
+def alerts():
+    _script("edge_alerts.py")
+    return _count_lots()
+
+
+@stage("validate")
+def validate():
+    _need_browser()
+    import validator_v6
+
+    validator_v6.EBAY_SEARCH_URL = os.environ["BENCH_EBAY_URL"]
+    validator_v6.DEBUG_MODE = False
+    validator_v6.time = _NoWait()
+    validator_v6.run_validator()
+    return validator_v6.MAX_ITEMS_PER_RUN
+
+
+@stage("export")
+def export():
+    import export_data
+    items = _count_lots()
+    filename = export_data.export("csv")
+    if filename and os.path.exists(filename):
+        os.remove(filename)
+    return items
+
+
+@stage("dashboard")
+def dashboard():
+    import dashboard_data
+
+    # Straight to SQLite: we're timing the queries, not Streamlit's cache
+    pool = dashboard_data.open_pool(os.path.abspath(DB))
+    dashboard_data.get_pool = lambda: pool
+    dashboard_data.run_query = lambda query, params=(): dashboard_data.read_sql(query, list(params))
+
+    medians = dashboard_data.load_bucket_medians()
+    queries = {
+        "metrics": lambda: dashboard_data.load_metrics(),
+        "bucket_medians": lambda: dashboard_data.load_bucket_medians(),
+        "count_active": lambda: dashboard_data.count_active_lots(),
+        "search_active": lambda: dashboard_data.load_active_lots(medians, search="dewalt drill"),
+        "sold_archive": lambda: dashboard_data.load_sold_archive(),
+        "search_sold": lambda: dashboard_data.load_sold_archive(search="kitchenaid mixer"),
+    }
+    for sort in dashboard_data.SORTS:
+        key = sort.lower().replace(" ", "_")
+        queries[f"page1_{key}"] = lambda s=sort: dashboard_data.load_active_lots(medians, sort_by=s)
+        queries[f"page5_{key}"] = lambda s=sort: dashboard_data.load_active_lots(medians, sort_by=s, page=5)
+
+    samples = {}
+    for name, query in queries.items():
+        for _ in range(DASHBOARD_REPEAT):
+            start = time.perf_counter()
+            query()
+            samples.setdefault(name, []).append(time.perf_counter() - start)
+            metrics.observe(f"query_{name}", samples[name][-1])
+
+    return len(queries) * DASHBOARD_REPEAT, samples
+
+
+@stage("analytics")
+def analytics_mirror():
+    # Last, so the stages above still measure the plain SQLite path
+    import analytics
+
+    with metrics.timer("sync"):
+        analytics.sync(DB)
+
+    samples = {}
+    for name, fn in [("category", analytics.category_stats), ("bucket", analytics.bucket_stats),
+                     ("location", analytics.location_stats)]:
+        for _ in range(DASHBOARD_REPEAT):
+            analytics._cache["key"] = None      # Cold: includes reading the Parquet files
+            start = time.perf_counter()
+            fn()
+            samples.setdefault(name, []).append(time.perf_counter() - start)
+            metrics.observe(f"query_{name}", samples[name][-1])
+
+    return _count_lots(), samples
+
+
+# ------------------------------
+# Measuring
+# ------------------------------
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype=float)
+    return {
+        "n": int(values.size),
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(values, 99)) * 1000, 2),
+    }
+
+
+def run_stage(name):
+    result = {"stage": name, "status": "ok"}
+    metrics.stage(f"bench_{name}", profile=False)
+
+    start = time.perf_counter()
+    try:
+        out = STAGES[name]()
+        items, samples = out if isinstance(out, tuple) else (out, {})
+    except Skipped as e:
+        return dict(result, status="skipped", reason=str(e))
+    except (Exception, SystemExit) as e:
+        items, samples = 0, {}
+        result.update(status="error", reason=f"{type(e).__name__}: {e}")
+    finally:
+        # Writes a stage queued without waiting count towards its time
+        db.run_write(lambda conn: None, path=DB)
+        seconds = time.perf_counter() - start
+
+    result.update(
+        seconds=round(seconds, 3),
+        items=items,
+        items_per_s=round(items / seconds, 1) if seconds and items else None,
+        peak_rss_mb=round(peak_rss_mb() or 0, 1) or None,
+        ops=metrics.REGISTRY.snapshot()["ops"],
+        latency={k: percentiles(v) for k, v in samples.items()},
+    )
+    return result
+
+
+if __name__ == "__main__":
+    name, out_path = sys.argv[1], sys.argv[2]
+    res = run_stage(name)
+    with open(out_path, "w") as f:
+        json.dump(res, f)
@@ -0,0 +1,233 @@
+import os
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import bid_history
+import title_normalizer
+
+# ============================================================
+# SYNTHETIC AUCTION CORPUS
+# A lots DB with the full column set the stages expect (the live
+# schema is the union of every ALTER TABLE over time), filled with
+# plausible titles / prices / timings from a fixed seed so runs
+# of the same size are comparable.
+# ============================================================
+
+BATCH_SIZE = 50_000
+
+# Share of rows per status (the rest is 'sold_history')
+PENDING_SHARE = 0.25
+ENDED_SHARE = 0.05
+
+# Same labels update_classifications.py predicts
+CATEGORIES = ["drill_press", "table_saw", "miter_saw", "welder", "nail_gun", "air_compressor"]
+
+PRODUCTS = [
+    "cordless drill", "impact driver", "circular saw", "miter saw", "table saw", "drill press",
+    "air compressor", "nail gun", "welder", "socket set", "wrench set", "tool box", "shop vac",
+    "chainsaw", "leaf blower", "string trimmer", "lawn mower", "pressure washer", "generator",
+    "laptop", "tablet", "headphones", "speaker", "camera", "lens", "smart watch", "game console",
+    "controller", "video games", "blender", "stand mixer", "coffee maker", "air fryer", "cookware",
+    "dutch oven", "cast iron skillet", "dinnerware", "glassware", "vase", "figurine", "handbag",
+    "wallet", "sneakers", "jacket", "jeans", "watch", "knife", "lighter", "cooler", "tent",
+    "grill", "toy cars", "action figures", "board game", "trading cards", "building set", "doll",
+]
+ADJECTIVES = ["", "", "", "vintage", "new", "used", "brushless", "heavy duty", "mini", "pro",
+              "large", "compact", "cordless", "antique", "sealed"]
+MODELS = ["", "", "dcd771", "xr-20", "m18", "2804-20", "v8", "ps5", "a7iii", "kx-450", "s22", "lb-100"]
+
+# Price level per product, so similar titles sell for similar amounts
+BASE_PRICE = np.random.default_rng(7).lognormal(mean=3.4, sigma=0.9, size=len(PRODUCTS))
+
+COLUMNS = [
+    ("lot_id", "TEXT PRIMARY KEY"),
+    ("title", "TEXT"),
+    ("current_bid", "REAL"),
+    ("bid_count", "INTEGER"),
+    ("time_remaining", "TEXT"),
+    ("minutes_left", "INTEGER"),
+    ("url", "TEXT"),
+    ("image_url", "TEXT"),
+    ("market_value", "REAL"),
+    ("ref_image", "TEXT"),
+    ("ref_url", "TEXT"),
+    ("value_source", "TEXT"),
+    ("status", "TEXT DEFAULT 'pending'"),
+    ("last_seen", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+    ("ended_at", "TIMESTAMP"),
+    ("buyers_premium", "REAL DEFAULT 0.15"),
+    ("shipping_available", "INTEGER DEFAULT 1"),
+    ("final_price", "REAL"),
+    ("location", "TEXT"),
+    ("predicted_category", "TEXT"),
+    ("classifier_confidence", "REAL"),
+    ("predicted_value", "REAL"),
+    ("velocity", "REAL"),
+    ("edge_score", "REAL"),
+]
+
+LOCATIONS = ["Jacksonville, IL", "Springfield, IL", "Decatur, IL", "Peoria, IL", "Quincy, IL"]
+
+# Run-up steepness per category (None last): how much of the final price comes late
+RUNUP = {c: 0.12 + 0.06 * i for i, c in enumerate(CATEGORIES)}
+RUNUP[None] = 0.2
+MAX_POINTS = 8
+
+
+def setup(conn):
+    cols = ",\n".join(f"{name} {col_type}" for name, col_type in COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS lots (\n{cols}\n)")
+    bid_history.setup(conn)
+    # Tables nothing in the pipeline creates but compute_category_stats writes to
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category TEXT PRIMARY KEY,
+            median_price REAL,
+            avg_price REAL,
+            avg_bid_count REAL,
+            total_sold INTEGER
+        )
+    """)
+
+
+def format_time_left(minutes):
+    if minutes is None or minutes <= 0:
+        return None
+    d, rest = divmod(int(minutes), 1440)
+    h, m = divmod(rest, 60)
+    return " ".join(p for p in (f"{d}d" if d else "", f"{h}h" if h else "", f"{m}m") if p)
+
+
+def make_title(rng, product):
+    brand = title_normalizer.BRANDS[rng.integers(len(title_normalizer.BRANDS))].title()
+    adj = ADJECTIVES[rng.integers(len(ADJECTIVES))]
+    model = MODELS[rng.integers(len(MODELS))].upper()
+    qty = rng.integers(1, 6)
+    words = [w for w in (brand, adj, PRODUCTS[product], model) if w]
+    title = " ".join(words).title() if rng.random() < 0.5 else " ".join(words)
+    if qty > 2 and rng.random() < 0.3:
+        title = f"Lot of {qty} {title}"
+    if rng.random() < 0.2:
+        title = f"Lot #{rng.integers(1, 999)}: {title}"
+    return title
+
+
+def make_rows(rng, start, n, now):
+    """n rows starting at lot number start, as tuples in COLUMNS order."""
+    products = rng.integers(len(PRODUCTS), size=n)
+    value = BASE_PRICE[products] * rng.lognormal(0, 0.35, size=n)
+    roll = rng.random(n)
+    bids = rng.poisson(6, size=n)
+    minutes = rng.integers(1, 7 * 1440, size=n)
+    seen_ago = rng.integers(0, 240, size=n)
+
+    rows = []
+    for i in range(n):
+        lot_id = f"{start + i:09d}"
+        title = make_title(rng, products[i])
+        v = round(float(value[i]), 2)
+
+        if roll[i] < PENDING_SHARE:
+            status, left, final = "pending", int(minutes[i]), None
+            # A few stale ones for lifecycle to expire
+            if roll[i] < PENDING_SHARE * 0.04:
+                left = 0
+            bid = round(v * rng.uniform(0.05, 0.8), 2)
+        elif roll[i] < PENDING_SHARE + ENDED_SHARE:
+            status, left = "ended", 0
+            final = round(v * rng.uniform(0.3, 0.9), 2) if rng.random() < 0.7 else None
+            bid = final or round(v * 0.5, 2)
+        else:
+            status, left = "sold_history", None
+            final = round(v * rng.uniform(0.2, 0.9), 2)
+            bid = final
+
+        # Roughly half the active lots have been valued already
+        market = round(v * rng.uniform(2.5, 5.0), 2) if status == "pending" and rng.random() < 0.5 else None
+
+        rows.append((
+            lot_id, title, bid, int(bids[i]), format_time_left(left), left,
+            f"https://hibid.com/lot/{lot_id}/x", f"https://cdn.hibid.com/img/{lot_id}.jpg",
+            market, None, None, "ebay" if market else None, status,
+            (now - timedelta(minutes=int(seen_ago[i]))).strftime("%Y-%m-%d %H:%M:%S"),
+            None, 0.15 if rng.random() < 0.8 else 0.18, 1,
+            final, LOCATIONS[i % len(LOCATIONS)],
+            CATEGORIES[products[i] % len(CATEGORIES)] if rng.random() < 0.6 else None,
+            round(float(rng.uniform(0.5, 1.0)), 3), None, None, None,
+        ))
+    return rows
+
+
+def make_points(rng, rows):
+    """
+    bid_history rows for sold and pending lots: bids climbing towards the
+    close along the category's run-up curve, one point per bid change.
+    """
+    points = []
+    for r in rows:
+        lot_id, bid, bids, left, status, seen, final, category = r[0], r[2], r[3], r[5], r[12], r[13], r[17], r[19]
+        if status == "sold_history":
+            close, end_left = final, int(rng.integers(1, 30))
+        elif status == "pending" and left:
+            end_left = left
+            close = bid * np.exp(RUNUP[category] * np.log1p(left / 60))
+        else:
+            continue
+
+        k = int(rng.integers(2, MAX_POINTS + 1))
+        lefts = np.sort(np.exp(rng.uniform(np.log(end_left + 1), np.log(7 * 1440), k - 1)))[::-1].astype(int)
+        lefts = np.append(lefts, end_left)
+        steep = RUNUP[category] * rng.lognormal(0, 0.25)
+        prices = np.maximum.accumulate(close * np.exp(-steep * np.log1p(lefts / 60)))
+        if status == "pending":
+            prices[-1] = bid
+        counts = np.round(np.linspace(1, max(bids, 1), k)).astype(int)
+
+        end = datetime.strptime(seen, "%Y-%m-%d %H:%M:%S")
+        for m, p, c in zip(lefts, prices, counts):
+            at = end - timedelta(minutes=int(m - end_left))
+            points.append((lot_id, round(float(p), 2), int(c), int(m), at.strftime("%Y-%m-%d %H:%M:%S")))
+    return points
+
+
+def build(path, rows, seed=1):
+    """Creates path with `rows` synthetic lots. Returns the path."""
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    setup(conn)
+
+    placeholders = ", ".join("?" * len(COLUMNS))
+    start = time.perf_counter()
+    for offset in range(0, rows, BATCH_SIZE):
+        n = min(BATCH_SIZE, rows - offset)
+        batch = make_rows(rng, offset + 1, n, now)
+        conn.executemany(f"INSERT INTO lots VALUES ({placeholders})", batch)
+        conn.executemany(f"INSERT INTO {bid_history.TABLE} VALUES (?, ?, ?, ?, ?)", make_points(rng, batch))
+        conn.commit()
+        if rows > BATCH_SIZE:
+            print(f"   ...{offset + n:,} / {rows:,} rows")
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_lots_status ON lots(status)")
+    conn.commit()
+    conn.close()
+    print(f"Built {path}: {rows:,} lots in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a synthetic lots DB")
+    parser.add_argument("path", nargs="?", default="synthetic_lots.db")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    build(args.path, args.rows, args.seed)
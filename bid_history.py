@@ -0,0 +1,50 @@
+# ============================================================
+# BID TRAJECTORIES
+# One bid_history row per lot every time the scraper sees its bid
+# or bid count move: (bid, count, minutes left) over successive
+# scrapes. Rows outlive the lot in `lots` (archive_history doesn't
+# touch them) -- sold lots' trajectories are what price_forecast
+# learns its run-up curves from.
+# ============================================================
+
+TABLE = "bid_history"
+
+KEEP_DAYS = 180
+
+
+def setup(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            lot_id TEXT,
+            current_bid REAL,
+            bid_count INTEGER,
+            minutes_left INTEGER,
+            seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_lot ON {TABLE}(lot_id, seen_at)")
+
+
+def record(conn, points):
+    """
+    points: [(lot_id, current_bid, bid_count, minutes_left)]. Rides on the
+    caller's transaction, like lot_events.publish.
+    """
+    conn.executemany(
+        f"INSERT INTO {TABLE} (lot_id, current_bid, bid_count, minutes_left) VALUES (?, ?, ?, ?)",
+        points
+    )
+
+
+def prune(conn, keep_days=KEEP_DAYS):
+    conn.execute(
+        f"DELETE FROM {TABLE} WHERE seen_at < datetime('now', ?)",
+        (f"-{int(keep_days)} days",)
+    )
+
+
+def exists(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (TABLE,)
+    ).fetchone()
+    return row is not None
@@ -0,0 +1,307 @@
+import asyncio
+import os
+import re
+import statistics
+import time
+from playwright.async_api import async_playwright
+import config
+import browser_pool
+
+# ============================================================
+# BIDDING SERVICE
+# One logged-in browser that lives across runs (saved
+# storage_state), a small pool of warm pages (one per soonest
+# lot, held for its snipe), and snipes scheduled a few seconds
+# before each lot ends -- timed off the lot page's own clock and
+# moved whenever a fresher end time comes in.
+# ============================================================
+
+BASE_URL = config.HIBID_BASE_URL
+STORAGE_STATE = "hibid_session.json"   # Cookies, keep out of git
+
+PAGE_POOL_SIZE = config.BID_PAGE_POOL_SIZE
+SNIPE_SECONDS = config.SNIPE_SECONDS_BEFORE_END
+
+# Lot page selectors
+CURRENT_BID_SELECTOR = ".lot-high-bid"
+BID_INPUT_SELECTOR = "input[name='bidAmount']"
+BID_BUTTON_SELECTOR = "button.lot-bid-button"
+BID_CONFIRM_SELECTOR = "button.bid-confirm"
+TIME_LEFT_SELECTOR = ".lot-time-left"
+
+RESCHEDULE_SECONDS = 2   # A fresher end time further off than this moves the snipe
+FINISHED_KEEP_SECONDS = 3600   # A fired snipe isn't rescheduled off stale rows for this long after the end
+RELEASE_QUIET_SECONDS = 120    # Only swap browsers when no snipe is due sooner than this
+
+_TIME_PARTS = re.compile(r"(\d+)\s*([dhms])", re.I)
+_UNIT_SECONDS = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+
+
+def parse_time_left(text):
+    """'1d 2h 3m 4s' -> seconds (None if there's no time in it)."""
+    parts = _TIME_PARTS.findall(text or "")
+    if not parts:
+        return None
+    return sum(int(n) * _UNIT_SECONDS[unit.lower()] for n, unit in parts)
+
+
+class BiddingService:
+    def __init__(self, headless=True, pool_size=PAGE_POOL_SIZE, storage_state=STORAGE_STATE):
+        self.headless = headless
+        self.pool_size = pool_size
+        self.storage_state = storage_state
+        self.latencies = []
+        self._snipes = {}          # lot_id -> (task, end_at on the monotonic clock, max_bid)
+        self._firing = set()
+        self._finished = {}        # lot_id -> end_at of snipes that already ran
+        self.lease = None
+        self.page_loads = 0        # Navigations on the current browser, for the pool's recycling
+        self.pages = asyncio.Queue()
+        self.warmed = {}           # lot_id -> page already on that lot, soonest first
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+    async def __aenter__(self):
+        self._pw = await async_playwright().start()
+        await self._connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        for task, _, _ in self._snipes.values():
+            task.cancel()
+        await self._disconnect()
+        await self._pw.stop()
+
+    async def _connect(self):
+        # A warm pool browser, leased with the normal TTL and kept alive by maintain()
+        self.lease = await asyncio.to_thread(browser_pool.try_checkout, "bidder")
+        if self.lease:
+            self.browser = await self._pw.chromium.connect_over_cdp(self.lease["cdp"])
+        else:
+            self.browser = await self._pw.chromium.launch(headless=self.headless)
+        self.page_loads = 0
+
+        # Reuse the last session's cookies so we only pay for the login form when they expire
+        state = self.storage_state if os.path.exists(self.storage_state) else None
+        self.context = await self.browser.new_context(storage_state=state)
+
+        await self.ensure_login()
+
+        for _ in range(self.pool_size):
+            self._checkin(await self.context.new_page())
+
+    async def _disconnect(self):
+        await self.context.storage_state(path=self.storage_state)
+        # On a pooled browser this only drops our context and disconnects
+        await self.context.close()
+        await self.browser.close()
+        self.warmed.clear()
+        self.pages = asyncio.Queue()
+        if self.lease:
+            await asyncio.to_thread(browser_pool.checkin, self.lease, self.page_loads)
+
+    async def maintain(self):
+        """
+        Called between polls. Renews the pool lease, and once this browser has
+        done RECYCLE_AFTER_PAGES navigations (or the lease was lost) hands it
+        back and leases a fresh one -- only while no snipe is about to fire.
+        """
+        if not self.lease:
+            return
+        if self.page_loads < browser_pool.RECYCLE_AFTER_PAGES and \
+                await asyncio.to_thread(browser_pool.renew, self.lease):
+            return
+        now = time.monotonic()
+        if self._firing or any(not task.done() and end_at - now < RELEASE_QUIET_SECONDS
+                               for task, end_at, _ in self._snipes.values()):
+            return
+        print(f"[*] Swapping pool browser after {self.page_loads} pages")
+        await self._disconnect()
+        await self._connect()
+
+    async def ensure_login(self):
+        page = await self.context.new_page()
+        try:
+            await page.goto(f"{BASE_URL}/home")
+            if "/login" not in page.url:
+                print("[*] Reusing saved session.")
+                return
+
+            print("Logging in...")
+            await page.goto(f"{BASE_URL}/login")
+            await page.fill("#username", config.HIBID_USERNAME)
+            await page.fill("#password", config.HIBID_PASSWORD)
+            await page.click("button[type='submit']")
+            await page.wait_for_url("**/home**", timeout=20000)
+            await self.context.storage_state(path=self.storage_state)
+        finally:
+            await page.close()
+
+    # ------------------------------
+    # Page Pool
+    # ------------------------------
+    async def _checkout(self, lot_id=None):
+        # The lot's own warmed page if it has one
+        page = self.warmed.pop(lot_id, None)
+        if page is not None:
+            return page
+        if self.pages.empty() and self.warmed:
+            # Every free page is holding a lot: take the one ending last
+            return self.warmed.pop(next(reversed(self.warmed)))
+        return await self.pages.get()
+
+    def _checkin(self, page):
+        self.pages.put_nowait(page)
+
+    async def _open(self, page, url):
+        if page.url != url:
+            self.page_loads += 1
+            await page.goto(url, wait_until="domcontentloaded")
+
+    async def _read_bid(self, page):
+        try:
+            text = await page.text_content(CURRENT_BID_SELECTOR, timeout=5000)
+            return float(text.replace("$", "").replace(",", "").replace("USD", "").strip())
+        except Exception:
+            return None
+
+    async def _read_time_left(self, page):
+        try:
+            return parse_time_left(await page.text_content(TIME_LEFT_SELECTOR, timeout=5000))
+        except Exception:
+            return None
+
+    async def _submit_bid(self, page, amount):
+        if config.DRY_RUN:
+            print(f"  [DRY RUN] Would bid ${amount} on {page.url}")
+            return
+        await page.fill(BID_INPUT_SELECTOR, f"{amount:.2f}")
+        await page.click(BID_BUTTON_SELECTOR)
+        try:
+            await page.click(BID_CONFIRM_SELECTOR, timeout=2000)
+        except Exception:
+            pass # Not every lot asks for confirmation
+
+    async def check_lot(self, url):
+        """
+        Current high bid shown on the lot page (None if it can't be read).
+        """
+        page = await self._checkout()
+        try:
+            await self._open(page, url)
+            return await self._read_bid(page)
+        except Exception:
+            return None
+        finally:
+            self._checkin(page)
+
+    async def place_bid(self, url, amount, max_current=None, decided_at=None, lot_id=None):
+        """
+        Bids `amount` on the lot's warmed page (or any pooled page). With
+        max_current set, the bid is skipped if the lot is already at or above it.
+        """
+        decided_at = decided_at or time.perf_counter()
+        page = await self._checkout(lot_id)
+        try:
+            await self._open(page, url)
+
+            if max_current is not None:
+                current = await self._read_bid(page)
+                if current is not None and current >= max_current:
+                    print(f"  [SKIP] Already at ${current}, over our ${max_current}")
+                    return False
+
+            await self._submit_bid(page, amount)
+
+            latency = time.perf_counter() - decided_at
+            self.latencies.append(latency)
+            print(f"  [BID] ${amount} submitted in {latency * 1000:.0f} ms")
+            return True
+        except Exception as e:
+            print(f"  [!] Bid failed on {url}: {e}")
+            return False
+        finally:
+            self._checkin(page)
+
+    async def warm(self, lots):
+        """
+        lots: [(lot_id, url)] soonest first. Loads (or reloads) one page per
+        lot for the first pool_size of them and keeps it for that lot's snipe.
+        Returns {lot_id: seconds left as the lot page shows it} (None if unreadable).
+        """
+        keep = lots[:self.pool_size]
+        keep_ids = {lot_id for lot_id, _ in keep}
+        for lot_id in [l for l in self.warmed if l not in keep_ids]:
+            self._checkin(self.warmed.pop(lot_id))
+
+        async def load(lot_id, url):
+            page = await self._checkout(lot_id)
+            try:
+                # Reload even when already there: the time left shown is what we want
+                self.page_loads += 1
+                await page.goto(url, wait_until="domcontentloaded")
+                left = await self._read_time_left(page)
+            except Exception:
+                left = None
+            return lot_id, page, left
+
+        loaded = await asyncio.gather(*(load(lot_id, url) for lot_id, url in keep))
+        for lot_id, page, _ in loaded:
+            self.warmed[lot_id] = page
+        return {lot_id: left for lot_id, _, left in loaded}
+
+    # ------------------------------
+    # Snipes
+    # ------------------------------
+    def schedule_snipe(self, lot_id, url, max_bid, seconds_left, lead=SNIPE_SECONDS):
+        """
+        Snipe `lead` seconds before the lot ends. Called again with an end time
+        more than RESCHEDULE_SECONDS off (or a new limit), the snipe moves,
+        unless it's already firing or done.
+        """
+        now = time.monotonic()
+        end_at = now + seconds_left
+        self._finished = {l: e for l, e in self._finished.items() if now - e < FINISHED_KEEP_SECONDS}
+        if lot_id in self._finished:
+            return None
+        if lot_id in self._snipes:
+            task, old_end, old_bid = self._snipes[lot_id]
+            if lot_id in self._firing or \
+                    (abs(end_at - old_end) <= RESCHEDULE_SECONDS and max_bid == old_bid):
+                return task
+            task.cancel()
+
+        async def snipe():
+            await asyncio.sleep(max(0, end_at - lead - time.monotonic()))
+            self._firing.add(lot_id)
+            print(f"  [SNIPE] {lot_id} firing")
+            return await self.place_bid(url, max_bid, max_current=max_bid,
+                                        decided_at=time.perf_counter(), lot_id=lot_id)
+
+        def done(task):
+            # A rescheduled snipe's old task finishes after its replacement is in
+            if self._snipes.get(lot_id, (None,))[0] is not task:
+                return
+            del self._snipes[lot_id]
+            self._firing.discard(lot_id)
+            if not task.cancelled():
+                self._finished[lot_id] = end_at
+
+        task = asyncio.create_task(snipe())
+        task.add_done_callback(done)
+        self._snipes[lot_id] = (task, end_at, max_bid)
+        return task
+
+    async def wait_for_snipes(self):
+        if self._snipes:
+            await asyncio.gather(*(task for task, _, _ in list(self._snipes.values())), return_exceptions=True)
+
+    def latency_report(self):
+        if not self.latencies:
+            return "No bids submitted."
+        ms = sorted(l * 1000 for l in self.latencies)
+        return (
+            f"{len(ms)} bids | decision->submit p50 {statistics.median(ms):.0f} ms, "
+            f"max {ms[-1]:.0f} ms"
+        )
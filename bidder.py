@@ -1,94 +1,88 @@
 import asyncio
-from playwright.async_api import async_playwright
-import aiosqlite
+from datetime import datetime
+import db
 import config 
+import pricing
+import metrics
+import comps
+from bid_service import BiddingService
 
 DB_NAME = 'hibid_lots.db'
 
-async def calculate_max_bid(market_value, lot_data):
+@metrics.timed("db_read")
+async def fetch_candidates():
+    # Priced lots ending inside the snipe window; comps estimates only when trusted
+    query = f"""
+        SELECT lot_id, title, url, market_value, buyers_premium, minutes_left, last_seen
+        FROM lots
+        WHERE status IN ('valued', 'pending')
+        AND market_value > 0
+        AND {comps.TRUSTED_VALUE_SQL}
+        AND minutes_left > 0
+        AND minutes_left <= ?
     """
-    Calculates max bid using SLIDING SCALE logic.
-    """
-    # --- 1. DETERMINE REQUIRED PROFIT ---
-    if market_value < 50:
-        required_profit = config.PROFIT_MIN_LOW
-    elif market_value < 200:
-        required_profit = config.PROFIT_MIN_MID
-    else:
-        # For high value, we want a percentage (e.g., 25% of the value)
-        required_profit = market_value * config.PROFIT_PERCENT_HIGH
-
-    # --- 2. LOGISTICS COST ---
-    # Defaulting to PICKUP (Change logic here if you want to force shipping calculation)
-    logistics_cost = config.PICKUP_COST_FLAT 
-
-    # --- 3. REVENUE (After eBay takes 13%) ---
-    net_revenue = market_value * (1 - config.EBAY_FEES)
-    
-    # --- 4. ALLOWABLE SPEND ---
-    # We take the revenue and subtract the Profit we DEMAND and the Logistics costs.
-    # What's left is the maximum "Total Cost" (Bid + Fees) we can afford.
-    allowable_spend = net_revenue - required_profit - logistics_cost
-    
-    if allowable_spend <= 0:
-        return 0 # The item is not worth buying at ANY price.
+    return await db.afetchall(query, (config.SNIPE_HORIZON_MINUTES,), path=DB_NAME)
 
-    # --- 5. REVERSE ENGINEER THE BID ---
-    # Total Paid = Bid * (1 + BP + Tax)
-    # So: Bid = Total Paid / (1 + BP + Tax)
-    
-    bp = lot_data[0] if lot_data[0] > 0 else config.DEFAULT_BP
-    fee_multiplier = 1 + bp + config.TAX_RATE
-    
-    max_bid = allowable_spend / fee_multiplier
-    
-    # Safety Brake
-    if max_bid > config.HARD_MAX_BID_LIMIT:
-        max_bid = config.HARD_MAX_BID_LIMIT
-    
-    return round(max_bid, 2)
+def seconds_left(minutes_left, last_seen, now=None):
+    """
+    minutes_left as the scraper saw it, aged by how long ago that was
+    (last_seen is UTC CURRENT_TIMESTAMP). Only a fallback: the lot page's
+    own clock, read when its page is warmed, wins.
+    """
+    now = now or datetime.utcnow()
+    try:
+        age = (now - datetime.strptime(str(last_seen)[:19], "%Y-%m-%d %H:%M:%S")).total_seconds()
+    except (TypeError, ValueError):
+        age = 0
+    return max(0.0, minutes_left * 60 - max(age, 0))
 
-async def run_bidder():
-    async with aiosqlite.connect(DB_NAME) as db:
-        # Get Valued items that we haven't bid on yet
-        query = "SELECT lot_id, title, url, market_value, buyers_premium, shipping_available FROM lots WHERE status='valued' AND market_value > 0"
-        async with db.execute(query) as cursor:
-            candidates = await cursor.fetchall()
+async def run_bidder(poll_seconds=60, headless=True):
+    metrics.stage("bidder")
+    db.run_write(comps.setup, path=DB_NAME)  # Columns the trust gate reads
+    async with BiddingService(headless=headless) as service:
+        try:
+            while True:
+                candidates = await fetch_candidates()
 
-        if not candidates:
-            print("No valued items found.")
-            return
+                if not candidates:
+                    print("No valued items ending soon.")
+                else:
+                    # One vectorized pass over every candidate instead of per-lot math
+                    with metrics.timer("pricing"):
+                        limits = pricing.max_bid_array(
+                            [c[3] for c in candidates],
+                            [c[4] for c in candidates]
+                        )
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False) # Keep False to see it work
-            context = await browser.new_context()
-            page = await context.new_page()
+                    # Warm the pages of the lots that end first
+                    soonest = sorted(zip(candidates, limits), key=lambda x: x[0][5])
+                    with metrics.timer("warm_pages"):
+                        page_left = await service.warm([(lot[0], lot[2]) for lot, limit in soonest if limit > 1])
 
-            # Login
-            print("Logging in...")
-            await page.goto("https://hibid.com/login")
-            await page.fill("#username", config.HIBID_USERNAME)
-            await page.fill("#password", config.HIBID_PASSWORD)
-            await page.click("button[type='submit']")
-            await page.wait_for_url("**/home**", timeout=20000)
+                    for lot, my_limit in soonest:
+                        lot_id, title, url, mkt_val, bp, minutes_left, last_seen = lot
 
-            for lot in candidates:
-                lot_id, title, url, mkt_val, bp, shipping = lot
-                
-                my_limit = await calculate_max_bid(mkt_val, (bp, shipping))
-                
-                if my_limit <= 1: continue
+                        if my_limit <= 1: continue
 
-                print(f"Checking: {title} | Value: ${mkt_val} | My Limit: ${my_limit}")
-                
-                # Navigate and Bid logic here
-                # (Dry Run Only logic is enabled in config)
-                if config.DRY_RUN:
-                    print(f"  [DRY RUN] Would bid ${my_limit}")
-                
-                await asyncio.sleep(2)
+                        # Re-scheduled every poll: a fresher end time moves the snipe
+                        left = page_left.get(lot_id)
+                        if left is None:
+                            left = seconds_left(minutes_left, last_seen)
+                            metrics.count("end_time_from_db")
+                        print(f"Scheduling: {title} | Value: ${mkt_val} | My Limit: ${my_limit} | Ends in {left:.0f}s")
+                        service.schedule_snipe(lot_id, url, float(my_limit), left)
+                        metrics.count("snipes_scheduled")
 
-            await browser.close()
+                print(f"[*] {service.latency_report()}")
+                # Keeps the pool lease alive, swaps in a fresh browser once this one is due for recycling
+                await service.maintain()
+                metrics.count("polls")
+                # Never exits on its own: .prom every poll, a JSON line every SNAPSHOT_EVERY_SECONDS
+                metrics.write()
+                await asyncio.sleep(poll_seconds)
+        finally:
+            # Leaving the service cancels any snipes still waiting
+            print(f"[*] {service.latency_report()}")
 
 if __name__ == '__main__':
-    asyncio.run(run_bidder())
\ No newline at end of file
+    asyncio.run(run_bidder())
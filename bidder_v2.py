@@ -1,85 +1,126 @@
 import asyncio
-import aiosqlite
-import random
-import requests
-from datetime import datetime
+import db
+import httpx
+import pricing
+import alerts
+import metrics
+import comps
 
 # --- CONFIGURATION ---
 DB_NAME = "hibid_lots.db"
-MY_MAX_BID_PERCENT = 0.70 
-MIN_PROFIT_MARGIN = 40.0 
+# Profit rules live in config.py and are applied by pricing.py
 
 # --- YOUR DISCORD LINK (DO NOT SHARE THIS) ---
 DISCORD_WEBHOOK = "https://discordapp.com/api/webhooks/1469494844824227924/HGLLuchNpK5gJYb0Sl05ZsE4a6gi4f_mYqUJudBa-Voa_FqC0bXR9fhv2hAfPnaEUZZJ"
 
-async def send_alert(lot_id, title, profit, url, img_url):
-    if "YOUR_WEBHOOK" in DISCORD_WEBHOOK: return 
-    
-    # Create the Rich Embed (The fancy card format)
-    embed = {
-        "title": f"💰 PROFIT ALERT: ${profit:.0f}",
-        "description": f"**{title}**\n[👉 Click to Bid]({url})",
-        "color": 5763719, # Green Color
-        "thumbnail": {"url": img_url},
-        "fields": [
-            {"name": "Est. Profit", "value": f"${profit:.2f}", "inline": True},
-            {"name": "Lot ID", "value": str(lot_id), "inline": True}
-        ],
-        "footer": {"text": f"Auction Bot • {datetime.now().strftime('%I:%M %p')}"}
-    }
-    
-    data = {
-        "content": "🚨 **New Deal Found!**", 
-        "embeds": [embed]
-    }
-    
-    try:
-        requests.post(DISCORD_WEBHOOK, json=data)
-    except Exception as e:
-        print(f"[!] Discord Alert Failed: {e}")
+# Candidates are read in pages of this size, alerts sent by at most N tasks at once
+PAGE_SIZE = 500
+MAX_CONCURRENCY = 4
+
+# Alerts for the same lot only go out again if profit moves into a new $25 band
+PROFIT_BAND = 25
+
+def make_dispatcher(client):
+    return alerts.AlertDispatcher(
+        [alerts.DiscordSink(DISCORD_WEBHOOK, client), alerts.StdoutSink()],
+        DB_NAME,
+        band_size=PROFIT_BAND,
+        name="bidder"
+    )
+
+@metrics.timed("db_read")
+async def fetch_candidates(after_id):
+    """
+    One bounded page of possibly-profitable lots. The pooled connection is
+    handed back before we return, so no read is held across network I/O.
+    """
+    # We look for PENDING items that have a VALUE > 0.
+    # Bid must be under value to ever be under our max -> cheap SQL prefilter
+    query = f"""
+        SELECT lot_id, title, current_bid, market_value, url, image_url, buyers_premium 
+        FROM lots 
+        WHERE status = 'pending' AND market_value > 0
+        AND {comps.TRUSTED_VALUE_SQL}
+        AND COALESCE(current_bid, 0) < market_value
+        AND lot_id > ?
+        ORDER BY lot_id
+        LIMIT ?
+    """
+    return await db.afetchall(query, (after_id, PAGE_SIZE), path=DB_NAME)
+
+@metrics.timed("pick_deals")
+def pick_deals(rows):
+    # THE DECISION MAKER (same rules as bidder / export / dashboard), whole page at once
+    current_bid = [r[2] for r in rows]
+    market_value = [r[3] for r in rows]
+    bp = [r[6] for r in rows]
+
+    limits = pricing.max_bid_array(market_value, bp)
+    profits = pricing.expected_profit_array(market_value, current_bid, bp)
+
+    deals = []
+    for row, limit, profit in zip(rows, limits, profits):
+        lot_id, title, bid, value, url, img, _ = row
+        if (bid or 0) < limit:
+            deals.append((lot_id, title, float(profit), url, img))
+    return deals
+
+async def handle_deals(dispatcher, deals, limiter):
+    async with limiter:
+        for lot_id, title, profit, url, img in deals:
+            print(f"[!] PROFITABLE: {title[:20]}... (Profit: ${profit:.0f})")
+
+        # ALERT PHONE (batched, rate-limited, de-duplicated)
+        with metrics.timer("alert_dispatch"):
+            return await dispatcher.dispatch([
+                dispatcher.make_deal(
+                    lot_id, title, profit, f"PROFIT ALERT: ${profit:.0f}",
+                    profit=profit, url=url, image_url=img
+                )
+                for lot_id, title, profit, url, img in deals
+            ])
 
 async def run_bidder():
     print("--- BIDDER V3.0 (ALERTS ACTIVE) ---")
+    metrics.stage("bidder_v2")
+    db.run_write(comps.setup, path=DB_NAME)  # Columns the trust gate reads
     
     try:
-        db = await aiosqlite.connect(DB_NAME)
-        
-        # We look for PENDING items that have a VALUE > 0
-        query = """
-            SELECT lot_id, title, current_bid, market_value, url, image_url, buyers_premium 
-            FROM lots 
-            WHERE status = 'pending' AND market_value > 0
-        """
-        
-        async with db.execute(query) as cursor:
-            rows = await cursor.fetchall()
-            
-            for row in rows:
-                lot_id, title, current_bid, market_value, url, img, bp = row
-                
-                # Default to 15% BP if missing
-                if bp is None: bp = 0.15
-                
-                # Math: Cost vs Value
-                total_cost = current_bid * (1 + bp)
-                my_limit = market_value * MY_MAX_BID_PERCENT
-                potential_profit = market_value - total_cost - 15 # Minus shipping est
-                
-                # THE DECISION MAKER
-                if total_cost < my_limit and potential_profit > MIN_PROFIT_MARGIN:
-                    print(f"[!] PROFITABLE: {title[:20]}... (Profit: ${potential_profit:.0f})")
-                    
-                    # ALERT PHONE
-                    await send_alert(lot_id, title, potential_profit, url, img)
-                    
-                    # SLOW DOWN (So we don't spam Discord too fast)
-                    await asyncio.sleep(2) 
-
-        await db.close()
+        limiter = asyncio.Semaphore(MAX_CONCURRENCY)
+        tasks = []
+        found = 0
+        after_id = ""
+
+        async with httpx.AsyncClient(timeout=10) as client:
+            dispatcher = make_dispatcher(client)
+
+            # Pages are read while earlier pages' alerts are still in flight
+            async with asyncio.TaskGroup() as group:
+                while True:
+                    rows = await fetch_candidates(after_id)
+                    if not rows:
+                        break
+                    after_id = rows[-1][0]
+
+                    deals = pick_deals(rows)
+                    if deals:
+                        found += len(deals)
+                        tasks.append(group.create_task(handle_deals(dispatcher, deals, limiter)))
+
+                    if len(rows) < PAGE_SIZE:
+                        break
+
+            dispatcher.close()
+
+        sent = sum(t.result() for t in tasks)
+        metrics.count("deals", found)
+        metrics.count("alerts_sent", sent)
+        print(f"[*] {sent} new alerts sent ({found - sent} already alerted)")
         print("--- BIDDER CYCLE COMPLETE ---")
         
     except Exception as e:
         print(f"[ERROR] Bidder Crash: {e}")
+        metrics.count("crashes")
 
 if __name__ == "__main__":
-    asyncio.run(run_bidder())
\ No newline at end of file
+    asyncio.run(run_bidder())
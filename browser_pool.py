@@ -0,0 +1,463 @@
+import json
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import URLError
+from urllib.parse import parse_qs, urlparse
+
+import browser_profile
+
+try:
+    import psutil  # Optional: RSS on every OS. Without it, Linux reads /proc
+except ImportError:
+    psutil = None
+
+# ============================================================
+# BROWSER POOL DAEMON
+#   python browser_pool.py serve     (leave it running)
+#   python browser_pool.py health
+# Keeps POOL_SIZE warm Chromium instances (remote debugging on)
+# and lends them out to stages over a tiny localhost HTTP API.
+# Selenium stages attach with debuggerAddress, Playwright ones
+# with connect_over_cdp. A browser is restarted after
+# RECYCLE_AFTER_PAGES pages to keep leaks bounded. If the daemon
+# isn't running, stages just launch their own browser as before.
+# ============================================================
+
+POOL_HOST = "127.0.0.1"
+POOL_PORT = 9300
+FIRST_CDP_PORT = 9310
+
+POOL_SIZE = 3
+RECYCLE_AFTER_PAGES = 300
+LEASE_SECONDS = 30 * 60         # A stage that dies holding a browser gets it taken back
+CHECKOUT_WAIT = 60              # Seconds to wait for a free browser before giving up
+START_TIMEOUT = 20
+
+
+# ------------------------------
+# Memory
+# ------------------------------
+def _proc_tree_rss_mb(pid):
+    # Chromium is a process tree; count the renderers too
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            procs = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in procs) / (1024 * 1024)
+        except psutil.Error:
+            return None
+
+    if not os.path.isdir("/proc"):
+        return None
+
+    children, rss = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/statm") as f:
+                rss[int(entry)] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        total += rss.get(p, 0)
+        stack.extend(children.get(p, []))
+    return total / (1024 * 1024)
+
+
+# ------------------------------
+# One Pooled Browser
+# ------------------------------
+class PooledBrowser:
+    def __init__(self, index):
+        self.id = index
+        self.port = FIRST_CDP_PORT + index
+        self.proc = None
+        self.profile_dir = None
+        self.lease = None           # (stage, leased_at, ttl, nonce)
+        self.stale = False          # Needs a restart before it's lent out again
+        self.pages = 0
+        self.leases = 0
+        self.restarts = 0
+        self.started_at = None
+
+    @property
+    def address(self):
+        return f"{POOL_HOST}:{self.port}"
+
+    def _cdp(self, path, method="GET"):
+        req = urllib.request.Request(f"http://{self.address}{path}", method=method)
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return json.loads(resp.read() or b"null")
+
+    def start(self):
+        self.profile_dir = tempfile.mkdtemp(prefix=f"hibid_pool_{self.id}_")
+        args = [
+            browser_profile.CHROMIUM_PATH,
+            f"--remote-debugging-port={self.port}",
+            f"--remote-debugging-address={POOL_HOST}",
+            f"--user-data-dir={self.profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+        ] + browser_profile.lean_options().arguments + ["about:blank"]
+        self.proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + START_TIMEOUT
+        while time.time() < deadline:
+            try:
+                self._cdp("/json/version")
+                break
+            except (URLError, OSError):
+                time.sleep(0.2)
+        else:
+            self.stop()
+            raise RuntimeError(f"Chromium on port {self.port} did not come up")
+
+        self.pages = 0
+        self.started_at = time.time()
+
+    def stop(self):
+        if self.proc is not None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+            self.proc = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+        self.restarts += 1
+
+    def alive(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return False
+        try:
+            self._cdp("/json/version")
+            return True
+        except (URLError, OSError):
+            return False
+
+    def reset(self):
+        # Fresh blank tab, everything the last stage opened closed
+        targets = [t for t in self._cdp("/json/list") if t.get("type") == "page"]
+        self._cdp("/json/new?about:blank", method="PUT")
+        for t in targets:
+            try:
+                self._cdp(f"/json/close/{t['id']}")
+            except (URLError, OSError):
+                pass
+
+    def stats(self):
+        stage, leased_at, _, _ = self.lease or (None, None, None, None)
+        return {
+            "id": self.id,
+            "address": self.address,
+            "pid": self.proc.pid if self.proc else None,
+            "alive": self.alive(),
+            "busy": stage,
+            "leased_for_s": round(time.time() - leased_at, 1) if leased_at else None,
+            "pages": self.pages,
+            "leases": self.leases,
+            "restarts": self.restarts,
+            "uptime_s": round(time.time() - self.started_at, 1) if self.started_at else None,
+            "rss_mb": round(_proc_tree_rss_mb(self.proc.pid), 1) if self.proc else None,
+        }
+
+
+# ------------------------------
+# Pool
+# ------------------------------
+class Pool:
+    def __init__(self, size=POOL_SIZE):
+        self.browsers = [PooledBrowser(i) for i in range(size)]
+        self.cond = threading.Condition()
+
+    def start(self):
+        for b in self.browsers:
+            b.start()
+            print(f"   Browser {b.id} warm on {b.address}")
+
+    def stop(self):
+        for b in self.browsers:
+            b.stop()
+
+    def _reclaim_expired(self):
+        # Called holding the lock: only flags them, the restart happens outside it
+        now = time.time()
+        for b in self.browsers:
+            if b.lease and b.lease[3] and b.lease[2] and now - b.lease[1] > b.lease[2]:
+                print(f"   Lease on browser {b.id} ({b.lease[0]}) expired, reclaiming")
+                b.lease = None
+                b.stale = True
+
+    def _release(self, b):
+        with self.cond:
+            b.lease = None
+            self.cond.notify()
+
+    def checkout(self, stage, ttl=LEASE_SECONDS, wait=CHECKOUT_WAIT):
+        """
+        Lease dict with a nonce that checkin() must present, or None. A dead or
+        stale browser is restarted after the lock is dropped, so /health and
+        other callers never wait on a Chromium start.
+        """
+        deadline = time.time() + wait
+        while True:
+            with self.cond:
+                b = None
+                while b is None:
+                    self._reclaim_expired()
+                    b = next((x for x in self.browsers if x.lease is None), None)
+                    if b is None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            return None
+                        self.cond.wait(min(remaining, 5))
+                nonce = secrets.token_hex(8)
+                b.lease = (stage, time.time(), ttl, nonce)
+                b.leases += 1
+
+            try:
+                if b.stale or not b.alive():
+                    b.restart()
+                    b.stale = False
+            except (URLError, OSError, RuntimeError) as e:
+                print(f"   Browser {b.id} failed to start: {e}")
+                b.stale = True
+                self._release(b)
+                if time.time() >= deadline:
+                    return None
+                continue
+            return {"id": b.id, "nonce": nonce, "debugger_address": b.address, "cdp": f"http://{b.address}"}
+
+    def checkin(self, browser_id, nonce, pages=0):
+        """
+        False if nonce isn't the current lease's (it expired and the browser
+        went to someone else): nothing is touched then.
+        """
+        with self.cond:
+            b = self.browsers[browser_id]
+            if not b.lease or b.lease[3] != nonce:
+                return False
+            # Not lendable while it's being reset, but no longer anyone's
+            b.lease = ("(reset)", time.time(), 0, None)
+            b.pages += pages
+
+        try:
+            if b.pages >= RECYCLE_AFTER_PAGES or not b.alive():
+                print(f"   Recycling browser {b.id} after {b.pages} pages")
+                b.restart()
+            else:
+                b.reset()
+        except (URLError, OSError, RuntimeError):
+            b.stale = True
+        self._release(b)
+        return True
+
+    def renew(self, browser_id, nonce):
+        """Restarts the lease's clock; False if it already expired (same rule as checkin)."""
+        with self.cond:
+            b = self.browsers[browser_id]
+            if not b.lease or b.lease[3] != nonce:
+                return False
+            b.lease = (b.lease[0], time.time(), b.lease[2], nonce)
+            return True
+
+    def health(self):
+        with self.cond:
+            browsers = list(self.browsers)
+        # CDP pings and RSS walks happen outside the lock
+        browsers = [b.stats() for b in browsers]
+        return {
+            "size": len(browsers),
+            "free": sum(1 for b in browsers if not b["busy"]),
+            "rss_mb": round(sum(b["rss_mb"] or 0 for b in browsers), 1),
+            "browsers": browsers,
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    pool = None
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            return self._reply(200, self.pool.health())
+        self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/checkout":
+            lease = self.pool.checkout(q.get("stage", "?"), float(q.get("ttl", LEASE_SECONDS)),
+                                       float(q.get("wait", CHECKOUT_WAIT)))
+            return self._reply(200, lease) if lease else self._reply(503, {"error": "no free browser"})
+
+        if url.path == "/checkin":
+            if not self.pool.checkin(int(q["id"]), q.get("nonce"), int(q.get("pages", 0))):
+                return self._reply(409, {"error": "lease expired or not yours"})
+            return self._reply(200, {"ok": True})
+
+        if url.path == "/renew":
+            if not self.pool.renew(int(q["id"]), q.get("nonce")):
+                return self._reply(409, {"error": "lease expired or not yours"})
+            return self._reply(200, {"ok": True})
+
+        self._reply(404, {"error": "not found"})
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(size=POOL_SIZE):
+    pool = Pool(size)
+    print(f"=== BROWSER POOL: starting {size} browsers ===")
+    pool.start()
+
+    _Handler.pool = pool
+    server = ThreadingHTTPServer((POOL_HOST, POOL_PORT), _Handler)
+    print(f"Listening on http://{POOL_HOST}:{POOL_PORT} (GET /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.stop()
+
+
+# ------------------------------
+# Client Side (used by the stages)
+# ------------------------------
+def _call(method, path, timeout=CHECKOUT_WAIT + 5):
+    req = urllib.request.Request(f"http://{POOL_HOST}:{POOL_PORT}{path}", method=method)
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def try_checkout(stage, ttl=LEASE_SECONDS):
+    """Lease dict, or None when the daemon isn't running / has nothing free."""
+    try:
+        return _call("POST", f"/checkout?stage={stage}&ttl={ttl}")
+    except (URLError, OSError, ValueError):
+        return None
+
+
+def checkin(lease, pages=0):
+    try:
+        _call("POST", f"/checkin?id={lease['id']}&nonce={lease['nonce']}&pages={pages}", timeout=30)
+    except (URLError, OSError, ValueError):
+        pass
+
+
+def renew(lease):
+    """Keeps a long-held lease from expiring; False once it's no longer ours."""
+    try:
+        return _call("POST", f"/renew?id={lease['id']}&nonce={lease['nonce']}", timeout=30)["ok"]
+    except (URLError, OSError, ValueError, KeyError):
+        return False
+
+
+def health():
+    return _call("GET", "/health", timeout=10)
+
+
+def _attach(lease):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    class PooledChrome(webdriver.Chrome):
+        # Counts navigations so the daemon knows when to recycle
+        pages = 0
+
+        def get(self, url):
+            self.pages += 1
+            return super().get(url)
+
+    options = Options()
+    options.debugger_address = lease["debugger_address"]
+    options.page_load_strategy = "eager"
+
+    driver = PooledChrome(service=Service(browser_profile.CHROMEDRIVER_PATH), options=options)
+    driver.set_page_load_timeout(browser_profile.PAGE_LOAD_TIMEOUT)
+    browser_profile.block_resources(driver)
+    return driver
+
+
+def acquire(stage):
+    """
+    Selenium driver for one stage run: a warm pooled browser if the daemon
+    is up, otherwise a freshly launched lean one. Hand it back with release().
+    """
+    lease = try_checkout(stage)
+    if lease is None:
+        d = browser_profile.get_driver()
+        d.pool_lease = None
+        return d
+
+    try:
+        d = _attach(lease)
+    except Exception:
+        # Never attached: hand the browser straight back, or the lease
+        # holds it until it expires (forever with ttl=0)
+        checkin(lease, 0)
+        raise
+    d.pool_lease = lease
+    return d
+
+
+def release(d):
+    if d.pool_lease is None:
+        d.quit()
+        return
+    # Stop only our chromedriver; the browser goes back to the pool
+    d.service.stop()
+    checkin(d.pool_lease, d.pages)
+
+
+@contextmanager
+def driver(stage):
+    d = acquire(stage)
+    try:
+        yield d
+    finally:
+        release(d)
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if cmd == "serve":
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else POOL_SIZE)
+    elif cmd == "health":
+        print(json.dumps(health(), indent=2))
+    else:
+        print("usage: python browser_pool.py [serve [size] | health]")
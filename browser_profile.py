@@ -0,0 +1,142 @@
+import sys
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+# ============================================================
+# LEAN SCRAPING BROWSER
+# We only read tile text, links and image URL strings, so the
+# browser doesn't need to download images, media, fonts, ads or
+# trackers. Shared by scraper_v9 and validator_v6.
+# ============================================================
+
+CHROMIUM_PATH = "/usr/bin/chromium"
+CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
+
+PAGE_LOAD_TIMEOUT = 30
+
+# Network.setBlockedURLs patterns (wildcards allowed)
+BLOCKED_URLS = [
+    # Images / media / fonts: <img src> is still in the DOM, just never fetched
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.mp3", "*.m3u8",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # Third-party ads / analytics / widgets
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*adservice.google.*", "*facebook.net*", "*facebook.com/tr*",
+    "*hotjar.com*", "*clarity.ms*", "*newrelic.com*", "*nr-data.net*", "*bing.com/bat*",
+    "*criteo.*", "*taboola.com*", "*outbrain.com*", "*amazon-adsystem.com*",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*", "*youtube.com*", "*ytimg.com*",
+]
+
+# JS: bytes over the wire since the last call. The document itself only counts
+# once, so in-page pagination (clicking Next) reports just that page's XHRs.
+PAGE_STATS_JS = """
+const first = !window.__pageStatsSeen;
+window.__pageStatsSeen = true;
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const res = performance.getEntriesByType('resource');
+let bytes = first ? (nav.transferSize || 0) : 0;
+for (const r of res) bytes += r.transferSize || 0;
+performance.clearResourceTimings();
+return {
+    load_ms: first ? (nav.domContentLoadedEventEnd || 0) : 0,
+    bytes: bytes,
+    requests: res.length + (first ? 1 : 0)
+};
+"""
+
+
+def lean_options(headless=True):
+    options = Options()
+    options.binary_location = CHROMIUM_PATH
+
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--mute-audio")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.default_content_setting_values.geolocation": 2,
+    })
+
+    # Return from driver.get() at DOMContentLoaded; the scrapers wait for the tiles themselves
+    options.page_load_strategy = "eager"
+    return options
+
+
+def block_resources(driver, patterns=BLOCKED_URLS):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+
+def get_driver(headless=True, lean=True):
+    """
+    One driver per process; create it once and reuse it for every ZIP /
+    every eBay lookup. lean=False gives the old full-page profile (for comparisons).
+    """
+    if lean:
+        options = lean_options(headless)
+    else:
+        options = Options()
+        options.binary_location = CHROMIUM_PATH
+        if headless:
+            options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1920,1080")
+
+    driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
+    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+
+    if lean:
+        block_resources(driver)
+    return driver
+
+
+def page_stats(driver):
+    """{load_ms, bytes, requests} since the last call (or since driver.get)."""
+    try:
+        return driver.execute_script(PAGE_STATS_JS)
+    except Exception:
+        return {"load_ms": 0, "bytes": 0, "requests": 0}
+
+
+def format_stats(stats):
+    load = f"{stats['load_ms']:.0f} ms, " if stats["load_ms"] else ""
+    return f"{load}{stats['bytes'] / 1024:.0f} KB, {stats['requests']} requests"
+
+
+# ------------------------------
+# Before / After
+# ------------------------------
+def compare(url, runs=3):
+    for lean in (False, True):
+        driver = get_driver(lean=lean)
+        totals = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            driver.get(url)
+            wall = (time.perf_counter() - start) * 1000
+            stats = page_stats(driver)
+            totals.append((wall, stats["bytes"]))
+            print(f"   {'lean' if lean else 'full'}: get() {wall:.0f} ms | {format_stats(stats)}")
+        driver.quit()
+
+        wall = sum(t[0] for t in totals) / runs
+        kb = sum(t[1] for t in totals) / runs / 1024
+        print(f"{'LEAN' if lean else 'FULL'} profile: avg {wall:.0f} ms, {kb:.0f} KB per page\n")
+
+
+if __name__ == "__main__":
+    compare(sys.argv[1] if len(sys.argv) > 1 else "https://hibid.com/lots?zip=62629&miles=50&lot_type=ONLINE")
@@ -0,0 +1,238 @@
+import traceback
+
+import db
+
+# ============================================================
+# JOB CHECKPOINTS
+# A run of a long job (history scrape, validation) records what
+# it has finished as it goes. If it dies, the next run of the
+# same job resumes that run and skips everything already done,
+# so no network work is repeated -- unless it's older than the
+# job's max_age (a live scrape from yesterday isn't worth
+# resuming): then it's closed as 'stale' and a fresh run starts.
+# Errors are counted by where they happened + exception type
+# instead of being swallowed.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+DONE = "done"
+
+
+def setup(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            status TEXT DEFAULT 'running'
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_checkpoints (
+            run_id INTEGER,
+            key TEXT,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, key)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_errors (
+            run_id INTEGER,
+            error_type TEXT,
+            count INTEGER,
+            last_message TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (run_id, error_type)
+        )
+    """)
+
+
+def _start_or_resume(conn, job, max_age=None):
+    # Age = time since the run's last sign of life (its newest checkpoint, or its start)
+    row = conn.execute("""
+        SELECT r.run_id,
+               (julianday('now') - julianday(MAX(r.started_at, COALESCE(MAX(c.updated_at), r.started_at)))) * 86400
+        FROM job_runs r
+        LEFT JOIN job_checkpoints c ON c.run_id = r.run_id
+        WHERE r.job=? AND r.status='running'
+        GROUP BY r.run_id
+        ORDER BY r.run_id DESC LIMIT 1
+    """, (job,)).fetchone()
+    if row and (max_age is None or row[1] <= max_age):
+        return row[0], True
+    if row:
+        print(f"[checkpoint] {job} run #{row[0]} idle for {row[1] / 60:.0f} min, not resuming it.")
+        conn.execute("""
+            UPDATE job_runs SET status='stale', finished_at=CURRENT_TIMESTAMP
+            WHERE job=? AND status='running'
+        """, (job,))
+    cur = conn.execute("INSERT INTO job_runs (job) VALUES (?)", (job,))
+    return cur.lastrowid, False
+
+
+# ------------------------------
+# Error Counter
+# ------------------------------
+class ErrorCounter:
+    """
+    count("parse_card", exc) -> bumps "parse_card/NoSuchElementException".
+    Kept in memory and flushed with the next checkpoint.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.last = {}
+        self._dirty = set()
+
+    def count(self, where, exc):
+        kind = f"{where}/{type(exc).__name__}"
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.last[kind] = str(exc).strip().splitlines()[0][:300] if str(exc).strip() else ""
+        self._dirty.add(kind)
+        return kind
+
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        if not self.counts:
+            return "no errors"
+        parts = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        return ", ".join(f"{kind} x{n}" for kind, n in parts)
+
+    def _pending_rows(self, run_id):
+        rows = [(run_id, kind, self.counts[kind], self.last[kind]) for kind in self._dirty]
+        self._dirty.clear()
+        return rows
+
+
+# ------------------------------
+# Job
+# ------------------------------
+class Job:
+    def __init__(self, name, path=DB, max_age=None):
+        """max_age: seconds a crashed run stays resumable (None: forever)."""
+        self.name = name
+        self.path = path
+        self.errors = ErrorCounter()
+
+        def begin(conn):
+            setup(conn)
+            return _start_or_resume(conn, name, max_age)
+
+        self.run_id, self.resumed = db.run_write(begin, path=path)
+        self.state = dict(db.fetchall(
+            "SELECT key, value FROM job_checkpoints WHERE run_id=?", (self.run_id,), path=path
+        ))
+
+        if self.resumed:
+            done = sum(1 for v in self.state.values() if v == DONE)
+            print(f"[checkpoint] Resuming {name} run #{self.run_id}: {done} items already done.")
+
+    # ------------------------------
+    # Checkpoints
+    # ------------------------------
+    def done(self, key):
+        return self.state.get(str(key)) == DONE
+
+    def get(self, key, default=None):
+        return self.state.get(str(key), default)
+
+    def set(self, key, value):
+        """Durable once this returns (waits for the writer's commit)."""
+        key, value = str(key), str(value)
+        self.state[key] = value
+        rows = self.errors._pending_rows(self.run_id)
+
+        def save(conn):
+            conn.execute("""
+                INSERT INTO job_checkpoints (run_id, key, value, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(run_id, key) DO UPDATE SET value=excluded.value, updated_at=CURRENT_TIMESTAMP
+            """, (self.run_id, key, value))
+            _save_errors(conn, rows)
+
+        db.run_write(save, path=self.path)
+
+    def mark_done(self, key):
+        self.set(key, DONE)
+
+    # ------------------------------
+    # Errors
+    # ------------------------------
+    def error(self, where, exc, key=None):
+        kind = self.errors.count(where, exc)
+        label = f" [{key}]" if key is not None else ""
+        print(f"   ⚠️ {kind}{label}: {self.errors.last[kind]}")
+        # Queued, not awaited: errors are rare, and a hard crash shouldn't lose them
+        db.writer(self.path).submit(_save_errors, self.errors._pending_rows(self.run_id))
+        return kind
+
+    def finish(self, status="complete"):
+        rows = self.errors._pending_rows(self.run_id)
+
+        def close(conn):
+            _save_errors(conn, rows)
+            conn.execute("""
+                UPDATE job_runs SET status=?, finished_at=CURRENT_TIMESTAMP WHERE run_id=?
+            """, (status, self.run_id))
+
+        db.run_write(close, path=self.path)
+        print(f"[checkpoint] {self.name} run #{self.run_id} {status}: {self.errors.summary()}")
+
+    # ------------------------------
+    # with Job(...) as job:  -> finished only if the body didn't raise
+    # ------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            # Leave the run 'running' so the next start resumes it; keep the error counts
+            self.errors.count("crash", exc)
+            rows = self.errors._pending_rows(self.run_id)
+            db.run_write(_save_errors, rows, path=self.path)
+            print(f"[checkpoint] {self.name} run #{self.run_id} crashed, will resume:\n"
+                  + "".join(traceback.format_exception_only(exc_type, exc)).strip())
+        return False
+
+
+def _save_errors(conn, rows):
+    conn.executemany("""
+        INSERT INTO job_errors (run_id, error_type, count, last_message, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(run_id, error_type) DO UPDATE SET
+            count=excluded.count,
+            last_message=excluded.last_message,
+            updated_at=CURRENT_TIMESTAMP
+    """, rows)
+
+
+def report(job=None, limit=10):
+    """Recent runs with their error breakdown."""
+    where, params = ("WHERE job=?", (job,)) if job else ("", ())
+    runs = db.fetchall(f"""
+        SELECT run_id, job, status, started_at, finished_at FROM job_runs
+        {where} ORDER BY run_id DESC LIMIT ?
+    """, (*params, limit), path=DB)
+    for run_id, name, status, started, finished in runs:
+        done = db.fetchall(
+            "SELECT COUNT(*) FROM job_checkpoints WHERE run_id=? AND value=?", (run_id, DONE), path=DB
+        )[0][0]
+        print(f"#{run_id} {name:<14} {status:<9} {started} -> {finished or '...'}  done={done}")
+        for kind, n, msg in db.fetchall(
+            "SELECT error_type, count, last_message FROM job_errors WHERE run_id=? ORDER BY count DESC",
+            (run_id,), path=DB
+        ):
+            print(f"      {n:>5} x {kind}  ({msg[:80]})")
+
+
+if __name__ == "__main__":
+    import sys
+    db.run_write(setup, path=DB)
+    report(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,433 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+import db
+import title_normalizer
+import archive_history
+
+# ============================================================
+# LOCAL COMP ENGINE
+# TF-IDF over sold_history titles. For every pending lot, the K
+# most similar sold lots (cosine) give a value estimate from
+# their final prices -- no eBay fetch needed when the comps are
+# good enough. validator_v6 only picks up what this leaves empty.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+K = 10
+MIN_SIMILARITY = 0.35     # A comp below this isn't really the same kind of item
+MIN_COMPS = 3             # Need at least this many comps above MIN_SIMILARITY to trust the estimate
+MAX_DF = 0.25             # Terms in more than 25% of sold titles carry no signal ("lot", "box")
+MIN_PRICE = 1.0
+MIN_CALIBRATION_PAIRS = 20
+
+# (query, sold lot) pairs expanded per batch in query_many
+BATCH_PAIRS = 2_000_000
+
+# A comps market_value is an estimate: the bidders only act on one backed by
+# this much evidence. eBay values (and pre-comps rows) always count.
+BID_MIN_COMPS = 6
+BID_MIN_SIMILARITY = 0.6
+TRUSTED_VALUE_SQL = f"""(
+    COALESCE(value_source, 'ebay') = 'ebay'
+    OR (comp_count >= {BID_MIN_COMPS} AND comp_similarity >= {BID_MIN_SIMILARITY})
+)"""
+
+
+# ------------------------------
+# Tokenizing
+# ------------------------------
+def tokenize(title):
+    # Brand kept as one term so "black decker" doesn't also match "black" lamps
+    n = title_normalizer.normalize(title)
+    return ([n.brand] if n.brand else []) + [w for w in n.tokens if len(w) > 1]
+
+
+# ------------------------------
+# Index
+# ------------------------------
+class CompIndex:
+    """
+    Inverted index of L2-normalised TF-IDF vectors, one per sold lot.
+    Postings are stored as flat arrays sorted by term, so a query is a
+    handful of slices + one np.bincount.
+    """
+
+    def __init__(self, lot_ids, titles, prices, max_df=MAX_DF):
+        self.lot_ids = np.asarray(lot_ids, dtype=object)
+        self.prices = np.asarray(prices, dtype=float)
+
+        docs = [tokenize(t) for t in titles]
+        n = len(docs)
+
+        # term -> document frequency
+        df = {}
+        for words in docs:
+            for w in set(words):
+                df[w] = df.get(w, 0) + 1
+
+        limit = max(1, int(max_df * n)) if n >= 20 else n
+        self.vocab = {w: i for i, w in enumerate(sorted(w for w, c in df.items() if c <= limit))}
+        self.idf = np.zeros(len(self.vocab))
+        for w, i in self.vocab.items():
+            self.idf[i] = np.log((1 + n) / (1 + df[w])) + 1
+
+        rows, terms, weights = [], [], []
+        for r, words in enumerate(docs):
+            vec = self._vector(words)
+            rows.extend([r] * len(vec))
+            terms.extend(vec.keys())
+            weights.extend(vec.values())
+
+        terms = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        self.post_rows = np.asarray(rows, dtype=np.int64)[order]
+        self.post_weights = np.asarray(weights, dtype=float)[order]
+        self.post_start = np.searchsorted(terms[order], np.arange(len(self.vocab) + 1))
+
+    def __len__(self):
+        return len(self.lot_ids)
+
+    def _vector(self, words):
+        """term index -> normalised tf-idf weight"""
+        tf = {}
+        for w in words:
+            i = self.vocab.get(w)
+            if i is not None:
+                tf[i] = tf.get(i, 0) + 1
+
+        vec = {i: c * self.idf[i] for i, c in tf.items()}
+        norm = np.sqrt(sum(v * v for v in vec.values()))
+        return {i: v / norm for i, v in vec.items()} if norm else {}
+
+    def query(self, title, k=K, exclude=None):
+        """
+        Returns (rows, similarities) of the k nearest sold lots, best first.
+        exclude: lot_id to leave out (for scoring a lot that has itself sold).
+        """
+        _, rows, sims = self.query_many([title], k, None if exclude is None else [exclude])
+        return rows, sims
+
+    def query_many(self, titles, k=K, exclude=None):
+        """
+        query() for a whole batch of titles as one sparse (title x sold lot)
+        product. Returns flat (query, rows, similarities) arrays: each query's
+        top k, grouped by query, best first. exclude: one lot_id per title.
+        """
+        q_idx, q_terms, q_weights = [], [], []
+        for qi, title in enumerate(titles):
+            vec = self._vector(tokenize(title))
+            q_idx.extend([qi] * len(vec))
+            q_terms.extend(vec.keys())
+            q_weights.extend(vec.values())
+
+        q_idx = np.asarray(q_idx, dtype=np.int64)
+        q_terms = np.asarray(q_terms, dtype=np.int64)
+        q_weights = np.asarray(q_weights, dtype=float)
+
+        skip = None
+        if exclude is not None:
+            row_of = {lot_id: r for r, lot_id in enumerate(self.lot_ids)}
+            skip = np.asarray([row_of.get(e, -1) for e in exclude], dtype=np.int64)
+
+        lengths = self.post_start[q_terms + 1] - self.post_start[q_terms]
+
+        # Whole queries per batch, so a batch never holds more than BATCH_PAIRS pairs
+        per_query = np.cumsum(np.bincount(q_idx, lengths, minlength=len(titles)))
+        out = []
+        lo = 0
+        while lo < len(titles):
+            done = per_query[lo - 1] if lo else 0
+            hi = max(lo + 1, int(np.searchsorted(per_query, done + BATCH_PAIRS, side="right")))
+            a, b = np.searchsorted(q_idx, [lo, hi])
+            out.append(self._top_k(q_idx[a:b], q_terms[a:b], q_weights[a:b], lengths[a:b], k, skip))
+            lo = hi
+
+        if not out:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return tuple(np.concatenate(parts) for parts in zip(*out))
+
+    def _top_k(self, q_idx, q_terms, q_weights, lengths, k, skip):
+        # Expand every query term into its postings
+        total = int(lengths.sum())
+        src = np.repeat(np.arange(len(lengths)), lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        at = self.post_start[q_terms][src] + offsets
+
+        qs = q_idx[src]
+        rows = self.post_rows[at]
+        weights = self.post_weights[at] * q_weights[src]
+        if skip is not None:
+            keep = rows != skip[qs]
+            qs, rows, weights = qs[keep], rows[keep], weights[keep]
+        if not len(qs):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+        # Sum per (query, sold lot): the cosine similarity
+        keys = qs * len(self) + rows
+        order = np.argsort(keys, kind="stable")
+        keys, weights = keys[order], weights[order]
+        pairs, first = np.unique(keys, return_index=True)
+        scores = np.add.reduceat(weights, first)
+        qs, rows = pairs // len(self), pairs % len(self)
+
+        # Best first within each query, keep the first k
+        order = np.lexsort((-scores, qs))
+        qs, rows, scores = qs[order], rows[order], scores[order]
+        rank = np.arange(len(qs)) - np.searchsorted(qs, qs)
+        keep = rank < k
+        return qs[keep], rows[keep], scores[keep]
+
+
+def estimate_many(index, titles, k=K, exclude=None):
+    """
+    Similarity-weighted median of each title's good comps' final prices.
+    Returns arrays (values, n_comps, best_lot_ids, mean_similarity); value is
+    NaN and best_lot_id None where there are fewer than MIN_COMPS good comps.
+    """
+    n = len(titles)
+    qs, rows, sims = index.query_many(titles, k, exclude)
+    keep = sims >= MIN_SIMILARITY
+    qs, rows, sims = qs[keep], rows[keep], sims[keep]
+
+    counts = np.bincount(qs, minlength=n)
+    trusted = counts >= MIN_COMPS
+    similarity = np.bincount(qs, sims, minlength=n) / np.maximum(counts, 1)
+
+    best = np.full(n, None, dtype=object)
+    heads, first = np.unique(qs, return_index=True)
+    best[heads] = index.lot_ids[rows[first]]
+
+    # Weighted median: first price (ascending) where the running weight reaches half
+    prices = index.prices[rows]
+    order = np.lexsort((prices, qs))
+    qs, prices, sims = qs[order], prices[order], sims[order]
+    cum = np.cumsum(sims)
+    start = np.searchsorted(qs, qs)
+    running = cum - (cum[start] - sims[start])
+    half = np.bincount(qs, sims, minlength=n)[qs] / 2
+    hit = running >= half - 1e-12
+    heads, first = np.unique(qs[hit], return_index=True)
+
+    values = np.full(n, np.nan)
+    values[heads] = prices[hit][first]
+    values[~trusted] = np.nan
+    best[~trusted] = None
+    return values, counts, best, similarity
+
+
+def estimate(index, title, k=K, exclude=None):
+    """
+    estimate_many for one title.
+    Returns (value, n_comps, best_lot_id) or (None, n_comps, None).
+    """
+    values, counts, best, _ = estimate_many(index, [title], k, None if exclude is None else [exclude])
+    if np.isnan(values[0]):
+        return None, int(counts[0]), None
+    return float(values[0]), int(counts[0]), best[0]
+
+
+def _scale(pairs):
+    """Median eBay / comp ratio over (comp_value, market_value) pairs."""
+    if len(pairs) < MIN_CALIBRATION_PAIRS:
+        return 1.0
+    pairs_arr = np.asarray(pairs, dtype=float)
+    return float(np.median(pairs_arr[:, 1] / pairs_arr[:, 0]))
+
+
+def fit_scale(index, truth):
+    """
+    Sold prices here are auction hammer prices; market_value is an eBay sold
+    average, which runs several times higher. The median ratio over lots that
+    have both maps one onto the other. Returns (scale, pairs).
+    """
+    if not truth:
+        return 1.0, []
+    lot_ids, titles, market_values = zip(*truth)
+    values, _, _, _ = estimate_many(index, titles, exclude=lot_ids)
+    pairs = [(v, mv) for v, mv in zip(values, market_values) if v == v and v]
+    return _scale(pairs), pairs
+
+
+# ------------------------------
+# DB
+# ------------------------------
+def setup(conn):
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(lots)")}
+    for name, col_type in [("comp_value", "REAL"), ("comp_count", "INTEGER"),
+                           ("comp_lot_id", "TEXT"), ("comp_similarity", "REAL"),
+                           ("value_source", "TEXT")]:
+        if name not in cols:
+            conn.execute(f"ALTER TABLE lots ADD COLUMN {name} {col_type}")
+
+    # One (comp estimate, eBay value) pair per eBay-valued lot, kept between
+    # runs so only new / re-valued lots are estimated for the scale
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS comp_calibration (
+            lot_id TEXT PRIMARY KEY,
+            market_value REAL,
+            comp_value REAL,
+            index_size INTEGER
+        )
+    """)
+
+
+def load_index(conn):
+    sold = pd.read_sql_query(f"""
+        SELECT lot_id, title, final_price
+        FROM {archive_history.all_lots(conn)}
+        WHERE status='sold_history'
+        AND final_price >= ?
+    """, conn, params=(MIN_PRICE,))
+    return CompIndex(sold["lot_id"], sold["title"], sold["final_price"])
+
+
+def load_ebay_values(conn, index_size=None):
+    """
+    (lot_id, title, market_value) of every eBay-valued lot. With index_size,
+    only those comp_calibration has no current pair for: new, re-valued, or
+    without comps last time and the index has since doubled.
+    """
+    # Lots valued before value_source existed all came from eBay
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(lots)")}
+    source = "COALESCE(l.value_source, 'ebay')" if "value_source" in cols else "'ebay'"
+    query = f"""
+        SELECT l.lot_id, l.title, l.market_value
+        FROM {archive_history.all_lots(conn)} l
+    """
+    params = ()
+    if index_size is not None:
+        query += """
+        LEFT JOIN comp_calibration c ON c.lot_id = l.lot_id
+        """
+    query += f"WHERE l.market_value > 0 AND {source} = 'ebay'"
+    if index_size is not None:
+        query += """
+        AND (c.lot_id IS NULL
+             OR c.market_value != l.market_value
+             OR (c.comp_value IS NULL AND c.index_size * 2 <= ?))
+        """
+        params = (index_size,)
+    return conn.execute(query, params).fetchall()
+
+
+def _save_calibration(conn, truth, values, index_size):
+    conn.executemany(
+        "INSERT OR REPLACE INTO comp_calibration VALUES (?, ?, ?, ?)",
+        [(lot_id, market_value, None if v != v else float(v), index_size)
+         for (lot_id, _, market_value), v in zip(truth, values)]
+    )
+
+
+def _save_comps(conn, rows, scale):
+    conn.executemany("""
+        UPDATE lots
+        SET comp_value = ?, comp_count = ?, comp_lot_id = ?, comp_similarity = ?,
+            market_value = CASE WHEN ? IS NOT NULL AND (COALESCE(market_value, 0) = 0 OR value_source = 'comps')
+                                THEN ? ELSE market_value END,
+            value_source = CASE WHEN ? IS NOT NULL AND (COALESCE(market_value, 0) = 0 OR value_source = 'comps')
+                                THEN 'comps' ELSE value_source END
+        WHERE lot_id = ?
+    """, [
+        (v, n, best, sim, v, v * scale if v is not None else None, v, lot_id)
+        for lot_id, v, n, best, sim in rows
+    ])
+
+
+# ------------------------------
+# Runs
+# ------------------------------
+def run_comps():
+    """
+    One batched pass over every pending lot. Lots with enough comps get
+    comp_value (expected hammer price), and market_value (comp_value scaled
+    to eBay terms) if eBay hasn't valued them yet. The bidders only act on
+    the latter when it passes TRUSTED_VALUE_SQL.
+    """
+    start = time.perf_counter()
+    db.run_write(setup, path=DB)
+
+    conn = db.connect(DB, readonly=True)
+    index = load_index(conn)
+    pending = conn.execute("SELECT lot_id, title FROM lots WHERE status='pending'").fetchall()
+    truth = load_ebay_values(conn, index_size=len(index))
+    conn.close()
+
+    if not len(index):
+        print("Comps: no sold history yet.")
+        return 0
+
+    if truth:
+        # Sold lots can be eBay-valued too: never their own comp
+        values, _, _, _ = estimate_many(index, [t for _, t, _ in truth], exclude=[i for i, _, _ in truth])
+        db.run_write(_save_calibration, truth, values, len(index), path=DB)
+    pairs = db.fetchall(
+        "SELECT comp_value, market_value FROM comp_calibration WHERE comp_value > 0", path=DB
+    )
+    scale = _scale(pairs)
+
+    # Pending lots are never in the sold index, nothing to exclude
+    values, counts, best, similarity = estimate_many(index, [t for _, t in pending])
+    results = [
+        (lot_id, None if v != v else float(v), int(n), b, float(sim))
+        for (lot_id, _), v, n, b, sim in zip(pending, values, counts, best, similarity)
+    ]
+
+    db.run_write(_save_comps, results, scale, path=DB)
+
+    valued = sum(1 for r in results if r[1] is not None)
+    elapsed = time.perf_counter() - start
+    print(f"Comps: {valued}/{len(pending)} pending lots valued from {len(index)} sold lots "
+          f"(eBay scale x{scale:.2f}, {len(truth)} new calibration lots) in {elapsed:.1f}s.")
+    return valued
+
+
+def evaluate():
+    """
+    Precision against the eBay values we already have: every lot with an
+    eBay market_value is priced from its comps (never itself) and compared.
+    """
+    conn = db.connect(DB, readonly=True)
+    index = load_index(conn)
+    truth = load_ebay_values(conn)
+    conn.close()
+
+    print(f"Sold lots indexed:  {len(index)}")
+    print(f"eBay-valued lots:   {len(truth)}")
+    if not truth:
+        return
+
+    scale, pairs = fit_scale(index, truth)
+    print(f"Coverage:           {len(pairs)}/{len(truth)} ({len(pairs) / len(truth):.0%})")
+    if not pairs:
+        return
+
+    pairs = np.asarray(pairs)
+    print(f"eBay scale:         x{scale:.2f}")
+    for label, s in (("raw", 1.0), ("scaled", scale)):
+        err = np.abs(pairs[:, 0] * s - pairs[:, 1]) / pairs[:, 1]
+        print(f"  {label:<7} median abs error {np.median(err):.0%}, "
+              f"within ±25% {np.mean(err <= 0.25):.0%}, within ±50% {np.mean(err <= 0.5):.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Value pending lots from similar sold lots")
+    parser.add_argument("--eval", action="store_true", help="report precision against eBay values instead")
+    parser.add_argument("--title", help="show the comps for one title and exit")
+    args = parser.parse_args()
+
+    if args.title:
+        conn = db.connect(DB, readonly=True)
+        index = load_index(conn)
+        conn.close()
+        rows, sims = index.query(args.title)
+        for r, s in zip(rows, sims):
+            print(f"{s:.2f}  ${index.prices[r]:>8.2f}  {index.lot_ids[r]}")
+        print(estimate(index, args.title))
+    elif args.eval:
+        evaluate()
+    else:
+        run_comps()
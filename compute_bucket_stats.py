@@ -0,0 +1,59 @@
+import db
+import pandas as pd
+import pricing
+import archive_history
+import analytics
+import metrics
+
+DB = "hibid_lots.db"
+
+metrics.stage("compute_bucket_stats")
+
+conn = db.connect(DB)
+cursor = conn.cursor()
+
+cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bucket_stats (
+        bucket TEXT PRIMARY KEY,
+        median_price REAL,
+        total_sold INTEGER,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+""")
+
+if analytics.enabled():
+    # Columnar mirror (analytics.py) instead of pulling every sold price out of SQLite
+    with metrics.timer("analytics_sync"):
+        analytics.sync(DB)
+    with metrics.timer("analytics_query"):
+        stats = analytics.bucket_stats()
+    rows = [(r.bucket, float(r.median_price), int(r.total_sold)) for r in stats.itertuples(index=False)]
+else:
+    # Only the one column we need, straight into a float array
+    with metrics.timer("db_read"):
+        prices = pd.read_sql_query(f"""
+            SELECT final_price
+            FROM {archive_history.all_lots(conn)}
+            WHERE status='sold_history'
+            AND final_price IS NOT NULL
+        """, conn)["final_price"]
+    metrics.count("sold_prices", len(prices))
+
+    rows = []
+    if not prices.empty:
+        with metrics.timer("compute"):
+            buckets = pricing.assign_buckets(prices)
+            stats = prices.groupby(buckets).agg(["median", "count"])
+        rows = [(bucket, float(row["median"]), int(row["count"])) for bucket, row in stats.iterrows()]
+
+cursor.executemany("""
+    INSERT OR REPLACE INTO bucket_stats
+    (bucket, median_price, total_sold, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+""", rows)
+
+with metrics.timer("db_commit"):
+    conn.commit()
+conn.close()
+
+print("Bucket stats updated.")
@@ -1,48 +1,72 @@
-import sqlite3
+import db
 import statistics
+import archive_history
+import analytics
+import metrics
 
 DB = "hibid_lots.db"
 
-conn = sqlite3.connect(DB)
+metrics.stage("compute_category_stats")
+
+conn = db.connect(DB)
 cursor = conn.cursor()
 
-# Get all distinct categories
-cursor.execute("""
-    SELECT DISTINCT predicted_category
-    FROM lots
-    WHERE status='sold_history'
-    AND predicted_category IS NOT NULL
-""")
+def save(category, median_price, avg_price, avg_bid, total_sold):
+    cursor.execute("""
+        INSERT OR REPLACE INTO category_stats
+        (category, median_price, avg_price, avg_bid_count, total_sold)
+        VALUES (?, ?, ?, ?, ?)
+    """, (category, median_price, avg_price, avg_bid, total_sold))
+    metrics.count("categories_updated")
 
-categories = [row[0] for row in cursor.fetchall()]
+if analytics.enabled():
+    # Columnar mirror (analytics.py): one grouped pass instead of a scan per category
+    with metrics.timer("analytics_sync"):
+        analytics.sync(DB)
+    with metrics.timer("analytics_query"):
+        stats = analytics.category_stats()
+    for row in stats.itertuples(index=False):
+        save(row.category, float(row.median_price), float(row.avg_price),
+             float(row.avg_bid_count), int(row.total_sold))
+else:
+    # Sold history lives in lots_history once archive_history.py has run
+    source = archive_history.all_lots(conn)
 
-for category in categories:
-    cursor.execute("""
-        SELECT final_price, bid_count
-        FROM lots
+    # Get all distinct categories
+    cursor.execute(f"""
+        SELECT DISTINCT predicted_category
+        FROM {source}
         WHERE status='sold_history'
-        AND predicted_category = ?
-    """, (category,))
+        AND predicted_category IS NOT NULL
+    """)
+
+    categories = [row[0] for row in cursor.fetchall()]
+
+    for category in categories:
+        with metrics.timer("db_read_category"):
+            cursor.execute(f"""
+                SELECT final_price, bid_count
+                FROM {source}
+                WHERE status='sold_history'
+                AND predicted_category = ?
+            """, (category,))
     
-    rows = cursor.fetchall()
-    prices = [r[0] for r in rows if r[0] is not None]
-    bids = [r[1] for r in rows if r[1] is not None]
+            rows = cursor.fetchall()
+        prices = [r[0] for r in rows if r[0] is not None]
+        bids = [r[1] for r in rows if r[1] is not None]
 
-    if len(prices) == 0:
-        continue
+        if len(prices) == 0:
+            continue
 
-    median_price = statistics.median(prices)
-    avg_price = sum(prices) / len(prices)
-    avg_bid = sum(bids) / len(bids) if bids else 0
-    total_sold = len(prices)
+        median_price = statistics.median(prices)
+        avg_price = sum(prices) / len(prices)
+        avg_bid = sum(bids) / len(bids) if bids else 0
+        total_sold = len(prices)
 
-    cursor.execute("""
-        INSERT OR REPLACE INTO category_stats
-        (category, median_price, avg_price, avg_bid_count, total_sold)
-        VALUES (?, ?, ?, ?, ?)
-    """, (category, median_price, avg_price, avg_bid, total_sold))
+        save(category, median_price, avg_price, avg_bid, total_sold)
 
-conn.commit()
+with metrics.timer("db_commit"):
+    conn.commit()
 conn.close()
 
 print("Category stats updated.")
@@ -1,20 +1,24 @@
-import sqlite3
+import db
+import lot_events
+import metrics
+import price_forecast
 
 DB = "hibid_lots.db"
 
-conn = sqlite3.connect(DB)
+metrics.stage("compute_edge_score")
+
+conn = db.connect(DB)
 cursor = conn.cursor()
 
-cursor.execute("""
-UPDATE lots
-SET edge_score =
+EDGE_SCORE_SQL = """
     (
-        -- 1️⃣ Price Delta (normalized undervalue %)
+        -- 1️⃣ Price Delta (normalized undervalue %), against where the
+        --    price is forecast to close (price_forecast.py), not the bid now
         CASE
             WHEN predicted_value IS NOT NULL
                  AND predicted_value > 0
-                 AND current_bid IS NOT NULL
-            THEN ((predicted_value - current_bid) / predicted_value) * 40
+                 AND COALESCE(forecast_price, current_bid) IS NOT NULL
+            THEN ((predicted_value - COALESCE(forecast_price, current_bid)) / predicted_value) * 40
             ELSE 0
         END
     )
@@ -37,10 +41,39 @@ SET edge_score =
             ELSE 0
         END
     )
-WHERE status='pending';
-""")
+    -
+    (
+        -- 4️⃣ Forecast Uncertainty (a wide p10-p90 close range is a weaker deal)
+        CASE
+            WHEN forecast_high IS NOT NULL AND forecast_high > 0 AND forecast_low IS NOT NULL
+            THEN ((forecast_high - forecast_low) / forecast_high) * 10
+            ELSE 0
+        END
+    )
+"""
+
+lot_events.setup(conn)
+price_forecast.setup(conn)
+
+# Publish only the lots whose score actually moves (before overwriting it)
+with metrics.timer("publish_events"):
+    cursor.execute(f"""
+    INSERT INTO lot_events (lot_id, fields)
+    SELECT lot_id, json_object('edge_score', {EDGE_SCORE_SQL})
+    FROM lots
+    WHERE status='pending'
+    AND edge_score IS NOT ({EDGE_SCORE_SQL});
+    """)
+metrics.count("scores_changed", cursor.rowcount)
+
+with metrics.timer("db_update"):
+    cursor.execute(f"""
+    UPDATE lots
+    SET edge_score = {EDGE_SCORE_SQL}
+    WHERE status='pending';
+    """)
 
-conn.commit()
+    conn.commit()
 conn.close()
 
 print("Edge scores updated.")
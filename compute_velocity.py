@@ -1,31 +1,40 @@
-import sqlite3
+import db
+import metrics
 
 DB = "hibid_lots.db"
 
-conn = sqlite3.connect(DB)
+metrics.stage("compute_velocity")
+
+conn = db.connect(DB)
 cursor = conn.cursor()
 
-cursor.execute("""
-    SELECT lot_id, bid_count, minutes_left
-    FROM lots
-    WHERE status='pending'
-""")
+with metrics.timer("db_read"):
+    cursor.execute("""
+        SELECT lot_id, bid_count, minutes_left
+        FROM lots
+        WHERE status='pending'
+    """)
 
-rows = cursor.fetchall()
+    rows = cursor.fetchall()
 
+updates = []
 for lot_id, bid_count, minutes_left in rows:
     if bid_count is None or minutes_left is None:
         continue
     
     velocity = bid_count / (minutes_left + 1)
-    
-    cursor.execute("""
+    updates.append((velocity, lot_id))
+
+# One statement, one transaction
+with metrics.timer("db_write"):
+    cursor.executemany("""
         UPDATE lots
         SET velocity = ?
         WHERE lot_id = ?
-    """, (velocity, lot_id))
+    """, updates)
 
-conn.commit()
+    conn.commit()
+metrics.count("lots_updated", len(updates))
 conn.close()
 
 print("Velocity updated.")
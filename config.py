@@ -25,4 +25,10 @@ ESTIMATED_SHIPPING_COST = 15.00
 # --- FEES ---
 DEFAULT_BP = 0.15 
 TAX_RATE = 0.08 
-EBAY_FEES = 0.13
\ No newline at end of file
+EBAY_FEES = 0.13
+
+# --- BIDDING SERVICE (bid_service.py) ---
+HIBID_BASE_URL = "https://hibid.com"
+BID_PAGE_POOL_SIZE = 3          # Warm browser tabs shared by all snipes
+SNIPE_SECONDS_BEFORE_END = 8    # Place the bid this many seconds before the lot ends
+SNIPE_HORIZON_MINUTES = 30      # Only schedule snipes for lots ending within this window
@@ -0,0 +1,129 @@
+import csv
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# ============================================================
+# COVERAGE PLANNER
+# Target ZIPs searched with a radius overlap (62629 and 62704 are
+# ~7 miles apart with 50-mile radii). plan() drops targets the
+# others already cover, and SeenSet skips tiles another ZIP
+# already ingested this cycle. Centroids come from the bundled
+# zip_centroids.csv -- add a row when adding a target.
+# ============================================================
+
+CENTROIDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zip_centroids.csv")
+
+EARTH_RADIUS_MILES = 3958.8
+GRID = 80                 # Sample points per axis when measuring overlap
+COVER_THRESHOLD = 0.98    # A target this covered by the others adds nothing
+
+
+@lru_cache(maxsize=1)
+def load_centroids(path=CENTROIDS_FILE):
+    with open(path, newline="") as f:
+        return {row["zip"]: (float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)}
+
+
+def centroid(zip_code):
+    try:
+        return load_centroids()[zip_code]
+    except KeyError:
+        raise KeyError(f"ZIP {zip_code} is not in {os.path.basename(CENTROIDS_FILE)}; add its centroid") from None
+
+
+def distance_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+
+def _sample(zip_code, radius):
+    # Even grid over the circle (flat-earth is fine at these radii)
+    lat, lon = centroid(zip_code)
+    dlat = np.degrees(radius / EARTH_RADIUS_MILES)
+    dlon = dlat / np.cos(np.radians(lat))
+    lats, lons = np.meshgrid(np.linspace(lat - dlat, lat + dlat, GRID), np.linspace(lon - dlon, lon + dlon, GRID))
+    lats, lons = lats.ravel(), lons.ravel()
+    inside = distance_miles(lat, lon, lats, lons) <= radius
+    return lats[inside], lons[inside]
+
+
+def covered_fraction(target, others):
+    """
+    Share of target's circle that falls inside any of others.
+    target / others: (zip, radius)
+    """
+    lats, lons = _sample(*target)
+    if not others or not len(lats):
+        return 0.0
+
+    hit = np.zeros(len(lats), dtype=bool)
+    for zip_code, radius in others:
+        lat, lon = centroid(zip_code)
+        hit |= distance_miles(lat, lon, lats, lons) <= radius
+    return float(hit.mean())
+
+
+def plan(zip_codes, radius):
+    """
+    Minimal set of ZIP queries: go through targets, largest-coverage first,
+    and drop any the already-kept ones cover past COVER_THRESHOLD.
+    Prints the pairwise overlap so heavy overlaps are visible.
+    """
+    targets = [(z, radius) for z in dict.fromkeys(zip_codes)]
+
+    for i, a in enumerate(targets):
+        for b in targets[i + 1:]:
+            print(f"   Overlap {a[0]} ~ {b[0]}: {covered_fraction(a, [b]):.0%} of {a[0]}'s area")
+
+    # Whoever covers most of the others goes first
+    order = sorted(targets, key=lambda t: -sum(covered_fraction(o, [t]) for o in targets if o != t))
+    kept = []
+    for t in order:
+        if kept and covered_fraction(t, kept) >= COVER_THRESHOLD:
+            print(f"   Skipping {t[0]}: already covered by {', '.join(k[0] for k in kept)}")
+            continue
+        kept.append(t)
+
+    # Keep the caller's order for the ones that stay
+    keep = {k[0] for k in kept}
+    return [z for z, _ in targets if z in keep]
+
+
+# ------------------------------
+# Per-cycle Seen Set
+# ------------------------------
+class SeenSet:
+    """
+    lot_ids already ingested this cycle. Overlapping ZIPs return the same
+    tiles; only the first one seen is processed.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.total = 0
+        self.dupes = 0
+
+    def filter(self, items, key=lambda item: item[0]):
+        fresh = []
+        for item in items:
+            self.total += 1
+            lot_id = key(item)
+            if lot_id in self.ids:
+                self.dupes += 1
+                continue
+            self.ids.add(lot_id)
+            fresh.append(item)
+        return fresh
+
+    def report(self):
+        ratio = self.dupes / self.total if self.total else 0
+        return f"{self.dupes}/{self.total} duplicate tiles skipped ({ratio:.0%})"
+
+
+if __name__ == "__main__":
+    import scraper_v9
+    print(f"Active targets: {scraper_v9.ZIP_CODES} @ {scraper_v9.RADIUS} miles")
+    print(f"Plan: {plan(scraper_v9.ZIP_CODES, scraper_v9.RADIUS)}")
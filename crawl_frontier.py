@@ -0,0 +1,146 @@
+import json
+import time
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
+
+import db
+
+# ============================================================
+# CRAWL FRONTIER
+# Remembers which lot_ids each (source, ZIP, sort, page) held
+# last time, so the scrapers can stop once they're only seeing
+# pages they already know, and keeps a resumable cursor per city
+# so history backfills pick up where the last run stopped.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+KNOWN_PAGES_TO_STOP = 2         # Consecutive fully-known pages before we stop walking
+FULL_SWEEP_SECONDS = 6 * 3600   # Default full walk interval (the active scrape passes a shorter one)
+PAGE_PARAM = "apage"            # HiBid's page number query parameter
+
+
+def setup(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            source TEXT,
+            zip TEXT,
+            sort TEXT,
+            page INTEGER,
+            lot_ids TEXT,
+            n_new INTEGER,
+            crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, zip, sort, page)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_cursors (
+            source TEXT,
+            zip TEXT,
+            sort TEXT,
+            next_page INTEGER DEFAULT 1,
+            exhausted INTEGER DEFAULT 0,
+            full_sweep_at REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, zip, sort)
+        )
+    """)
+
+
+def page_url(base_url, page):
+    parts = urlparse(base_url)
+    query = dict(parse_qsl(parts.query))
+    query[PAGE_PARAM] = str(page)
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def known_lot_ids(ids, where="1=1"):
+    """
+    Which of ids are already stored (hot table or history).
+    where narrows it, e.g. "final_price IS NOT NULL" for history scrapes.
+    """
+    ids = list(ids)
+    if not ids:
+        return set()
+
+    marks = ", ".join("?" * len(ids))
+    tables = ["lots"]
+    if db.fetchall("SELECT 1 FROM sqlite_master WHERE name='lots_history'", path=DB):
+        tables.append("lots_history")
+
+    query = " UNION ".join(f"SELECT lot_id FROM {t} WHERE lot_id IN ({marks}) AND {where}" for t in tables)
+    return {r[0] for r in db.fetchall(query, ids * len(tables), path=DB)}
+
+
+class Frontier:
+    def __init__(self, source, zip_code, sort="default", stop_after=KNOWN_PAGES_TO_STOP,
+                 sweep_every=FULL_SWEEP_SECONDS):
+        self.key = (source, zip_code, sort)
+        self.stop_after = stop_after
+        self.sweep_every = sweep_every
+        self.streak = 0
+        db.run_write(setup, path=DB)
+
+    # ------------------------------
+    # Per-page tracking
+    # ------------------------------
+    def previous_ids(self, page):
+        rows = db.fetchall("""
+            SELECT lot_ids FROM crawl_pages
+            WHERE source=? AND zip=? AND sort=? AND page=?
+        """, (*self.key, page), path=DB)
+        return set(json.loads(rows[0][0])) if rows else set()
+
+    def observe(self, page, ids, known):
+        """
+        Record what page held. known: whether the caller considers this page
+        nothing-new (all ids stored, or same ids + no changed tiles).
+        """
+        ids = list(ids)
+        n_new = 0 if known else len(ids)
+        db.execute("""
+            INSERT OR REPLACE INTO crawl_pages (source, zip, sort, page, lot_ids, n_new, crawled_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (*self.key, page, json.dumps(ids), n_new), path=DB)
+
+        self.streak = self.streak + 1 if known and ids else 0
+
+    @property
+    def done(self):
+        return self.streak >= self.stop_after
+
+    # ------------------------------
+    # Resumable cursor
+    # ------------------------------
+    def _cursor(self):
+        rows = db.fetchall("""
+            SELECT next_page, exhausted, full_sweep_at FROM crawl_cursors
+            WHERE source=? AND zip=? AND sort=?
+        """, self.key, path=DB)
+        return rows[0] if rows else (1, 0, None)
+
+    def next_page(self):
+        return self._cursor()[0]
+
+    def exhausted(self):
+        return bool(self._cursor()[1])
+
+    def save_cursor(self, next_page, exhausted=False):
+        db.execute("""
+            INSERT INTO crawl_cursors (source, zip, sort, next_page, exhausted, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source, zip, sort) DO UPDATE SET
+                next_page=excluded.next_page,
+                exhausted=excluded.exhausted,
+                updated_at=CURRENT_TIMESTAMP
+        """, (*self.key, next_page, int(exhausted)), path=DB)
+
+    def full_sweep_due(self):
+        last = self._cursor()[2]
+        return last is None or time.time() - last >= self.sweep_every
+
+    def mark_full_sweep(self):
+        db.execute("""
+            INSERT INTO crawl_cursors (source, zip, sort, full_sweep_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(source, zip, sort) DO UPDATE SET full_sweep_at=excluded.full_sweep_at
+        """, (*self.key, time.time()), path=DB)
@@ -0,0 +1,363 @@
+# ============================================================
+# AUCTION COMMAND – DASHBOARD DATA LAYER
+# One pooled read-only connection per Streamlit server, query
+# results cached until the DB actually changes.
+# ============================================================
+
+import os
+import db
+import streamlit as st
+import pandas as pd
+
+import config
+import pricing
+import lot_events
+import archive_history
+import title_search
+import analytics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "hibid_lots.db")
+ANALYTICS_DIR = os.path.join(BASE_DIR, analytics.MIRROR_DIR)
+
+# The Active Hunt grid is virtualized, so a page can be large
+PAGE_SIZE = 500
+
+# How often the Active Hunt fragment polls lot_events for deltas
+LIVE_REFRESH_SECONDS = 5
+MAX_EVENTS_PER_POLL = 5000
+
+# Only what the Active Hunt tab actually renders
+ACTIVE_COLUMNS = [
+    "lot_id", "title", "url", "image_url", "current_bid", "bid_count",
+    "time_remaining", "minutes_left", "market_value", "buyers_premium",
+]
+
+SOLD_COLUMNS = ["title", "final_price", "bid_count", "last_seen"]
+
+SORTS = {
+    "Ending Soonest": "minutes_left ASC, lot_id",
+    "Best Deal": "deal_score DESC, minutes_left ASC, lot_id",
+    "Lowest Bid": "current_bid ASC, lot_id",
+}
+
+# The same orders as (column, ascending) for re-sorting a patched page
+SORT_COLUMNS = {
+    "Ending Soonest": [("minutes_left", True)],
+    "Best Deal": [("deal_score", False), ("minutes_left", True)],
+    "Lowest Bid": [("current_bid", True)],
+}
+
+# Fields that can move a lot onto a page it isn't on yet
+PLACEMENT_FIELDS = {"title", "status", "minutes_left", "current_bid"}
+
+# ===================== CONNECTION ======================
+
+def open_pool(path=DB_PATH):
+    # One read-only connection shared by every session: PRAGMA data_version
+    # is only comparable between answers from the same connection
+    return db.ReadPool(path, size=1, readonly=True)
+
+@st.cache_resource
+def get_pool():
+    return open_pool()
+
+def data_version():
+    # Bumps whenever ANOTHER connection commits (scraper, validator...)
+    with get_pool().connection() as conn:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def read_sql(query, params=()):
+    with get_pool().connection() as conn:
+        return pd.read_sql_query(query, conn, params=params)
+
+def has_table(name):
+    with get_pool().connection() as conn:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def _cached_query(query, params, version):
+    # `version` is only part of the cache key: a new data_version means new results
+    return read_sql(query, params)
+
+def run_query(query, params=()):
+    return _cached_query(query, tuple(params), data_version())
+
+# ===================== QUERIES ======================
+
+def all_lots():
+    # lots + lots_history (archive_history.py) once the split exists
+    with get_pool().connection() as conn:
+        return archive_history.all_lots(conn)
+
+def load_metrics():
+    return run_query(f"""
+        SELECT COUNT(*) as total,
+               SUM(CASE WHEN status='pending' THEN 1 ELSE 0 END) as active,
+               SUM(CASE WHEN status='sold_history' THEN 1 ELSE 0 END) as sold
+        FROM {all_lots()}
+    """)
+
+def deal_score_sql(bucket_medians):
+    """
+    SQL version of pricing.deal_score_array so "Best Deal" can be sorted and
+    paginated server-side. Returns (expression, params).
+    """
+    adjusted = f"(current_bid * {1 + config.DEFAULT_BP})"
+    whens = "\n".join(f"WHEN {adjusted} <= {edge} THEN ?" for edge in pricing.BUCKET_EDGES)
+    expected = f"CASE {whens} ELSE ? END"
+    params = [bucket_medians.get(b, 0) or 0 for b in pricing.BUCKET_LABELS]
+
+    expr = f"""
+        CASE
+            WHEN current_bid IS NULL OR current_bid = 0 THEN 0
+            ELSE MAX(0, MIN(100, ({expected} / {adjusted} - 1) * 100))
+        END
+    """
+    return expr, params
+
+def _active_filters(search, ending_soon):
+    where = ["status='pending'", "minutes_left > 0"]
+    params = []
+
+    fts_query = title_search.to_fts_query(search)
+    if fts_query and has_table(title_search.FTS_TABLE):
+        where.append(f"rowid IN ({title_search.match_rowids_sql()})")
+        params.append(fts_query)
+    elif search:
+        # Index not built yet (run title_search.py --rebuild)
+        where.append("title LIKE ?")
+        params.append(f"%{search}%")
+
+    if ending_soon:
+        where.append("minutes_left <= 60")
+
+    return " AND ".join(where), params
+
+def count_active_lots(search="", ending_soon=False):
+    where, params = _active_filters(search, ending_soon)
+    df = run_query(f"SELECT COUNT(*) AS n FROM lots WHERE {where}", params)
+    return int(df["n"].iloc[0] or 0)
+
+def load_active_lots(bucket_medians, search="", ending_soon=False,
+                     sort_by="Ending Soonest", page=1, page_size=PAGE_SIZE):
+    where, where_params = _active_filters(search, ending_soon)
+    score_expr, score_params = deal_score_sql(bucket_medians)
+    order = SORTS.get(sort_by, SORTS["Ending Soonest"])
+
+    query = f"""
+        SELECT {", ".join(ACTIVE_COLUMNS)}, {score_expr} AS deal_score
+        FROM lots
+        WHERE {where}
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    """
+    params = score_params + where_params + [page_size, (max(page, 1) - 1) * page_size]
+    return run_query(query, params)
+
+def load_active_lots_by_id(bucket_medians, lot_ids, search="", ending_soon=False):
+    """
+    The given lots as load_active_lots would return them, minus any that the
+    current filters exclude.
+    """
+    if not lot_ids:
+        return pd.DataFrame(columns=ACTIVE_COLUMNS + ["deal_score"])
+
+    where, where_params = _active_filters(search, ending_soon)
+    score_expr, score_params = deal_score_sql(bucket_medians)
+    marks = ", ".join("?" * len(lot_ids))
+
+    query = f"""
+        SELECT {", ".join(ACTIVE_COLUMNS)}, {score_expr} AS deal_score
+        FROM lots
+        WHERE {where} AND lot_id IN ({marks})
+    """
+    return run_query(query, score_params + where_params + list(lot_ids))
+
+def load_sold_archive(limit=200, search=""):
+    fts_query = title_search.to_fts_query(search)
+
+    if not fts_query or not has_table(title_search.FTS_TABLE):
+        return run_query(f"""
+            SELECT {", ".join(SOLD_COLUMNS)}
+            FROM {all_lots()}
+            WHERE status='sold_history'
+            ORDER BY final_price DESC
+            LIMIT ?
+        """, (limit,))
+
+    # bm25-ranked matches; FTS rowid > 0 points into lots, < 0 into lots_history
+    cols = ", ".join(f"l.{c}" for c in SOLD_COLUMNS)
+    hot = f"SELECT {cols}, m.score FROM m JOIN lots l ON l.rowid = m.rowid"
+    if has_table(archive_history.HISTORY_TABLE):
+        cold = f"SELECT {cols}, m.score FROM m JOIN {archive_history.HISTORY_TABLE} l ON l.rowid = -m.rowid"
+        hot = f"{hot} UNION ALL {cold}"
+
+    return run_query(f"""
+        WITH m AS (
+            SELECT rowid, bm25({title_search.FTS_TABLE}) AS score
+            FROM {title_search.FTS_TABLE}
+            WHERE {title_search.FTS_TABLE} MATCH ? AND status='sold_history'
+            ORDER BY score
+            LIMIT ?
+        )
+        SELECT {", ".join(SOLD_COLUMNS)} FROM ({hot}) ORDER BY score
+    """, (fts_query, limit))
+
+def load_historical_prices():
+    if analytics.enabled(ANALYTICS_DIR):
+        return analytics.sold_prices(ANALYTICS_DIR).to_frame()
+    return run_query(f"""
+        SELECT final_price
+        FROM {all_lots()}
+        WHERE status='sold_history'
+        AND final_price IS NOT NULL
+    """)
+
+def load_bucket_medians():
+    """
+    Bucket medians precomputed by compute_bucket_stats.py. Falls back to
+    computing them from the full sold history if the job hasn't run yet.
+    """
+    try:
+        df = run_query("SELECT bucket, median_price FROM bucket_stats")
+    except Exception:
+        df = pd.DataFrame()
+
+    if not df.empty:
+        return dict(zip(df["bucket"], df["median_price"]))
+
+    history = load_historical_prices()
+    return pricing.bucket_medians_from_prices(history["final_price"])
+
+# ===================== SOLD BREAKDOWNS ======================
+
+BREAKDOWNS = {
+    "Category": analytics.category_stats,
+    "Price Bucket": analytics.bucket_stats,
+    "Location": analytics.location_stats,
+}
+
+@st.cache_data(ttl=600, max_entries=16, show_spinner=False)
+def _cached_breakdown(by, version):
+    # `version` (the mirror's manifest mtime) is only part of the cache key
+    return BREAKDOWNS[by](ANALYTICS_DIR)
+
+def load_sold_breakdown(by):
+    """
+    Sold-history aggregates by category / bucket / location. Served from the
+    Parquet mirror (analytics.py) when it exists, else from SQLite.
+    """
+    if analytics.enabled(ANALYTICS_DIR):
+        version = os.path.getmtime(os.path.join(ANALYTICS_DIR, analytics.MANIFEST))
+        return _cached_breakdown(by, version)
+
+    if by == "Category":
+        return run_query("SELECT * FROM category_stats ORDER BY total_sold DESC")
+    if by == "Price Bucket":
+        return run_query("SELECT bucket, median_price, total_sold FROM bucket_stats")
+    # No MEDIAN in SQLite; averages only until the mirror is built
+    return run_query(f"""
+        SELECT location, AVG(final_price) AS avg_price, COUNT(final_price) AS total_sold
+        FROM {all_lots()}
+        WHERE status='sold_history' AND location IS NOT NULL
+        GROUP BY location
+        ORDER BY total_sold DESC
+    """)
+
+# ===================== LIVE DELTAS ======================
+
+def latest_event_id():
+    with get_pool().connection() as conn:
+        return lot_events.latest_id(conn)
+
+def fetch_events(last_id):
+    # Deliberately uncached: a tiny indexed read by primary key
+    with get_pool().connection() as conn:
+        return lot_events.fetch_since(conn, last_id, MAX_EVENTS_PER_POLL)
+
+def _sort_keys(df, sort_by):
+    """Rows of df as tuples that compare in the page's ORDER BY order."""
+    keys = []
+    for col, ascending in SORT_COLUMNS.get(sort_by, SORT_COLUMNS["Ending Soonest"]):
+        # SQLite sorts NULL first on ASC
+        values = pd.to_numeric(df[col], errors="coerce").fillna(float("-inf"))
+        keys.append(values if ascending else -values)
+    return list(zip(*keys))
+
+def _sorted_page(df, sort_by):
+    cols = SORT_COLUMNS.get(sort_by, SORT_COLUMNS["Ending Soonest"])
+    return df.sort_values(
+        [c for c, _ in cols] + ["lot_id"],
+        ascending=[a for _, a in cols] + [True],
+        na_position="first",
+        kind="stable",
+    ).reset_index(drop=True)
+
+def _enters_page(df, candidates, sort_by, page_size):
+    """
+    True if any candidate lot (already known to pass the filters) now sorts
+    at or before this page's last row. Landing on an earlier page shifts
+    this one too.
+    """
+    if candidates.empty:
+        return False
+    if len(df) < page_size:
+        return True
+
+    last = _sort_keys(df, sort_by)[-1]
+    return any(key <= last for key in _sort_keys(candidates, sort_by))
+
+def apply_events(df, events, bucket_medians, search="", ending_soon=False,
+                 sort_by="Ending Soonest", page_size=PAGE_SIZE):
+    """
+    Patches a loaded Active Hunt page with pipeline change events.
+    Returns (df, reload): lots that ended drop out; reload is True when the
+    page can't be patched in place — a new or off-page lot now belongs on
+    it, or a full page lost rows that the next page should backfill.
+    """
+    if not events:
+        return df, False
+
+    updates = pd.DataFrame([dict(fields, lot_id=lot_id) for _, lot_id, fields in events])
+    updates = updates.groupby("lot_id").last()
+
+    # Off-page lots: only the ones whose change could place them here are
+    # looked up, and only those that pass the filters can enter the page
+    on_page = updates.index.isin(df["lot_id"])
+    moved = [c for c in updates.columns if c in PLACEMENT_FIELDS]
+    off_page = updates[~on_page]
+    if moved:
+        off_page = off_page[off_page[moved].notna().any(axis=1)]
+    else:
+        off_page = off_page.iloc[0:0]
+
+    on_page_updates = updates[on_page]
+    full = len(df) >= page_size
+
+    if not on_page_updates.empty:
+        df = df.set_index("lot_id")
+        df.update(on_page_updates[[c for c in on_page_updates.columns if c in df.columns]])
+        df = df.reset_index()
+
+        if "status" in on_page_updates:
+            ended = on_page_updates.index[
+                on_page_updates["status"].notna() & (on_page_updates["status"] != "pending")
+            ]
+            df = df[~df["lot_id"].isin(ended)]
+        df = df[df["minutes_left"] > 0]
+
+        df["deal_score"] = pricing.deal_score_array(df["current_bid"], bucket_medians)
+        df = _sorted_page(df, sort_by)
+
+    if full and len(df) < page_size:
+        return df, True
+
+    if not off_page.empty:
+        candidates = load_active_lots_by_id(
+            bucket_medians, list(off_page.index), search, ending_soon
+        )
+        if _enters_page(df, candidates, sort_by, page_size):
+            return df, True
+
+    return df, False
@@ -4,11 +4,11 @@
 
 import os
 import streamlit as st
-import sqlite3
-import pandas as pd
+import time
+import numpy as np
 import yfinance as yf
-import plotly.express as px
 from datetime import datetime
+import pricing
 
 # ===================== CONFIG ======================
 
@@ -22,96 +22,35 @@ st.set_page_config(
 )
 
 # ===================== DATABASE ======================
-
-def get_db():
-    conn = sqlite3.connect(DB_PATH, timeout=30)
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
-
-def run_query(query, params=()):
-    conn = get_db()
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
-
-    df = pd.read_sql_query("""
-    SELECT edge_score, minutes_left, velocity
-    FROM lots
-    WHERE status='pending'
-    AND edge_score IS NOT NULL
-    LIMIT 500
-    """, conn)
-    
-    fig = px.scatter(
-        df,
-        x="minutes_left",
-        y="velocity",
-        color="edge_score",
-        color_continuous_scale="Turbo",
-        title="Edge Heatmap"
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+# Pooled read-only connection + cached queries live in dashboard_data.py
+
+from dashboard_data import (
+    load_metrics,
+    load_active_lots,
+    count_active_lots,
+    load_sold_archive,
+    load_sold_breakdown,
+    BREAKDOWNS,
+    load_bucket_medians,
+    latest_event_id,
+    fetch_events,
+    apply_events,
+    PAGE_SIZE,
+    LIVE_REFRESH_SECONDS,
+    MAX_EVENTS_PER_POLL,
+)
 
 # ===================== DEAL ENGINE ======================
+# Bucket medians come from the small bucket_stats table (compute_bucket_stats.py),
+# deal scores are computed in SQL / pricing.deal_score_array
 
-@st.cache_data(ttl=60)
-def load_historical_data():
-    return run_query("""
-        SELECT final_price
-        FROM lots
-        WHERE status='sold_history'
-        AND final_price IS NOT NULL
-    """)
-
-def assign_bucket(price):
-    if price <= 25:
-        return "low"
-    elif price <= 100:
-        return "mid"
-    elif price <= 500:
-        return "high"
-    else:
-        return "premium"
-
-historical_df = load_historical_data()
-
-if not historical_df.empty:
-    historical_df["bucket"] = historical_df["final_price"].apply(assign_bucket)
-    bucket_medians = (
-        historical_df.groupby("bucket")["final_price"]
-        .median()
-        .to_dict()
-    )
-else:
-    bucket_medians = {}
-
-def compute_deal_score(row):
-    if not row["current_bid"]:
-        return 0
-
-    adjusted_current = row["current_bid"] * 1.15
-    bucket = assign_bucket(adjusted_current)
-
-    expected = bucket_medians.get(bucket, 0)
-    if expected == 0:
-        return 0
-
-    ratio = expected / adjusted_current
-    score = (ratio - 1) * 100
-
-    return max(0, min(100, score))
+bucket_medians = load_bucket_medians()
 
 # ===================== HEADER ======================
 
 st.title("🛡️ Auction Command – Hybrid Intelligence")
 
-metrics_df = run_query("""
-    SELECT COUNT(*) as total,
-           SUM(CASE WHEN status='pending' THEN 1 ELSE 0 END) as active,
-           SUM(CASE WHEN status='sold_history' THEN 1 ELSE 0 END) as sold
-    FROM lots
-""")
+metrics_df = load_metrics()
 
 if not metrics_df.empty:
     col1, col2, col3 = st.columns(3)
@@ -131,58 +70,111 @@ tab1, tab2, tab3 = st.tabs(
 # TAB 1 – ACTIVE HUNT
 # ============================================================
 
-with tab1:
-
-    df = run_query("""
-        SELECT *
-        FROM lots
-        WHERE status='pending'
-        AND minutes_left > 0
-        ORDER BY minutes_left ASC
-        LIMIT 200
-    """)
+def live_page(search, ending_soon, sort_by, page):
+    """
+    The current Active Hunt page, kept in session state. The full query only
+    runs when the filters/page change; otherwise pipeline change events
+    (lot_events) are applied to the rows already on screen, until one of them
+    changes which lots belong on this page.
+    """
+    state = st.session_state
+    key = (search, ending_soon, sort_by, page)
+
+    if state.get("hunt_key") != key or "hunt_df" not in state:
+        # Take the event cursor BEFORE the read so nothing slips through the gap
+        state.hunt_event_id = latest_event_id()
+        state.hunt_df = load_active_lots(bucket_medians, search, ending_soon, sort_by, page)
+        state.hunt_key = key
+        return state.hunt_df
+
+    events = fetch_events(state.hunt_event_id)
+    if len(events) >= MAX_EVENTS_PER_POLL:
+        # Too far behind to patch, start over from a fresh page
+        state.pop("hunt_key", None)
+        return live_page(search, ending_soon, sort_by, page)
+
+    if events:
+        state.hunt_df, reload = apply_events(
+            state.hunt_df, events, bucket_medians, search, ending_soon, sort_by
+        )
+        state.hunt_event_id = events[-1][0]
+        if reload:
+            # A lot entered (or left) the window this page covers
+            state.pop("hunt_key", None)
+            return live_page(search, ending_soon, sort_by, page)
+
+    return state.hunt_df
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def active_hunt(search, ending_soon, sort_by, page, total_active, total_pages, show_images):
+
+    df = live_page(search, ending_soon, sort_by, page)
 
     if df.empty:
         st.info("No active auctions.")
     else:
 
-        df["minutes_left"] = df["minutes_left"].fillna(999999)
-        df["deal_score"] = df.apply(compute_deal_score, axis=1)
-
-        # -------- Filters --------
-
-        col1, col2, col3 = st.columns([2,1,1])
-
-        with col1:
-            search = st.text_input("Search")
-
-        with col2:
-            ending_soon = st.checkbox("🔥 < 60 min")
-
-        with col3:
-            sort_by = st.selectbox(
-                "Sort",
-                ["Ending Soonest", "Best Deal", "Lowest Bid"]
+        df = pricing.price_frame(df)
+
+        st.caption(f"Showing {len(df)} of {total_active} active lots (page {page}/{total_pages})")
+
+        render_start = time.perf_counter()
+
+        # -------- Virtualized grid --------
+        # One grid component instead of a container per lot: the browser only
+        # draws (and only fetches thumbnails for) the rows that are scrolled into view.
+
+        df["edge"] = np.select(
+            [df["deal_score"] > 50, df["deal_score"] > 20],
+            ["🔥 Strong Deal", "⚠️ Moderate"],
+            default="Low Edge"
+        )
+
+        grid_cols = ["title", "current_bid", "my_max_bid", "time_remaining", "deal_score", "edge", "url"]
+        if show_images:
+            grid_cols.insert(0, "image_url")
+
+        event = st.dataframe(
+            df[grid_cols],
+            column_config={
+                "image_url": st.column_config.ImageColumn("Image", width="small"),
+                "title": st.column_config.TextColumn("Title", width="large"),
+                "current_bid": st.column_config.NumberColumn("Bid", format="$%.2f"),
+                "my_max_bid": st.column_config.NumberColumn("My Max", format="$%.2f"),
+                "time_remaining": st.column_config.TextColumn("Time"),
+                "deal_score": st.column_config.ProgressColumn(
+                    "Deal Score", format="%.1f", min_value=0, max_value=100
+                ),
+                "edge": st.column_config.TextColumn("Edge"),
+                "url": st.column_config.LinkColumn("Lot", display_text="View Lot"),
+            },
+            hide_index=True,
+            width="stretch",
+            height=600,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="active_grid",
+        )
+
+        # -------- Detail panel --------
+
+        # Selection comes back as a row position in the grid the user clicked,
+        # i.e. the previous render. Live updates reorder/drop rows between
+        # renders, so remember the lot, not the position.
+        state = st.session_state
+        selected = event.selection.rows
+        if selected != state.get("hunt_selected_rows"):
+            shown = state.get("hunt_shown", [])
+            state.hunt_selected_rows = selected
+            state.hunt_selected_lot = (
+                shown[selected[0]] if selected and selected[0] < len(shown) else None
             )
+        state.hunt_shown = list(df["lot_id"])
 
-        if search:
-            df = df[df["title"].str.contains(search, case=False, na=False)]
-
-        if ending_soon:
-            df = df[df["minutes_left"] <= 60]
+        match = df[df["lot_id"] == state.get("hunt_selected_lot")]
+        if not match.empty:
+            row = match.iloc[0]
 
-        if sort_by == "Ending Soonest":
-            df = df.sort_values("minutes_left")
-        elif sort_by == "Best Deal":
-            df = df.sort_values("deal_score", ascending=False)
-        elif sort_by == "Lowest Bid":
-            df = df.sort_values("current_bid")
-
-        st.caption(f"Showing {len(df)} active lots")
-
-        show_images = st.checkbox("Show Images", value=True)
-
-        for _, row in df.iterrows():
             with st.container(border=True):
 
                 c1, c2, c3 = st.columns([4,2,2])
@@ -194,6 +186,8 @@ with tab1:
                 with c2:
                     st.write(f"Bid: ${row['current_bid']:,.2f}")
                     st.write(f"Time: {row['time_remaining']}")
+                    if row["my_max_bid"] > 0:
+                        st.write(f"My Max: ${row['my_max_bid']:,.2f}")
 
                 with c3:
                     if row["deal_score"] > 50:
@@ -203,10 +197,45 @@ with tab1:
                     else:
                         st.caption("Low Edge")
 
-                if show_images and row["image_url"]:
+                if row["image_url"]:
                     st.image(row["image_url"], width=180)
 
                 st.link_button("View Lot", row["url"])
+        else:
+            st.caption("Select a row to see lot details.")
+
+        st.caption(
+            f"Rendered in {(time.perf_counter() - render_start) * 1000:.0f} ms · "
+            f"live updates every {LIVE_REFRESH_SECONDS}s"
+        )
+
+with tab1:
+
+    # -------- Filters (applied in SQL) --------
+
+    col1, col2, col3, col4 = st.columns([2,1,1,1])
+
+    with col1:
+        search = st.text_input("Search")
+
+    with col2:
+        ending_soon = st.checkbox("🔥 < 60 min")
+
+    with col3:
+        sort_by = st.selectbox(
+            "Sort",
+            ["Ending Soonest", "Best Deal", "Lowest Bid"]
+        )
+
+    total_active = count_active_lots(search, ending_soon)
+    total_pages = max(1, -(-total_active // PAGE_SIZE))
+
+    with col4:
+        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1)
+
+    show_images = st.checkbox("Show Images", value=True)
+
+    active_hunt(search, ending_soon, sort_by, int(page), total_active, total_pages, show_images)
 
 # ============================================================
 # TAB 2 – SOLD ARCHIVE
@@ -214,16 +243,19 @@ with tab1:
 
 with tab2:
 
-    df_sold = run_query("""
-        SELECT title, final_price, bid_count, last_seen
-        FROM lots
-        WHERE status='sold_history'
-        ORDER BY final_price DESC
-        LIMIT 200
-    """)
+    sold_search = st.text_input("Search sold history", key="sold_search")
+
+    df_sold = load_sold_archive(200, sold_search)
 
     st.dataframe(df_sold)
 
+    breakdown = st.radio("Sold history by", list(BREAKDOWNS), horizontal=True, key="sold_breakdown")
+    try:
+        st.dataframe(load_sold_breakdown(breakdown), hide_index=True)
+    except Exception as e:
+        # category_stats / bucket_stats not computed yet on a fresh DB
+        st.caption(f"No {breakdown.lower()} stats yet ({e})")
+
 # ============================================================
 # TAB 3 – METALS
 # ============================================================
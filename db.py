@@ -0,0 +1,227 @@
+import asyncio
+import atexit
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# ============================================================
+# SHARED DB ACCESS
+# Every stage talks to hibid_lots.db through here:
+#  - tuned pragmas on every connection
+#  - a small pool of read connections
+#  - ONE writer thread per DB file that group-commits queued
+#    writes, so concurrent stages stop hitting "database is locked"
+# ============================================================
+
+DB_NAME = "hibid_lots.db"
+
+BUSY_TIMEOUT_MS = 30000
+MMAP_SIZE = 256 * 1024 * 1024      # 256 MB
+CACHE_SIZE_KB = 64 * 1024          # 64 MB page cache per connection
+
+READ_POOL_SIZE = 4
+MAX_GROUP = 500                    # Max queued writes folded into one commit
+
+
+# ------------------------------
+# Connections
+# ------------------------------
+def connect(path=DB_NAME, readonly=False):
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                               timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, one fsync per checkpoint
+
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+# ------------------------------
+# Read Pool
+# ------------------------------
+class ReadPool:
+    def __init__(self, path=DB_NAME, size=READ_POOL_SIZE, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._idle = queue.LifoQueue()
+        self._sem = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._sem.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path, readonly=self.readonly)
+            try:
+                yield conn
+            finally:
+                # Never hand a connection back mid-transaction
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._sem.release()
+
+    def fetchall(self, query, params=()):
+        with self.connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+
+# ------------------------------
+# Writer Thread
+# ------------------------------
+class Writer:
+    """
+    Single owner of the write connection. Callers queue work and (optionally)
+    wait for the commit; whatever is queued together lands in one transaction.
+    """
+
+    def __init__(self, path=DB_NAME):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"db-writer:{path}", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        conn = connect(self.path)
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+
+            batch = [job]
+            while len(batch) < MAX_GROUP:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)
+                    break
+                batch.append(nxt)
+
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_batch(self, conn, batch):
+        results = []
+        try:
+            for fn, args, _ in batch:
+                results.append(fn(conn, *args))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Redo one by one so a single bad write doesn't fail its neighbours
+            for fn, args, fut in batch:
+                try:
+                    result = fn(conn, *args)
+                    conn.commit()
+                    fut.set_result(result)
+                except Exception as e:
+                    conn.rollback()
+                    fut.set_exception(e)
+            return
+
+        for (_, _, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(conn, *args) on the writer thread. Returns a Future that
+        resolves after the commit containing it.
+        """
+        fut = Future()
+        self._queue.put((fn, args, fut))
+        return fut
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def execute(self, query, params=(), wait=True):
+        fut = self.submit(lambda conn: conn.execute(query, params).rowcount)
+        return fut.result() if wait else fut
+
+    def executemany(self, query, seq, wait=True):
+        rows = list(seq)
+        fut = self.submit(lambda conn: conn.executemany(query, rows).rowcount)
+        return fut.result() if wait else fut
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+# ------------------------------
+# Shared Instances
+# ------------------------------
+_lock = threading.Lock()
+_writers = {}
+_pools = {}
+
+
+def writer(path=DB_NAME):
+    with _lock:
+        if path not in _writers:
+            _writers[path] = Writer(path)
+        return _writers[path]
+
+
+def read_pool(path=DB_NAME):
+    with _lock:
+        if path not in _pools:
+            _pools[path] = ReadPool(path)
+        return _pools[path]
+
+
+@atexit.register
+def _flush_writers():
+    for w in list(_writers.values()):
+        w.close()
+
+
+# ------------------------------
+# Sync API
+# ------------------------------
+def fetchall(query, params=(), path=DB_NAME):
+    return read_pool(path).fetchall(query, params)
+
+
+def execute(query, params=(), path=DB_NAME, wait=True):
+    return writer(path).execute(query, params, wait)
+
+
+def executemany(query, seq, path=DB_NAME, wait=True):
+    return writer(path).executemany(query, seq, wait)
+
+
+def run_write(fn, *args, path=DB_NAME):
+    return writer(path).run(fn, *args)
+
+
+# ------------------------------
+# Asyncio API
+# ------------------------------
+async def afetchall(query, params=(), path=DB_NAME):
+    return await asyncio.to_thread(fetchall, query, params, path)
+
+
+async def aexecute(query, params=(), path=DB_NAME):
+    return await asyncio.wrap_future(writer(path).execute(query, params, wait=False))
+
+
+async def aexecutemany(query, seq, path=DB_NAME):
+    return await asyncio.wrap_future(writer(path).executemany(query, seq, wait=False))
+
+
+async def arun_write(fn, *args, path=DB_NAME):
+    return await asyncio.wrap_future(writer(path).submit(fn, *args))
@@ -1,10 +1,12 @@
-import sqlite3
+import db
+import asyncio
+import alerts
 
 DB = "hibid_lots.db"
 
 ALERT_THRESHOLD = 50
 
-conn = sqlite3.connect(DB)
+conn = db.connect(DB)
 cursor = conn.cursor()
 
 cursor.execute("""
@@ -18,7 +20,13 @@ LIMIT 5;
 
 rows = cursor.fetchall()
 
-for row in rows:
-    print("🔥 HIGH EDGE DEAL:", row)
-
 conn.close()
+
+# Ledger-backed: a lot is only announced again when its score enters a new band of 10
+dispatcher = alerts.AlertDispatcher([alerts.StdoutSink()], DB, band_size=10, name="edge_alerts")
+deals = [
+    dispatcher.make_deal(lot_id, title, score, f"Edge Score: {round(score, 1)}")
+    for lot_id, title, score in rows
+]
+asyncio.run(dispatcher.dispatch(deals))
+dispatcher.close()
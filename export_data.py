@@ -1,77 +1,304 @@
-import sqlite3
+import db
+import os
+import sys
+import time
+import argparse
+import json
 import pandas as pd
 import datetime
 
-# CONFIGURATION (Must match your Dashboard)
-PROFIT_MIN_LOW = 15.00
-PROFIT_MIN_MID = 40.00
-PROFIT_PERCENT_HIGH = 0.25
-HARD_LIMIT = 200.00
-TAX_RATE = 0.08
-EBAY_FEES = 0.13
-DEFAULT_BP = 0.15
+import pricing
+import archive_history
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
 
 DB_NAME = 'hibid_lots.db'
+CHUNK_SIZE = 5000
+FORMATS = ("csv", "csv.gz", "parquet")
+CHANGED_COL = "changed_at"
 
 def calculate_safe_limit(row):
+    # Row-at-a-time wrapper kept for old callers; export() uses pricing.price_frame
     try:
-        market_value = row['market_value']
-        if market_value <= 0: return 0
-        
-        bp = row['buyers_premium'] if pd.notnull(row['buyers_premium']) else DEFAULT_BP
-
-        if market_value < 50:
-            required_profit = PROFIT_MIN_LOW
-        elif market_value < 200:
-            required_profit = PROFIT_MIN_MID
-        else:
-            required_profit = market_value * PROFIT_PERCENT_HIGH
-
-        net_revenue = market_value * (1 - EBAY_FEES)
-        allowable_spend = net_revenue - required_profit
-        
-        if allowable_spend <= 0: return 0.00
-
-        fee_multiplier = 1 + bp + TAX_RATE
-        max_bid = allowable_spend / fee_multiplier
-        
-        return round(min(max_bid, HARD_LIMIT), 2)
+        return pricing.calculate_max_bid(row['market_value'], row['buyers_premium'])
     except:
         return 0
 
-def export():
-    print(f"Reading database: {DB_NAME}...")
-    conn = sqlite3.connect(DB_NAME)
-    
-    # Get ALL data, not just valued ones
-    query = "SELECT * FROM lots ORDER BY last_updated DESC"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+# ------------------------------
+# Watermark (for --since exports)
+# ------------------------------
+def setup_state(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS export_state (
+            name TEXT PRIMARY KEY,
+            watermark TEXT,
+            exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Lots already exported at exactly the watermark second (JSON list)
+    if "watermark_ids" not in {r[1] for r in conn.execute("PRAGMA table_info(export_state)")}:
+        conn.execute("ALTER TABLE export_state ADD COLUMN watermark_ids TEXT")
+    conn.commit()
 
-    if df.empty:
-        print("Database is empty! (The bot hasn't saved anything yet).")
-        return
+def get_watermark(conn, name="lots"):
+    """(watermark, lot_ids exported at that exact timestamp) or (None, set())."""
+    row = conn.execute("SELECT watermark, watermark_ids FROM export_state WHERE name=?", (name,)).fetchone()
+    if not row:
+        return None, set()
+    return row[0], set(json.loads(row[1] or "[]"))
+
+def save_watermark(conn, watermark, ids=(), name="lots"):
+    conn.execute("""
+        INSERT INTO export_state (name, watermark, watermark_ids, exported_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET
+            watermark=excluded.watermark,
+            watermark_ids=excluded.watermark_ids,
+            exported_at=CURRENT_TIMESTAMP
+    """, (name, watermark, json.dumps(sorted(ids))))
+    conn.commit()
+
+def change_column(conn, table="lots"):
+    # Older DBs were built by setup_db.py (last_updated), newer ones by the scrapers (last_seen)
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    return "last_seen" if "last_seen" in cols else "last_updated"
+
+def setup_changed_at(conn):
+    """
+    changed_at on lots (and lots_history): set by trigger on every insert and
+    update, so --since also picks up the stages that never touch last_seen
+    (validator market_value, edge scores, lifecycle status). Starts out as
+    last_seen, which is all the old watermark compared against.
+    """
+    for table in ("lots", archive_history.HISTORY_TABLE):
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        if cols and CHANGED_COL not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {CHANGED_COL} TIMESTAMP")
+            conn.execute(f"UPDATE {table} SET {CHANGED_COL} = {change_column(conn, table)}")
+
+    # Only when the writer didn't set it itself
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS lots_changed_at_insert AFTER INSERT ON lots
+        WHEN NEW.{CHANGED_COL} IS NULL BEGIN
+            UPDATE lots SET {CHANGED_COL} = CURRENT_TIMESTAMP WHERE lot_id = NEW.lot_id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS lots_changed_at_update AFTER UPDATE ON lots
+        WHEN NEW.{CHANGED_COL} IS OLD.{CHANGED_COL} BEGIN
+            UPDATE lots SET {CHANGED_COL} = CURRENT_TIMESTAMP WHERE lot_id = NEW.lot_id;
+        END
+    """)
+    conn.commit()
 
-    print(f"Processing {len(df)} records...")
+# ------------------------------
+# Keyset-paginated reader
+# ------------------------------
+def source_tables(conn):
+    # Hot table first, then archived history (minus anything that came back to lots)
+    tables = [("lots", "")]
+    if archive_history.all_lots(conn) != "lots":
+        tables.append((archive_history.HISTORY_TABLE, "AND lot_id NOT IN (SELECT lot_id FROM lots)"))
+    return tables
 
-    # Re-calculate the columns for the report
-    df['my_max_bid'] = df.apply(calculate_safe_limit, axis=1)
+def iter_chunks(conn, chunk_size=CHUNK_SIZE, since=None, changed_col=CHANGED_COL,
+                table="lots", extra_where="", skip_ids=()):
+    """
+    Yields DataFrames of at most chunk_size rows, ordered by lot_id.
+    Each chunk is its own short read, so the DB is never locked for the whole export.
+    With since: rows changed at or after it (timestamps only have whole
+    seconds), minus skip_ids -- the ones already exported at that exact second.
+    """
+    last_id = ""
+    while True:
+        if since is None:
+            query = f"SELECT * FROM {table} WHERE lot_id > ? {extra_where} ORDER BY lot_id LIMIT ?"
+            params = (last_id, chunk_size)
+        else:
+            query = f"SELECT * FROM {table} WHERE lot_id > ? AND {changed_col} >= ? {extra_where} ORDER BY lot_id LIMIT ?"
+            params = (last_id, since, chunk_size)
+
+        df = pd.read_sql_query(query, conn, params=params)
+        if df.empty:
+            return
+
+        last_id = df['lot_id'].iloc[-1]
+        full = len(df) == chunk_size
+        if since is not None and skip_ids:
+            df = df[~((df[changed_col].astype(str) == since) & df['lot_id'].isin(skip_ids))]
+        if not df.empty:
+            yield df
+
+        if not full:
+            return
+
+def add_report_columns(df):
+    df = pricing.price_frame(df)
     df['potential_spread'] = df['market_value'] - df['current_bid']
-    
-    # Label the status
-    df['action_recommendation'] = df.apply(
-        lambda x: "BUY NOW" if (x['current_bid'] < x['my_max_bid'] and x['market_value'] > 0) else "IGNORE", 
-        axis=1
-    )
+    return df
+
+# ------------------------------
+# Incremental writers
+# ------------------------------
+def column_types(conn):
+    """Declared SQLite type per column of lots / lots_history."""
+    types = {}
+    for table, _ in reversed(source_tables(conn)):
+        types.update({r[1]: r[2] for r in conn.execute(f"PRAGMA table_info({table})")})
+    return types
+
+def arrow_type(declared):
+    # SQLite type affinity rules; TIMESTAMP and untyped columns hold text here
+    import pyarrow as pa
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if "BLOB" in declared:
+        return pa.binary()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB", "NUMERIC", "DECIMAL")):
+        return pa.float64()
+    return pa.string()
+
+class ChunkWriter:
+    def __init__(self, filename, fmt, column_types=None):
+        self.filename = filename
+        self.fmt = fmt
+        self.column_types = column_types or {}
+        self.rows = 0
+        self._parquet = None
+        self._schema = None
+        self._columns = None
+
+    def arrow_schema(self, df):
+        """
+        From the DB's declared types, not the first chunk: a column that is all
+        NULL there would otherwise be typed null and break every later chunk.
+        Report columns (not in the DB) come from their pandas dtype.
+        """
+        import pyarrow as pa
+        fields = []
+        for col in df.columns:
+            if col in self.column_types:
+                fields.append(pa.field(col, arrow_type(self.column_types[col])))
+            elif pd.api.types.is_numeric_dtype(df[col].dtype):
+                fields.append(pa.field(col, pa.from_numpy_dtype(df[col].dtype)))
+            else:
+                fields.append(pa.field(col, pa.string()))
+        return pa.schema(fields)
+
+    def write(self, df):
+        # lots and lots_history can list the same columns in a different order
+        if self._columns is None:
+            self._columns = list(df.columns)
+        else:
+            df = df.reindex(columns=self._columns)
+
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                self._schema = self.arrow_schema(df)
+                self._parquet = pq.ParquetWriter(self.filename, self._schema)
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._parquet.write_table(table)
+        else:
+            compression = "gzip" if self.fmt == "csv.gz" else None
+            # Appending to a gzip file adds a new member; readers concatenate them transparently
+            df.to_csv(
+                self.filename,
+                mode="w" if self.rows == 0 else "a",
+                header=self.rows == 0,
+                index=False,
+                compression=compression
+            )
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# ------------------------------
+# Main Export
+# ------------------------------
+def export(fmt="csv", since=False, chunk_size=CHUNK_SIZE):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+    print(f"Reading database: {DB_NAME}...")
+    conn = db.connect(DB_NAME)
+    setup_state(conn)
+    setup_changed_at(conn)
+
+    changed_col = CHANGED_COL
+    watermark, watermark_ids = get_watermark(conn) if since else (None, set())
+
+    if since and watermark:
+        print(f"Incremental export: rows with {changed_col} >= {watermark} not exported yet")
+    elif since:
+        print("No previous watermark found, exporting everything.")
 
     # Generate Filename with Timestamp
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M")
-    filename = f"FULL_EXPORT_{timestamp}.csv"
+    prefix = "DELTA_EXPORT" if since and watermark else "FULL_EXPORT"
+    filename = f"{prefix}_{timestamp}.{fmt}"
 
-    # Save
-    df.to_csv(filename, index=False)
+    writer = ChunkWriter(filename, fmt, column_types(conn))
+    new_watermark = watermark
+    new_ids = set(watermark_ids)
+    start = time.perf_counter()
+
+    try:
+        for table, extra_where in source_tables(conn):
+            for df in iter_chunks(conn, chunk_size, watermark, changed_col, table, extra_where, watermark_ids):
+                changed = df[changed_col].astype(str).where(df[changed_col].notnull())
+                chunk_max = changed.max()
+                if pd.notnull(chunk_max) and (new_watermark is None or chunk_max > new_watermark):
+                    new_watermark, new_ids = chunk_max, set()
+                if pd.notnull(chunk_max) and chunk_max == new_watermark:
+                    new_ids.update(df.loc[changed == new_watermark, 'lot_id'])
+
+                writer.write(add_report_columns(df))
+                print(f"   ...{writer.rows} rows written")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+
+    if writer.rows == 0:
+        print("Nothing to export! (No rows changed since last export).")
+        if os.path.exists(filename):
+            os.remove(filename)
+        conn.close()
+        return
+
+    if new_watermark:
+        save_watermark(conn, new_watermark, new_ids)
+    conn.close()
+
+    rss = peak_rss_mb()
     print(f"\n✅ SUCCESS! Data saved to: {filename}")
-    print(f"   Contains {len(df)} items.")
+    print(f"   Contains {writer.rows} items.")
+    print(f"   {writer.rows / max(elapsed, 1e-9):,.0f} rows/sec" + (f" | peak RSS {rss:.1f} MB" if rss else ""))
+    return filename
 
 if __name__ == "__main__":
-    export()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export the lots table")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--since", action="store_true", help="only rows inserted or updated since the last export")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    export(args.format, args.since, args.chunk_size)
@@ -1,13 +1,20 @@
-import sqlite3
+import db
+import lot_events
 from datetime import datetime, timedelta
 
 DB = "hibid_lots.db"
 
 
 def run_lifecycle():
+    expired_count, sold_count, pruned = db.run_write(_lifecycle, path=DB)
+    print(f"Lifecycle: {expired_count} moved to ended, {sold_count} moved to sold_history, "
+          f"{pruned} tile fingerprints pruned.")
+
+
+def _lifecycle(conn):
 
-    conn = sqlite3.connect(DB)
     cursor = conn.cursor()
+    lot_events.setup(conn)
 
     now = datetime.utcnow()
     stale_cutoff = now - timedelta(hours=2)
@@ -16,15 +23,25 @@ def run_lifecycle():
     # 1️⃣ Move expired active lots to ended
     # ------------------------------
 
-    cursor.execute("""
-        UPDATE lots
-        SET status='ended',
-            ended_at=CURRENT_TIMESTAMP
+    expired = """
         WHERE status='pending'
         AND (
             minutes_left <= 0
             OR (minutes_left IS NULL AND last_seen < ?)
         )
+    """
+
+    # Tell the dashboard before the rows change (same transaction)
+    cursor.execute(f"""
+        INSERT INTO lot_events (lot_id, fields)
+        SELECT lot_id, json_object('status', 'ended') FROM lots {expired}
+    """, (stale_cutoff,))
+
+    cursor.execute(f"""
+        UPDATE lots
+        SET status='ended',
+            ended_at=CURRENT_TIMESTAMP
+        {expired}
     """, (stale_cutoff,))
 
     expired_count = cursor.rowcount
@@ -33,6 +50,13 @@ def run_lifecycle():
     # 2️⃣ Move ended lots to sold_history ONLY if final_price exists
     # ------------------------------
 
+    cursor.execute("""
+        INSERT INTO lot_events (lot_id, fields)
+        SELECT lot_id, json_object('status', 'sold_history') FROM lots
+        WHERE status='ended'
+        AND final_price IS NOT NULL
+    """)
+
     cursor.execute("""
         UPDATE lots
         SET status='sold_history'
@@ -42,7 +66,19 @@ def run_lifecycle():
 
     sold_count = cursor.rowcount
 
-    conn.commit()
-    conn.close()
+    # ------------------------------
+    # 3️⃣ Drop scraper_v9 change-detection fingerprints of lots no longer pending
+    # (ended, sold, or archived out of `lots`), so the table stays the size of the live set
+    # ------------------------------
+
+    pruned = 0
+    if cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='tile_fingerprints'"
+    ).fetchone():
+        cursor.execute("""
+            DELETE FROM tile_fingerprints
+            WHERE lot_id NOT IN (SELECT lot_id FROM lots WHERE status='pending')
+        """)
+        pruned = cursor.rowcount
 
-    print(f"Lifecycle: {expired_count} moved to ended, {sold_count} moved to sold_history.")
+    return expired_count, sold_count, pruned
@@ -0,0 +1,71 @@
+import json
+
+# ============================================================
+# LOT CHANGE EVENTS
+# The pipeline appends (lot_id, changed fields) rows to a small
+# lot_events table; the dashboard polls it and applies deltas
+# instead of re-running its full queries.
+# ============================================================
+
+KEEP_MINUTES = 60
+
+
+def setup(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lot_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lot_id TEXT,
+            fields TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def publish(conn, lot_id, fields):
+    """
+    Queue one change event. Rides on the caller's transaction, so it
+    becomes visible exactly when the change it describes is committed.
+    """
+    conn.execute(
+        "INSERT INTO lot_events (lot_id, fields) VALUES (?, ?)",
+        (lot_id, json.dumps(fields, default=str))
+    )
+
+
+def publish_many(conn, events):
+    conn.executemany(
+        "INSERT INTO lot_events (lot_id, fields) VALUES (?, ?)",
+        [(lot_id, json.dumps(fields, default=str)) for lot_id, fields in events]
+    )
+
+
+def prune(conn, keep_minutes=KEEP_MINUTES):
+    conn.execute(
+        "DELETE FROM lot_events WHERE created_at < datetime('now', ?)",
+        (f"-{int(keep_minutes)} minutes",)
+    )
+
+
+def latest_id(conn):
+    try:
+        row = conn.execute("SELECT MAX(id) FROM lot_events").fetchone()
+    except Exception:
+        return 0  # Table not created yet (nothing has published)
+    return row[0] or 0
+
+
+def fetch_since(conn, last_id, limit=5000):
+    """
+    Returns [(id, lot_id, fields_dict)] newer than last_id, oldest first.
+    """
+    try:
+        rows = conn.execute("""
+            SELECT id, lot_id, fields
+            FROM lot_events
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (last_id, limit)).fetchall()
+    except Exception:
+        return []
+    return [(event_id, lot_id, json.loads(fields)) for event_id, lot_id, fields in rows]
@@ -0,0 +1,344 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# ============================================================
+# METRICS
+# Per-stage timers, counters and histograms. At exit each stage
+# writes:
+#   metrics/<stage>.prom   Prometheus text format (node_exporter
+#                          textfile collector can pick it up)
+#   metrics/metrics.jsonl  one JSON line per stage run (long-running
+#                          stages: one per SNAPSHOT_EVERY_SECONDS),
+#                          rotated to metrics.jsonl.1 past JSONL_MAX_BYTES
+# Profiling: HIBID_PROFILE=1 (cProfile) or =pyinstrument
+# saves metrics/<stage>-<timestamp>.prof / .html as well.
+#   python metrics.py            last run of every stage
+# ============================================================
+
+METRICS_DIR = "metrics"
+JSONL_FILE = "metrics.jsonl"
+JSONL_MAX_BYTES = 20 * 1024 * 1024  # Then renamed to metrics.jsonl.1 (one old file kept)
+SNAPSHOT_EVERY_SECONDS = 15 * 60    # write(): JSON line at most this often, .prom every call
+PROFILE_ENV = "HIBID_PROFILE"
+
+# Seconds; covers DOM reads (ms) through page loads / eBay fetches (tens of s)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds >= 0.01 else f"{seconds * 1000:.1f} ms"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, edge in enumerate(self.buckets):
+            if value <= edge:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bucket edge holding the q-th observation (Prometheus-style estimate)
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for edge, n in zip(self.buckets + (self.max,), self.counts):
+            seen += n
+            if seen >= target:
+                return min(edge, self.max)
+        return self.max
+
+
+class Registry:
+    def __init__(self):
+        self.stage = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.profiler = None
+        self.profile_kind = None
+        self._flushed = False
+        self._last_snapshot = 0.0
+
+    # ------------------------------
+    # Recording
+    # ------------------------------
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, op, seconds):
+        with self.lock:
+            if op not in self.histograms:
+                self.histograms[op] = Histogram()
+            self.histograms[op].observe(seconds)
+
+    # ------------------------------
+    # Output
+    # ------------------------------
+    def prometheus(self):
+        s = self.stage
+        lines = [
+            "# TYPE hibid_op_seconds histogram",
+        ]
+        for op, h in sorted(self.histograms.items()):
+            cum = 0
+            for edge, n in zip(h.buckets, h.counts):
+                cum += n
+                lines.append(f'hibid_op_seconds_bucket{{stage="{s}",op="{op}",le="{edge}"}} {cum}')
+            lines.append(f'hibid_op_seconds_bucket{{stage="{s}",op="{op}",le="+Inf"}} {h.count}')
+            lines.append(f'hibid_op_seconds_sum{{stage="{s}",op="{op}"}} {h.sum:.6f}')
+            lines.append(f'hibid_op_seconds_count{{stage="{s}",op="{op}"}} {h.count}')
+
+        lines.append("# TYPE hibid_events_total counter")
+        for name, n in sorted(self.counters.items()):
+            lines.append(f'hibid_events_total{{stage="{s}",name="{name}"}} {n}')
+
+        lines.append("# TYPE hibid_gauge gauge")
+        for name, v in sorted(self.gauges.items()):
+            lines.append(f'hibid_gauge{{stage="{s}",name="{name}"}} {v}')
+
+        lines.append("# TYPE hibid_stage_seconds gauge")
+        lines.append(f'hibid_stage_seconds{{stage="{s}"}} {time.time() - self.started:.3f}')
+        lines.append("# TYPE hibid_stage_last_run_timestamp gauge")
+        lines.append(f'hibid_stage_last_run_timestamp{{stage="{s}"}} {time.time():.0f}')
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            "stage": self.stage,
+            "started": round(self.started, 3),
+            "seconds": round(time.time() - self.started, 3),
+            "ops": {
+                op: {
+                    "count": h.count,
+                    "total_s": round(h.sum, 4),
+                    "p50_s": round(h.quantile(0.5), 4),
+                    "p95_s": round(h.quantile(0.95), 4),
+                    "max_s": round(h.max, 4),
+                }
+                for op, h in self.histograms.items()
+            },
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def summary(self):
+        total = time.time() - self.started
+        rows = sorted(self.histograms.items(), key=lambda kv: -kv[1].sum)
+        lines = [f"--- {self.stage}: {total:.1f}s ---"]
+        for op, h in rows:
+            share = h.sum / total if total else 0
+            lines.append(f"   {op:<22} {h.count:>6} x  total {h.sum:8.2f}s ({share:4.0%})  "
+                         f"p50 {_ms(h.quantile(0.5))}  p95 {_ms(h.quantile(0.95))}")
+        if self.counters:
+            lines.append("   " + ", ".join(f"{k}={v}" for k, v in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+    def write(self, every=0):
+        """
+        Rewrite the .prom file and append a JSON line (also fine mid-run).
+        every: skip the JSON line if the last one was under this many seconds ago.
+        """
+        if not self.histograms and not self.counters and not self.gauges:
+            return False
+
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        prom = os.path.join(METRICS_DIR, f"{self.stage}.prom")
+        # Write-then-rename so a scraper of the textfile never reads half a file
+        with open(prom + ".tmp", "w") as f:
+            f.write(self.prometheus())
+        os.replace(prom + ".tmp", prom)
+
+        now = time.time()
+        if now - self._last_snapshot >= every:
+            self._append_jsonl(json.dumps(self.snapshot()))
+            self._last_snapshot = now
+        return True
+
+    def _append_jsonl(self, line):
+        path = os.path.join(METRICS_DIR, JSONL_FILE)
+        try:
+            if os.path.getsize(path) >= JSONL_MAX_BYTES:
+                os.replace(path, path + ".1")
+        except OSError:
+            pass  # Not there yet
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+    def flush(self):
+        if self._flushed:
+            return
+        self._flushed = True
+        self._stop_profile()
+        if self.write():
+            print(self.summary())
+
+    # ------------------------------
+    # Profiling
+    # ------------------------------
+    def _start_profile(self, kind):
+        if kind in ("pyinstrument", "pyi"):
+            try:
+                from pyinstrument import Profiler
+                self.profiler = Profiler()
+                self.profiler.start()
+                self.profile_kind = "pyinstrument"
+                return
+            except ImportError:
+                print("[metrics] pyinstrument not installed, using cProfile")
+
+        import cProfile
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        self.profile_kind = "cprofile"
+
+    def _stop_profile(self):
+        if self.profiler is None:
+            return
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        base = os.path.join(METRICS_DIR, f"{self.stage}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+        if self.profile_kind == "pyinstrument":
+            self.profiler.stop()
+            with open(base + ".html", "w") as f:
+                f.write(self.profiler.output_html())
+            print(f"[metrics] profile saved to {base}.html")
+        else:
+            self.profiler.disable()
+            self.profiler.dump_stats(base + ".prof")
+            print(f"[metrics] profile saved to {base}.prof (python -m pstats {base}.prof)")
+        self.profiler = None
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+
+# ------------------------------
+# Public API
+# ------------------------------
+def stage(name, profile=None):
+    """
+    Name this process's stage (defaults to the script name). profile: None
+    reads HIBID_PROFILE, False disables, "cprofile"/"pyinstrument" forces.
+    """
+    REGISTRY.stage = name
+    if profile is None:
+        profile = os.environ.get(PROFILE_ENV, "").strip().lower() or False
+        if profile in ("1", "true", "yes"):
+            profile = "cprofile"
+    if profile and REGISTRY.profiler is None:
+        REGISTRY._start_profile(profile)
+
+
+def count(name, n=1):
+    REGISTRY.count(name, n)
+
+
+def gauge(name, value):
+    REGISTRY.gauge(name, value)
+
+
+def observe(op, seconds):
+    REGISTRY.observe(op, seconds)
+
+
+@contextmanager
+def timer(op):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(op, time.perf_counter() - start)
+
+
+def timed(op=None):
+    """Decorator: @metrics.timed("ebay_fetch"); works on async functions too."""
+    def wrap(fn):
+        name = op or fn.__name__
+
+        if _is_coroutine(fn):
+            @wraps(fn)
+            async def async_inner(*args, **kwargs):
+                with timer(name):
+                    return await fn(*args, **kwargs)
+            return async_inner
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            with timer(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def _is_coroutine(fn):
+    import inspect
+    return inspect.iscoroutinefunction(fn)
+
+
+def write(every=SNAPSHOT_EVERY_SECONDS):
+    # Long-running stages (bidder.py) call this each cycle; the rest just exit
+    REGISTRY.write(every)
+
+
+def flush():
+    REGISTRY.flush()
+
+
+# ------------------------------
+# Last Run Per Stage
+# ------------------------------
+def report(path=os.path.join(METRICS_DIR, JSONL_FILE)):
+    # Rotated file first, so the current one's (newer) lines win
+    files = [p for p in (path + ".1", path) if os.path.exists(p)]
+    if not files:
+        print(f"No metrics yet ({path})")
+        return
+
+    last = {}
+    for name in files:
+        with open(name) as f:
+            for line in f:
+                try:
+                    snap = json.loads(line)
+                except ValueError:
+                    continue
+                last[snap["stage"]] = snap
+
+    for name, snap in sorted(last.items()):
+        ran = time.strftime("%Y-%m-%d %H:%M", time.localtime(snap["started"]))
+        print(f"{name:<24} {ran}  {snap['seconds']:8.1f}s")
+        for op, o in sorted(snap["ops"].items(), key=lambda kv: -kv[1]["total_s"]):
+            print(f"      {op:<22} {o['count']:>6} x  total {o['total_s']:8.2f}s  "
+                  f"p50 {_ms(o['p50_s'])}  p95 {_ms(o['p95_s'])}  max {_ms(o['max_s'])}")
+        if snap["counters"]:
+            print("      " + ", ".join(f"{k}={v}" for k, v in sorted(snap["counters"].items())))
+
+
+if __name__ == "__main__":
+    report()
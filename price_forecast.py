@@ -0,0 +1,463 @@
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import db
+import metrics
+import bid_history
+import archive_history
+
+# ============================================================
+# FINAL-PRICE FORECAST
+#   python price_forecast.py            (refit curves if stale, forecast pending lots)
+#   python price_forecast.py fit | score
+#   python price_forecast.py --backtest [--folds 4]
+# Where a lot's price will land, from its bid trajectory
+# (bid_history) and its category's run-up curve: the typical
+# log(final / bid) still to come at each time-left horizon,
+# learned from sold lots' recorded trajectories. On top of the
+# curve, per horizon: how far the lot is running ahead of / behind
+# the curve since its previous bid, and how busy it is (bid count).
+# The spread of what's left over gives the 10th / 90th percentile.
+# Writes forecast_price / forecast_low / forecast_high on pending
+# lots; compute_edge_score measures the undervalue against them.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+CURVES_TABLE = "runup_curves"
+
+# Time-left buckets (upper edge, minutes); the last bucket is everything beyond
+HORIZONS = [5, 15, 30, 60, 180, 720, 1440, 4320]
+HORIZON_LABELS = ["<=5m", "<=15m", "<=30m", "<=1h", "<=3h", "<=12h", "<=1d", "<=3d", ">3d"]
+
+ALL = "*"                 # Curve over every category; used where a category is thin
+MIN_CURVE_POINTS = 30     # Points per (category, horizon) before it gets its own curve
+MIN_PRICE = 1.0
+MIN_BID = 1.0             # $0 opening bids would make log(final / bid) infinite
+LOW_Q, HIGH_Q = 0.1, 0.9
+REFIT_HOURS = 6
+
+FORECAST_COLUMNS = [("forecast_price", "REAL"), ("forecast_low", "REAL"), ("forecast_high", "REAL")]
+
+
+def horizon_index(minutes):
+    return np.searchsorted(HORIZONS, np.asarray(minutes, dtype=float), side="left")
+
+
+# ------------------------------
+# Curves
+# ------------------------------
+class RunupCurves:
+    """
+    [category, horizon] arrays (row 0 is ALL), per-horizon adjustment
+    coefficients, and the residual quantiles the interval comes from.
+    """
+
+    def __init__(self, categories, n, lift, err_low, err_high, coef_momentum, coef_count, count_mean):
+        self.categories = list(categories)
+        self.codes = {c: i for i, c in enumerate(self.categories)}
+        self.n, self.lift = n, lift
+        self.err_low, self.err_high = err_low, err_high
+        self.coef_momentum, self.coef_count, self.count_mean = coef_momentum, coef_count, count_mean
+
+    def code(self, categories):
+        return np.array([self.codes.get(c, 0) for c in categories], dtype=np.int64)
+
+    def expected_growth(self, cat, h_prev, h_now):
+        """log growth of the bid the curve expects between two horizons."""
+        return self.lift[cat, h_prev] - self.lift[cat, h_now]
+
+    def predict(self, cat, h, log_bid, momentum, log_count):
+        """Vectorised: (point, low, high) final prices. Never below the current bid."""
+        lift = (self.lift[cat, h]
+                + self.coef_momentum[h] * momentum
+                + self.coef_count[h] * (log_count - self.count_mean[h]))
+        lift = np.maximum(lift, 0)
+        return (np.exp(log_bid + lift),
+                np.exp(log_bid + np.maximum(lift + self.err_low[cat, h], 0)),
+                np.exp(log_bid + lift + np.maximum(self.err_high[cat, h], 0)))
+
+
+def _grouped(cat, h, values, shape, fn):
+    """fn over values per (cat, h) cell -> (result [shape], counts [shape])."""
+    out = np.full(shape, np.nan)
+    counts = np.zeros(shape, dtype=np.int64)
+    df = pd.DataFrame({"c": cat, "h": h, "v": values})
+    for (c, hh), v in df.groupby(["c", "h"])["v"]:
+        out[c, hh] = fn(v.to_numpy())
+        counts[c, hh] = len(v)
+    return out, counts
+
+
+def _with_fallback(cells, counts, overall):
+    """Thin (category, horizon) cells take the ALL value; ALL row is overall."""
+    out = np.where(counts >= MIN_CURVE_POINTS, cells, overall[None, :])
+    out[0] = overall
+    return out
+
+
+def _per_horizon(h, values, fn, default=0.0):
+    out = np.full(len(HORIZON_LABELS), default)
+    for hh in range(len(HORIZON_LABELS)):
+        v = values[h == hh]
+        if len(v):
+            out[hh] = fn(v)
+    return out
+
+
+def fit_curves(points):
+    """
+    points: DataFrame from load_points (sold lots only). Returns RunupCurves,
+    or None if there's nothing to learn from.
+    """
+    points = points[points["final_price"] >= MIN_PRICE]
+    if points.empty:
+        return None
+
+    categories = [ALL] + sorted(set(points["category"].dropna()) - {ALL})
+    codes = {c: i for i, c in enumerate(categories)}
+    cat = points["category"].map(codes).fillna(0).to_numpy(dtype=np.int64)
+    h = horizon_index(points["minutes_left"])
+    shape = (len(categories), len(HORIZON_LABELS))
+
+    log_bid = np.log(np.maximum(points["current_bid"].to_numpy(dtype=float), MIN_BID))
+    lift = np.maximum(np.log(points["final_price"].to_numpy(dtype=float)) - log_bid, 0)
+    log_count = np.log1p(points["bid_count"].fillna(0).to_numpy(dtype=float))
+
+    # 1. Median run-up still to come, per category and horizon
+    overall = _per_horizon(h, lift, np.median)
+    cells, counts = _grouped(cat, h, lift, shape, np.median)
+    curve = _with_fallback(cells, counts, overall)
+    # More time left never means less run-up to come
+    curve = np.maximum.accumulate(curve, axis=1)
+
+    # 2. Per horizon: running ahead of the curve / busier than usual -> more or less to come
+    curves = RunupCurves(categories, counts, curve, None, None, None, None, None)
+    momentum = _momentum(points, curves, cat, h, log_bid)
+    count_mean = _per_horizon(h, log_count, np.mean)
+    resid = lift - curve[cat, h]
+
+    coef_momentum = np.zeros(len(HORIZON_LABELS))
+    coef_count = np.zeros(len(HORIZON_LABELS))
+    for hh in range(len(HORIZON_LABELS)):
+        sel = h == hh
+        if sel.sum() < MIN_CURVE_POINTS:
+            continue
+        X = np.column_stack([momentum[sel], log_count[sel] - count_mean[hh]])
+        coef, *_ = np.linalg.lstsq(X, resid[sel], rcond=None)
+        coef_momentum[hh], coef_count[hh] = coef
+
+    # 3. What the curve + adjustments still miss -> the interval
+    err = resid - coef_momentum[h] * momentum - coef_count[h] * (log_count - count_mean[h])
+    err_low = _with_fallback(_grouped(cat, h, err, shape, lambda v: np.quantile(v, LOW_Q))[0], counts,
+                             _per_horizon(h, err, lambda v: np.quantile(v, LOW_Q)))
+    err_high = _with_fallback(_grouped(cat, h, err, shape, lambda v: np.quantile(v, HIGH_Q))[0], counts,
+                              _per_horizon(h, err, lambda v: np.quantile(v, HIGH_Q)))
+
+    return RunupCurves(categories, counts, curve, err_low, err_high, coef_momentum, coef_count, count_mean)
+
+
+def _momentum(points, curves, cat, h, log_bid):
+    """
+    Observed log bid growth since the lot's previous point minus what the
+    curve expected over the same stretch. 0 for a lot's first point.
+    """
+    prev_bid = points["prev_bid"].to_numpy(dtype=float)
+    has_prev = ~np.isnan(prev_bid)
+    momentum = np.zeros(len(points))
+    if has_prev.any():
+        h_prev = horizon_index(points["prev_minutes"].to_numpy(dtype=float)[has_prev])
+        observed = log_bid[has_prev] - np.log(np.maximum(prev_bid[has_prev], MIN_BID))
+        momentum[has_prev] = observed - curves.expected_growth(cat[has_prev], h_prev, h[has_prev])
+    return momentum
+
+
+def forecast(curves, points):
+    """(point, low, high) arrays for a points DataFrame (load_points / load_pending shape)."""
+    cat = curves.code(points["category"].fillna(ALL))
+    h = horizon_index(points["minutes_left"])
+    log_bid = np.log(np.maximum(points["current_bid"].fillna(0).to_numpy(dtype=float), MIN_BID))
+    log_count = np.log1p(points["bid_count"].fillna(0).to_numpy(dtype=float))
+    momentum = _momentum(points, curves, cat, h, log_bid)
+    return curves.predict(cat, h, log_bid, momentum, log_count)
+
+
+# ------------------------------
+# DB
+# ------------------------------
+def setup(conn):
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(lots)")}
+    for name, col_type in FORECAST_COLUMNS:
+        if name not in cols:
+            conn.execute(f"ALTER TABLE lots ADD COLUMN {name} {col_type}")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CURVES_TABLE} (
+            category TEXT,
+            horizon INTEGER,
+            points INTEGER,
+            lift REAL,
+            err_low REAL,
+            err_high REAL,
+            coef_momentum REAL,
+            coef_count REAL,
+            count_mean REAL,
+            fitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (category, horizon)
+        )
+    """)
+    bid_history.setup(conn)
+
+
+def save_curves(conn, curves):
+    conn.execute(f"DELETE FROM {CURVES_TABLE}")
+    conn.executemany(f"""
+        INSERT INTO {CURVES_TABLE}
+            (category, horizon, points, lift, err_low, err_high, coef_momentum, coef_count, count_mean)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (c, hh, int(curves.n[i, hh]), float(curves.lift[i, hh]), float(curves.err_low[i, hh]),
+         float(curves.err_high[i, hh]), float(curves.coef_momentum[hh]), float(curves.coef_count[hh]),
+         float(curves.count_mean[hh]))
+        for i, c in enumerate(curves.categories)
+        for hh in range(len(HORIZON_LABELS))
+    ])
+
+
+def load_curves(conn):
+    """(RunupCurves, fitted_at) from runup_curves, or (None, None) before the first fit."""
+    try:
+        df = pd.read_sql_query(f"SELECT * FROM {CURVES_TABLE}", conn)
+    except Exception:
+        return None, None  # Table not created yet
+    if df.empty:
+        return None, None
+
+    categories = [ALL] + sorted(set(df["category"]) - {ALL})
+    codes = {c: i for i, c in enumerate(categories)}
+    shape = (len(categories), len(HORIZON_LABELS))
+    idx = (df["category"].map(codes).to_numpy(), df["horizon"].to_numpy())
+
+    def cells(col):
+        out = np.zeros(shape)
+        out[idx] = df[col].to_numpy(dtype=float)
+        return out
+
+    per_h = df[df["category"] == ALL].sort_values("horizon")
+    curves = RunupCurves(categories, cells("points").astype(np.int64), cells("lift"),
+                         cells("err_low"), cells("err_high"),
+                         per_h["coef_momentum"].to_numpy(), per_h["coef_count"].to_numpy(),
+                         per_h["count_mean"].to_numpy())
+    return curves, df["fitted_at"].min()
+
+
+def _with_prev(points):
+    """Adds prev_bid / prev_minutes: the same lot's previous trajectory point."""
+    same = points["lot_id"].eq(points["lot_id"].shift())
+    points["prev_bid"] = points["current_bid"].shift().where(same)
+    points["prev_minutes"] = points["minutes_left"].shift().where(same)
+    return points
+
+
+def load_points(conn):
+    """Every recorded trajectory point of a sold lot, with its final price and end time."""
+    return _with_prev(pd.read_sql_query(f"""
+        SELECT h.lot_id, h.current_bid, h.bid_count, h.minutes_left, h.seen_at,
+               s.final_price, s.predicted_category AS category
+        FROM {bid_history.TABLE} h
+        JOIN {archive_history.all_lots(conn)} s ON s.lot_id = h.lot_id
+        WHERE s.status = 'sold_history'
+        AND s.final_price >= ?
+        AND h.minutes_left > 0
+        ORDER BY h.lot_id, h.seen_at, h.rowid
+    """, conn, params=(MIN_PRICE,)))
+
+
+def load_pending(conn):
+    """
+    Pending lots as they are now, with the trajectory point before the
+    current bid (the latest point, unless it already is the current bid).
+    """
+    lots = pd.read_sql_query("""
+        SELECT lot_id, current_bid, bid_count, minutes_left, predicted_category AS category
+        FROM lots
+        WHERE status='pending' AND minutes_left > 0
+    """, conn)
+    recent = pd.read_sql_query(f"""
+        SELECT lot_id, current_bid AS prev_bid, minutes_left AS prev_minutes, k
+        FROM (
+            SELECT lot_id, current_bid, minutes_left,
+                   ROW_NUMBER() OVER (PARTITION BY lot_id ORDER BY seen_at DESC, rowid DESC) AS k
+            FROM {bid_history.TABLE}
+            WHERE lot_id IN (SELECT lot_id FROM lots WHERE status='pending')
+        )
+        WHERE k <= 2
+    """, conn)
+
+    latest = recent[recent["k"] == 1].drop(columns="k")
+    before = recent[recent["k"] == 2].drop(columns="k")
+    df = lots.merge(latest, on="lot_id", how="left").merge(before, on="lot_id", how="left", suffixes=("", "_2"))
+    current = df["prev_bid"] == df["current_bid"]
+    df.loc[current, "prev_bid"] = df.loc[current, "prev_bid_2"]
+    df.loc[current, "prev_minutes"] = df.loc[current, "prev_minutes_2"]
+    # A previous point that's not actually earlier would be noise, not momentum
+    later = df["prev_minutes"] <= df["minutes_left"]
+    df.loc[later, ["prev_bid", "prev_minutes"]] = np.nan
+    return df.drop(columns=["prev_bid_2", "prev_minutes_2"])
+
+
+def _save_forecasts(conn, rows):
+    conn.executemany("""
+        UPDATE lots SET forecast_price = ?, forecast_low = ?, forecast_high = ?
+        WHERE lot_id = ?
+    """, rows)
+
+
+# ------------------------------
+# Runs
+# ------------------------------
+def fit():
+    start = time.perf_counter()
+    db.run_write(lambda conn: (setup(conn), bid_history.prune(conn)), path=DB)
+
+    conn = db.connect(DB, readonly=True)
+    with metrics.timer("db_read"):
+        points = load_points(conn)
+    conn.close()
+
+    with metrics.timer("fit"):
+        curves = fit_curves(points)
+    if curves is None:
+        print("Forecast: no sold lots with recorded trajectories yet.")
+        return None
+
+    db.run_write(save_curves, curves, path=DB)
+    metrics.count("points_fitted", len(points))
+    print(f"Forecast: run-up curves for {len(curves.categories) - 1} categories from "
+          f"{len(points):,} points ({points['lot_id'].nunique():,} sold lots) "
+          f"in {time.perf_counter() - start:.1f}s.")
+    return curves
+
+
+def score(curves=None):
+    """forecast_price / low / high for every pending lot in one batch. Returns the number forecast."""
+    start = time.perf_counter()
+    db.run_write(setup, path=DB)
+
+    conn = db.connect(DB, readonly=True)
+    if curves is None:
+        curves, _ = load_curves(conn)
+    with metrics.timer("db_read"):
+        pending = load_pending(conn) if curves is not None else None
+    conn.close()
+
+    if curves is None:
+        print("Forecast: no run-up curves yet, run `python price_forecast.py fit`.")
+        return 0
+    if pending.empty:
+        print("Forecast: no pending lots.")
+        return 0
+
+    with metrics.timer("forecast"):
+        point, low, high = forecast(curves, pending)
+
+    rows = [(round(float(p), 2), round(float(lo), 2), round(float(hi), 2), lot_id)
+            for p, lo, hi, lot_id in zip(point, low, high, pending["lot_id"])]
+    with metrics.timer("db_write"):
+        db.run_write(_save_forecasts, rows, path=DB)
+    metrics.count("lots_forecast", len(rows))
+
+    lift = np.median(point / np.maximum(pending["current_bid"].fillna(0).to_numpy(dtype=float), MIN_BID))
+    print(f"Forecast: {len(rows):,} pending lots in {time.perf_counter() - start:.1f}s "
+          f"(median close x{lift:.2f} the current bid).")
+    return len(rows)
+
+
+def run(refit=False):
+    conn = db.connect(DB, readonly=True)
+    curves, fitted_at = load_curves(conn)
+    conn.close()
+
+    stale = fitted_at is None or \
+        datetime.strptime(fitted_at, "%Y-%m-%d %H:%M:%S") < datetime.utcnow() - timedelta(hours=REFIT_HOURS)
+    if refit or stale:
+        curves = fit() or curves
+    return score(curves)
+
+
+# ------------------------------
+# Backtest
+# ------------------------------
+def _scores(truth, point, low, high):
+    err = np.abs(point - truth) / truth
+    return (np.median(err), np.mean(err <= 0.25), np.mean((truth >= low - 0.01) & (truth <= high + 0.01)))
+
+
+def backtest(folds=4):
+    """
+    Rolling origin over recorded trajectories: sold lots ordered by when
+    they ended, curves fitted on everything before each fold and scored on
+    every trajectory point in it. Baseline: the current bid is the close.
+    """
+    conn = db.connect(DB, readonly=True)
+    points = load_points(conn) if bid_history.exists(conn) else pd.DataFrame()
+    conn.close()
+    if points.empty:
+        print("No sold lots with recorded trajectories yet.")
+        return None
+
+    ended = points.groupby("lot_id")["seen_at"].max().sort_values()
+    lots = ended.index.to_numpy()
+    edges = np.linspace(0, len(lots), folds + 2).astype(int)
+    print(f"Trajectories: {len(points):,} points, {len(lots):,} sold lots, {folds} folds")
+
+    results = []
+    for k in range(1, folds + 1):
+        train = points[points["lot_id"].isin(lots[:edges[k]])]
+        test = points[points["lot_id"].isin(lots[edges[k]:edges[k + 1]])]
+        curves = fit_curves(train)
+        if curves is None or test.empty:
+            continue
+        point, low, high = forecast(curves, test)
+        test = test.assign(point=point, low=low, high=high, h=horizon_index(test["minutes_left"]))
+        results.append(test)
+
+    if not results:
+        print("Not enough history for a single fold.")
+        return None
+    out = pd.concat(results)
+
+    print(f"\n{'horizon':<8}{'points':>9}{'model err':>11}{'±25%':>7}{'p10-p90':>9}{'bid err':>9}{'±25%':>7}")
+    for hh, label in list(enumerate(HORIZON_LABELS)) + [(None, "all")]:
+        sel = out if hh is None else out[out["h"] == hh]
+        if sel.empty:
+            continue
+        truth = sel["final_price"].to_numpy(dtype=float)
+        bid = np.maximum(sel["current_bid"].fillna(0).to_numpy(dtype=float), MIN_BID)
+        m_err, m_in, cover = _scores(truth, sel["point"].to_numpy(), sel["low"].to_numpy(), sel["high"].to_numpy())
+        b_err, b_in, _ = _scores(truth, bid, bid, bid)
+        print(f"{label:<8}{len(sel):>9,}{m_err:>11.0%}{m_in:>7.0%}{cover:>9.0%}{b_err:>9.0%}{b_in:>7.0%}")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Final-price forecast from bid trajectories")
+    parser.add_argument("command", choices=["run", "fit", "score"], nargs="?", default="run")
+    parser.add_argument("--refit", action="store_true", help="refit the curves even if they're fresh")
+    parser.add_argument("--backtest", action="store_true", help="rolling-origin backtest instead")
+    parser.add_argument("--folds", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.backtest:
+        backtest(args.folds)
+    else:
+        metrics.stage("price_forecast")
+        if args.command == "fit":
+            fit()
+        elif args.command == "score":
+            score()
+        else:
+            run(refit=args.refit)
@@ -0,0 +1,398 @@
+import os
+import io
+import json
+import time
+import zlib
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+import db
+import metrics
+import title_normalizer
+import archive_history
+
+# ============================================================
+# LEARNED PRICE MODEL
+#   python price_model.py            (update the model, score pending lots)
+#   python price_model.py train [--full]
+#   python price_model.py score
+#   python price_model.py --eval
+# Linear model on log(final price) over hashed features: title
+# tokens / brand / model number, image class (predicted_category,
+# weighted by classifier_confidence), location and quantity. No
+# bid count: a sold row's is final, a pending lot's is whatever it
+# is mid-auction, so it would skew every prediction (how bidding
+# runs up to the close is price_forecast.py's job). Fitted with
+# AdaGrad in minibatches, so an update
+# only walks the sold rows archived since the last one and starts
+# from the saved weights. Scoring every pending lot is one batch:
+# a gather + row sum over a fixed-width feature matrix.
+# Writes predicted_value (expected hammer price) for compute_edge_score.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+MODEL_DIR = "models"
+MODEL_FILE = os.path.join(MODEL_DIR, "price_model.npz")
+
+DIM = 2 ** 18             # Hashed feature space; collisions are rare at this size
+WIDTH = 24                # Max features per lot (extra title tokens are dropped)
+PAD, BIAS = 0, 1          # Reserved slots; hashed features start after them
+RESERVED = 2
+FEATURE_VERSION = 2       # Bump when features change: older saved models need a full refit
+
+LEARNING_RATE = 0.1
+L2 = 1e-6
+BATCH_SIZE = 2048
+EPOCHS = 4                # Full fit only; a warm update is one pass over the new rows
+CHUNK_SIZE = 100_000
+
+MIN_PRICE = 1.0
+MIN_TRAIN_ROWS = 200
+HOLDOUT = 0.1             # --eval: share of sold lots (by lot_id hash) held out
+
+SOLD_COLUMNS = ["lot_id", "title", "predicted_category", "classifier_confidence",
+                "location", "final_price"]
+
+
+# ------------------------------
+# Features
+# ------------------------------
+@lru_cache(maxsize=title_normalizer.CACHE_SIZE)
+def _slot(feature):
+    # crc32, not hash(): str hashes change between processes
+    return RESERVED + zlib.crc32(feature.encode()) % (DIM - RESERVED)
+
+
+def _qty_bucket(qty):
+    return "1" if qty <= 1 else "2" if qty == 2 else "3-5" if qty <= 5 else "6+"
+
+
+def lot_features(title, category, confidence, location):
+    """(slots, values) for one lot, bias aside."""
+    n = title_normalizer.normalize(title or "")
+    tokens = [w for w in n.tokens if len(w) > 1][:WIDTH - 10]
+    weight = 1 / np.sqrt(len(tokens)) if tokens else 0.0
+
+    feats = [(_slot("t:" + w), weight) for w in tokens]
+    feats.append((_slot("q:" + _qty_bucket(n.quantity)), 1.0))
+    if n.brand:
+        feats.append((_slot("b:" + n.brand), 1.0))
+    if n.model:
+        feats.append((_slot("m:" + n.model), 1.0))
+    if category:
+        feats.append((_slot("c:" + category), float(confidence) if confidence else 1.0))
+        if n.brand:
+            feats.append((_slot(f"cb:{category}|{n.brand}"), 1.0))
+    else:
+        feats.append((_slot("c:none"), 1.0))
+    feats.append((_slot("l:" + (location or "none")), 1.0))
+    return feats
+
+
+def featurize(rows):
+    """
+    rows of (title, category, confidence, location) ->
+    slots int32 [n, WIDTH], values float32 [n, WIDTH]. Unused cells point
+    at PAD with value 0, so they drop out of both predict and update.
+    """
+    n = len(rows)
+    slots = np.zeros((n, WIDTH), dtype=np.int32)
+    values = np.zeros((n, WIDTH), dtype=np.float32)
+    slots[:, 0], values[:, 0] = BIAS, 1.0
+
+    for i, (title, category, confidence, location) in enumerate(rows):
+        feats = lot_features(title, category, confidence, location)[:WIDTH - 1]
+        if feats:
+            s, v = zip(*feats)
+            slots[i, 1:1 + len(s)] = s
+            values[i, 1:1 + len(v)] = v
+    return slots, values
+
+
+# ------------------------------
+# Model
+# ------------------------------
+class PriceModel:
+    """Weights + AdaGrad state + training watermark, saved as one .npz."""
+
+    def __init__(self, weights=None, grad_sq=None, meta=None):
+        self.weights = np.zeros(DIM) if weights is None else weights
+        self.grad_sq = np.zeros(DIM) if grad_sq is None else grad_sq
+        self.meta = meta or {"history_rowid": 0, "rows_seen": 0, "updates": 0, "trained_at": None,
+                             "features": FEATURE_VERSION}
+
+    def predict_log(self, slots, values):
+        return (self.weights[slots] * values).sum(axis=1)
+
+    def predict(self, slots, values):
+        return np.expm1(self.predict_log(slots, values)).clip(min=0)
+
+    def partial_fit(self, slots, values, y, lr=LEARNING_RATE, batch_size=BATCH_SIZE, shuffle=None):
+        """One pass over (slots, values, log price) in minibatches."""
+        order = shuffle.permutation(len(y)) if shuffle is not None else np.arange(len(y))
+        for start in range(0, len(y), batch_size):
+            b = order[start:start + batch_size]
+            s, v = slots[b], values[b]
+            err = self.predict_log(s, v) - y[b]
+            grad = np.bincount(s.ravel(), weights=(err[:, None] * v).ravel(), minlength=DIM) / len(b)
+            touched = grad != 0
+            grad[touched] += L2 * self.weights[touched]
+            self.grad_sq += grad * grad
+            self.weights[touched] -= lr * grad[touched] / np.sqrt(self.grad_sq[touched])
+        self.weights[PAD] = 0.0
+        self.meta["rows_seen"] += len(y)
+
+    def save(self, path=MODEL_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        buf = io.BytesIO()
+        np.savez(buf, weights=self.weights, grad_sq=self.grad_sq, meta=np.array(json.dumps(self.meta)))
+        with open(path + ".tmp", "wb") as f:
+            f.write(buf.getvalue())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def read(cls, path=MODEL_FILE):
+        with np.load(path) as data:
+            return cls(data["weights"].copy(), data["grad_sq"].copy(), json.loads(str(data["meta"])))
+
+
+_cache = {"key": None, "model": None}
+
+
+def load_model(path=MODEL_FILE):
+    """
+    The saved model, re-read only when the file changes. None before the
+    first train, or when it was trained on a different feature set.
+    """
+    if not os.path.exists(path):
+        return None
+    key = (path, os.path.getmtime(path))
+    if _cache["key"] != key:
+        model = PriceModel.read(path)
+        if model.meta.get("features", 1) != FEATURE_VERSION:
+            print("Price model: saved model predates the current features, needs a full fit.")
+            model = None
+        _cache.update(key=key, model=model)
+    return _cache["model"]
+
+
+# ------------------------------
+# DB
+# ------------------------------
+def setup(conn):
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(lots)")}
+    if "predicted_value" not in cols:
+        conn.execute("ALTER TABLE lots ADD COLUMN predicted_value REAL")
+
+
+def _select_list(conn, table):
+    have = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    return ", ".join(c if c in have else f"NULL AS {c}" for c in SOLD_COLUMNS)
+
+
+def _to_arrays(rows):
+    with metrics.timer("featurize"):
+        slots, values = featurize([(r[1], r[2], r[3], r[4]) for r in rows])
+    y = np.log1p(np.array([r[5] for r in rows], dtype=float))
+    return slots, values, y
+
+
+def sold_chunks(conn, after_rowid=0):
+    """
+    (lot_ids, slots, values, y, last_rowid) chunks of priced sold lots.
+    Past the watermark in lots_history, or all of `lots` on a DB that has
+    never been archived (there the watermark stays 0: every run is a full fit).
+    """
+    history = archive_history.all_lots(conn) != "lots"
+    table = archive_history.HISTORY_TABLE if history else "lots"
+    select = _select_list(conn, table)
+
+    while True:
+        rows = conn.execute(f"""
+            SELECT rowid, {select} FROM {table}
+            WHERE rowid > ? AND status='sold_history' AND final_price >= ?
+            ORDER BY rowid LIMIT ?
+        """, (after_rowid, MIN_PRICE, CHUNK_SIZE)).fetchall()
+        if not rows:
+            return
+        after_rowid = rows[-1][0]
+        yield ([r[1] for r in rows], *_to_arrays([r[1:] for r in rows]), after_rowid if history else 0)
+        if len(rows) < CHUNK_SIZE:
+            return
+
+
+def hot_sold(conn):
+    """Sold rows archive_history hasn't moved yet (only read on a full fit)."""
+    if archive_history.all_lots(conn) == "lots":
+        return None
+    rows = conn.execute(f"""
+        SELECT rowid, {_select_list(conn, 'lots')} FROM lots
+        WHERE status='sold_history' AND final_price >= ?
+    """, (MIN_PRICE,)).fetchall()
+    return ([r[1] for r in rows], *_to_arrays([r[1:] for r in rows])) if rows else None
+
+
+def _concat(chunks):
+    ids = [i for c in chunks for i in c[0]]
+    return (ids, *(np.concatenate([c[k] for c in chunks]) for k in (1, 2, 3)))
+
+
+# ------------------------------
+# Training
+# ------------------------------
+def fit(slots, values, y, epochs=EPOCHS, seed=1, model=None):
+    model = model or PriceModel()
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        model.partial_fit(slots, values, y, shuffle=rng)
+    return model
+
+
+def train(full=False, path=MODEL_FILE):
+    """
+    Warm update from the saved model over sold rows archived since the last
+    run, or a fresh fit over all sold history (first run, --full, or a DB
+    with no lots_history). Returns the model, or None without enough data.
+    """
+    start = time.perf_counter()
+    model = None if full else load_model(path)
+
+    conn = db.connect(DB, readonly=True)
+    try:
+        if model is not None and archive_history.all_lots(conn) == "lots":
+            model = None
+        after = model.meta["history_rowid"] if model else 0
+        chunks = list(sold_chunks(conn, after))
+        # A sold row still in lots gets trained on again once archived; one extra look is harmless
+        hot = hot_sold(conn) if model is None else None
+    finally:
+        conn.close()
+
+    if hot:
+        chunks.append((*hot, chunks[-1][4] if chunks else 0))
+    if not chunks:
+        print("Price model: no new sold lots.")
+        return model
+
+    ids, slots, values, y = _concat(chunks)
+    watermark = max(c[4] for c in chunks)
+
+    with metrics.timer("train"):
+        if model is None:
+            if len(y) < MIN_TRAIN_ROWS:
+                print(f"Price model: only {len(y)} sold lots, need {MIN_TRAIN_ROWS}.")
+                return None
+            model = fit(slots, values, y)
+            mode = "full fit"
+        else:
+            model.partial_fit(slots, values, y, shuffle=np.random.default_rng(model.meta["updates"]))
+            mode = "warm update"
+
+    model.meta.update(history_rowid=watermark, updates=model.meta["updates"] + 1,
+                      trained_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    model.save(path)
+    metrics.count("rows_trained", len(y))
+
+    rmse = float(np.sqrt(np.mean((model.predict_log(slots, values) - y) ** 2)))
+    print(f"Price model: {mode} on {len(y):,} sold lots ({model.meta['rows_seen']:,} seen in total), "
+          f"train RMSE {rmse:.3f} log-$ in {time.perf_counter() - start:.1f}s.")
+    return model
+
+
+# ------------------------------
+# Scoring
+# ------------------------------
+def _save_predictions(conn, rows):
+    conn.executemany("UPDATE lots SET predicted_value = ? WHERE lot_id = ?", rows)
+
+
+def score(path=MODEL_FILE):
+    """predicted_value for every pending lot in one batch. Returns the number scored."""
+    start = time.perf_counter()
+    model = load_model(path)
+    if model is None:
+        print("Price model: not trained yet, run `python price_model.py train`.")
+        return 0
+
+    db.run_write(setup, path=DB)
+    conn = db.connect(DB, readonly=True)
+    with metrics.timer("db_read"):
+        rows = conn.execute("""
+            SELECT lot_id, title, predicted_category, classifier_confidence, location
+            FROM lots WHERE status='pending'
+        """).fetchall()
+    conn.close()
+    if not rows:
+        print("Price model: no pending lots.")
+        return 0
+
+    with metrics.timer("featurize"):
+        slots, values = featurize([r[1:] for r in rows])
+    with metrics.timer("predict"):
+        predicted = np.round(model.predict(slots, values), 2)
+
+    with metrics.timer("db_write"):
+        db.run_write(_save_predictions, [(float(p), r[0]) for p, r in zip(predicted, rows)], path=DB)
+    metrics.count("lots_scored", len(rows))
+
+    print(f"Price model: {len(rows):,} pending lots scored in {time.perf_counter() - start:.1f}s "
+          f"(median predicted ${np.median(predicted):,.2f}).")
+    return len(rows)
+
+
+# ------------------------------
+# Evaluation
+# ------------------------------
+def evaluate():
+    """
+    Fresh fit on ~90% of sold history (split by lot_id hash), scored on the
+    rest, next to the baseline the dashboard uses today (global median).
+    """
+    conn = db.connect(DB, readonly=True)
+    try:
+        chunks = list(sold_chunks(conn))
+        hot = hot_sold(conn)
+    finally:
+        conn.close()
+    if hot:
+        chunks.append((*hot, 0))
+    if not chunks:
+        print("No sold history yet.")
+        return
+
+    ids, slots, values, y = _concat(chunks)
+    test = np.array([zlib.crc32(str(i).encode()) % 1000 < HOLDOUT * 1000 for i in ids])
+    print(f"Sold lots:  {len(y):,} ({test.sum():,} held out)")
+    if (~test).sum() < MIN_TRAIN_ROWS or not test.any():
+        return
+
+    start = time.perf_counter()
+    model = fit(slots[~test], values[~test], y[~test])
+    print(f"Fit:        {time.perf_counter() - start:.1f}s")
+
+    truth = np.expm1(y[test])
+    baseline = np.full(len(truth), np.median(np.expm1(y[~test])))
+    for label, pred in (("model", model.predict(slots[test], values[test])), ("median", baseline)):
+        err = np.abs(pred - truth) / truth
+        print(f"  {label:<7} median abs error {np.median(err):.0%}, "
+              f"within ±25% {np.mean(err <= 0.25):.0%}, within ±50% {np.mean(err <= 0.5):.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Learned price model for pending lots")
+    parser.add_argument("command", choices=["run", "train", "score"], nargs="?", default="run")
+    parser.add_argument("--full", action="store_true", help="refit from scratch instead of a warm update")
+    parser.add_argument("--eval", action="store_true", help="report holdout accuracy instead")
+    args = parser.parse_args()
+
+    if args.eval:
+        evaluate()
+    else:
+        metrics.stage("price_model")
+        if args.command in ("run", "train"):
+            train(full=args.full)
+        if args.command in ("run", "score"):
+            score()
@@ -0,0 +1,231 @@
+import time
+import numpy as np
+import config
+
+# ============================================================
+# PRICING RULES ENGINE
+# One copy of the sliding-scale max-bid math (config.py rules),
+# shared by the bidders, the export and the dashboard.
+# ============================================================
+
+BUY = "BUY NOW"
+IGNORE = "IGNORE"
+
+
+# ------------------------------
+# Scalar Fast Path
+# ------------------------------
+def required_profit(market_value):
+    if market_value < 50:
+        return config.PROFIT_MIN_LOW
+    elif market_value < 200:
+        return config.PROFIT_MIN_MID
+    return market_value * config.PROFIT_PERCENT_HIGH
+
+
+def fee_multiplier(bp=None):
+    # Missing or zero BP means the scraper never saw one -> assume the default
+    if bp is None or bp != bp or bp <= 0:
+        bp = config.DEFAULT_BP
+    return 1 + bp + config.TAX_RATE
+
+
+def _num(value):
+    # None / NaN count as 0, same as np.nan_to_num on the vectorized path
+    return 0.0 if value is None or value != value else value
+
+
+def calculate_max_bid(market_value, bp=None):
+    """
+    Max bid for one lot. Returns 0 when the item isn't worth buying at any price.
+    """
+    market_value = _num(market_value)
+    if market_value <= 0:
+        return 0
+
+    # Revenue after eBay fees, minus the profit we DEMAND and logistics
+    net_revenue = market_value * (1 - config.EBAY_FEES)
+    allowable_spend = net_revenue - required_profit(market_value) - config.PICKUP_COST_FLAT
+
+    if allowable_spend <= 0:
+        return 0 # Not worth buying at ANY price
+
+    # Total Paid = Bid * (1 + BP + Tax)  ->  Bid = Total Paid / (1 + BP + Tax)
+    max_bid = allowable_spend / fee_multiplier(bp)
+
+    # Safety Brake
+    return round(min(max_bid, config.HARD_MAX_BID_LIMIT), 2)
+
+
+def expected_profit(market_value, current_bid, bp=None):
+    """
+    Profit if we win at the current bid (after BP, tax, eBay fees and logistics).
+    """
+    net_revenue = _num(market_value) * (1 - config.EBAY_FEES)
+    total_cost = _num(current_bid) * fee_multiplier(bp)
+    return net_revenue - total_cost - config.PICKUP_COST_FLAT
+
+
+def recommend(market_value, current_bid, max_bid):
+    if market_value and market_value > 0 and (current_bid or 0) < max_bid:
+        return BUY
+    return IGNORE
+
+
+# ------------------------------
+# Vectorized Path (whole columns)
+# ------------------------------
+def _as_float(values):
+    return np.asarray(values, dtype="float64")
+
+
+def required_profit_array(market_value):
+    mv = _as_float(market_value)
+    return np.select(
+        [mv < 50, mv < 200],
+        [config.PROFIT_MIN_LOW, config.PROFIT_MIN_MID],
+        default=mv * config.PROFIT_PERCENT_HIGH,
+    )
+
+
+def fee_multiplier_array(bp, size=None):
+    if bp is None:
+        return np.full(size, 1 + config.DEFAULT_BP + config.TAX_RATE)
+    bp = _as_float(bp)
+    bp = np.where(np.isnan(bp) | (bp <= 0), config.DEFAULT_BP, bp)
+    return 1 + bp + config.TAX_RATE
+
+
+def max_bid_array(market_value, bp=None):
+    mv = np.nan_to_num(_as_float(market_value), nan=0.0)
+
+    net_revenue = mv * (1 - config.EBAY_FEES)
+    allowable_spend = net_revenue - required_profit_array(mv) - config.PICKUP_COST_FLAT
+
+    max_bid = allowable_spend / fee_multiplier_array(bp, mv.shape)
+    max_bid = np.minimum(max_bid, config.HARD_MAX_BID_LIMIT)
+    max_bid = np.where((mv > 0) & (allowable_spend > 0), max_bid, 0.0)
+    return np.round(max_bid, 2)
+
+
+def expected_profit_array(market_value, current_bid, bp=None):
+    mv = np.nan_to_num(_as_float(market_value), nan=0.0)
+    bid = np.nan_to_num(_as_float(current_bid), nan=0.0)
+    return mv * (1 - config.EBAY_FEES) - bid * fee_multiplier_array(bp, mv.shape) - config.PICKUP_COST_FLAT
+
+
+def price_frame(df):
+    """
+    Adds my_max_bid, expected_profit and action_recommendation to a lots DataFrame
+    in one vectorized pass. Needs market_value and current_bid; buyers_premium is optional.
+    """
+    bp = df["buyers_premium"] if "buyers_premium" in df else None
+    mv = np.nan_to_num(_as_float(df["market_value"]), nan=0.0)
+    bid = np.nan_to_num(_as_float(df["current_bid"]), nan=0.0)
+
+    max_bid = max_bid_array(mv, bp)
+
+    df["my_max_bid"] = max_bid
+    df["expected_profit"] = expected_profit_array(mv, bid, bp)
+    df["action_recommendation"] = np.where((mv > 0) & (bid < max_bid), BUY, IGNORE)
+    return df
+
+
+# ------------------------------
+# Price Buckets / Deal Score (dashboard)
+# ------------------------------
+# A price lands in the first bucket whose upper edge it doesn't exceed
+BUCKET_EDGES = [25, 100, 500]
+BUCKET_LABELS = ["low", "mid", "high", "premium"]
+
+
+def bucket_index(prices):
+    return np.searchsorted(BUCKET_EDGES, _as_float(prices), side="left")
+
+
+def assign_buckets(prices):
+    return np.take(BUCKET_LABELS, bucket_index(prices))
+
+
+def bucket_medians_from_prices(prices):
+    import pandas as pd
+
+    prices = pd.Series(_as_float(prices)).dropna()
+    if prices.empty:
+        return {}
+    return prices.groupby(assign_buckets(prices)).median().to_dict()
+
+
+def deal_score_array(current_bid, bucket_medians):
+    """
+    0-100 score: how far the typical sold price for the bid's bucket sits
+    above the bid (after default BP).
+    """
+    bid = np.nan_to_num(_as_float(current_bid), nan=0.0)
+    adjusted = bid * (1 + config.DEFAULT_BP)
+
+    medians = np.array([bucket_medians.get(b, 0) or 0 for b in BUCKET_LABELS], dtype="float64")
+    expected = medians[bucket_index(adjusted)]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = (expected / adjusted - 1) * 100
+
+    score = np.clip(score, 0, 100)
+    return np.where((adjusted > 0) & (expected > 0), score, 0.0)
+
+
+# ------------------------------
+# Benchmark / Parity Check
+# ------------------------------
+def _reference_max_bid(market_value, bp):
+    # Frozen copy of the original export_data.calculate_safe_limit math,
+    # kept only so the benchmark can prove the engine didn't drift.
+    if market_value <= 0: return 0
+    if bp != bp or bp <= 0: bp = config.DEFAULT_BP
+    if market_value < 50:
+        required = config.PROFIT_MIN_LOW
+    elif market_value < 200:
+        required = config.PROFIT_MIN_MID
+    else:
+        required = market_value * config.PROFIT_PERCENT_HIGH
+    allowable_spend = market_value * (1 - config.EBAY_FEES) - required
+    if allowable_spend <= 0: return 0.00
+    return round(min(allowable_spend / (1 + bp + config.TAX_RATE), config.HARD_MAX_BID_LIMIT), 2)
+
+
+def benchmark(csv_path="FULL_EXPORT_2026-02-05_18-48.csv", repeat=5):
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    print(f"Loaded {len(df)} rows from {csv_path}")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        legacy = df.apply(lambda r: _reference_max_bid(r["market_value"], r["buyers_premium"]), axis=1)
+    legacy_ms = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        priced = price_frame(df.copy())
+    engine_ms = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    scalar = [calculate_max_bid(mv, bp) for mv, bp in zip(df["market_value"], df["buyers_premium"])]
+    scalar_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = int((np.abs(priced["my_max_bid"] - legacy) > 0.01).sum())
+    scalar_mismatches = int((np.abs(priced["my_max_bid"] - np.asarray(scalar)) > 0.01).sum())
+
+    # The CSV was written by the old export, so its my_max_bid column is a second oracle
+    export_mismatches = 0
+    if "my_max_bid" in df:
+        export_mismatches = int((np.abs(priced["my_max_bid"] - df["my_max_bid"]) > 0.01).sum())
+
+    print(f"df.apply (row-wise):  {legacy_ms:8.2f} ms")
+    print(f"price_frame (vector): {engine_ms:8.2f} ms  ({legacy_ms / max(engine_ms, 1e-9):.0f}x)")
+    print(f"scalar loop:          {scalar_ms:8.2f} ms")
+    print(f"Mismatches -> reference: {mismatches} | scalar path: {scalar_mismatches} | CSV column: {export_mismatches}")
+
+
+if __name__ == "__main__":
+    benchmark()
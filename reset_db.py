@@ -10,6 +10,7 @@ try:
     conn = sqlite3.connect("hibid_lots.db")
     cursor = conn.cursor()
     cursor.execute("DROP TABLE IF EXISTS lots")
+    cursor.execute("DROP TABLE IF EXISTS tile_fingerprints")  # Or unchanged tiles would never be re-inserted
     conn.commit()
     conn.close()
     print("✅ SUCCESS: Old data wiped. Table deleted.")
@@ -8,6 +8,9 @@ echo =================================================
 :: 1. Start the Dashboard (Only once, it stays open)
 start "THE DASHBOARD" cmd /k python -m streamlit run dashboard_gui.py
 
+:: 1b. Start the warm browser pool (scraper/validator borrow browsers from it)
+start "BROWSER POOL" cmd /k python browser_pool.py serve
+
 :LOOP
 echo.
 echo [STATUS] Starting Batch Scan at %TIME%...
@@ -6,15 +6,33 @@ print("=== AUCTION AUTONOMOUS CYCLE START ===")
 # Run scraper
 subprocess.run(["python", "scraper_v8.py"])
 
+# Canonical search keys for new titles
+subprocess.run(["python", "title_normalizer.py"])
+
 # Run lifecycle
 subprocess.run(["python", "lifecycle_manager.py"])
 
+# Move sold history out of the hot lots table
+subprocess.run(["python", "archive_history.py"])
+
+# Value pending lots from similar sold lots (eBay validator only gets the rest)
+subprocess.run(["python", "comps.py"])
+
+# Learned price model: warm update on newly archived sales, then predicted_value for pending lots
+subprocess.run(["python", "price_model.py"])
+
+# Closing-price forecast from bid trajectories (edge score measures the undervalue against it)
+subprocess.run(["python", "price_forecast.py"])
+
 # Run velocity computation
 subprocess.run(["python", "compute_velocity.py"])
 
 # Run category stats (rarity)
 subprocess.run(["python", "compute_category_stats.py"])
 
+# Run price bucket medians (dashboard deal score)
+subprocess.run(["python", "compute_bucket_stats.py"])
+
 # Run edge scoring
 subprocess.run(["python", "compute_edge_score.py"])
 
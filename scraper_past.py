@@ -1,14 +1,14 @@
-import sqlite3
+import db
+import crawl_frontier
+import coverage_planner
+import checkpoints
 import time
 import re
-import os
-from selenium import webdriver
+import browser_pool
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 
 # --- CONFIGURATION ---
 DB_NAME = "hibid_lots.db"
@@ -20,18 +20,8 @@ TARGETS = [
     {"zip": "46173", "name": "Rushville, IN"}
 ]
 
-def setup_db():
-    db_path = os.path.abspath(DB_NAME)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    try: cursor.execute("ALTER TABLE lots ADD COLUMN final_price REAL")
-    except: pass
-    try: cursor.execute("ALTER TABLE lots ADD COLUMN location TEXT")
-    except: pass
-    try: cursor.execute("ALTER TABLE lots ADD COLUMN ref_url TEXT")
-    except: pass
-    
-    cursor.execute('''
+def setup(conn):
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS lots (
             lot_id TEXT PRIMARY KEY,
             title TEXT,
@@ -51,31 +41,110 @@ def setup_db():
             ref_url TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
-    return db_path
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(lots)")}
+    for name, col_type in [("final_price", "REAL"), ("location", "TEXT"), ("ref_url", "TEXT")]:
+        if name not in cols:
+            conn.execute(f"ALTER TABLE lots ADD COLUMN {name} {col_type}")
+
+def setup_db():
+    db.run_write(setup, path=DB_NAME)
+
+# ------------------------------
+# Save One Page (runs on the DB writer thread)
+# ------------------------------
+def save_page(conn, lots, city_name):
+    conn.executemany("""
+        INSERT INTO lots (lot_id, title, final_price, status, url, image_url, location)
+        VALUES (?, ?, ?, 'sold_history', ?, ?, ?)
+        ON CONFLICT(lot_id) DO UPDATE SET
+            final_price=excluded.final_price,
+            status='sold_history',
+            location=excluded.location,
+            last_seen=CURRENT_TIMESTAMP
+    """, [(lot["lot_id"], lot["title"], lot["price"], lot["link"], lot["img_url"], city_name) for lot in lots])
+
+def parse_card(card, errors=None):
+    try:
+        card_text = card.text.replace("\n", " | ")
+        
+        # 1. FIND LINK
+        link_el = None
+        try:
+            links = card.find_elements(By.TAG_NAME, "a")
+            for l in links:
+                if "/lot/" in l.get_attribute("href"):
+                    link_el = l
+                    break
+            if not link_el: link_el = card.find_element(By.CSS_SELECTOR, "h2 a")
+        except (NoSuchElementException, TypeError): pass
+        if not link_el: return None
+
+        title = link_el.text.strip()
+        link = link_el.get_attribute("href")
+        lot_id = link.split('/')[-2] if 'lot' in link else link[-10:]
+
+        # 2. EXTRACT PRICE (Aggressive Logic) 💰
+        price = 0.0
+        
+        # Method A: Look for "Price Realized" or "High Bid" followed by ANY number
+        # This catches "Price Realized: 10.00" even without "$"
+        match = re.search(r'(?:Price Realized|Sold|High Bid)[^\d]*([\d,]+\.\d{2})', card_text)
+        if match:
+            price = float(match.group(1).replace(',', ''))
+        
+        # Method B: Look for specific HTML classes often used in archives
+        if price == 0:
+            try:
+                # Try multiple class names used by HiBid
+                for cls in ["lot-realized-price", "lot-high-bid", "lot-price"]:
+                    try:
+                        el = card.find_element(By.CLASS_NAME, cls)
+                        val = el.text.replace("$", "").replace("USD", "").replace(",", "").strip()
+                        price = float(val)
+                        if price > 0: break
+                    except (NoSuchElementException, ValueError): pass
+            except WebDriverException as e:
+                if errors: errors.count("parse_card.price", e)
+
+        # Method C: Last Resort - Grab the biggest number that looks like money
+        if price == 0:
+            numbers = re.findall(r'\$([\d,]+\.\d{2})', card_text)
+            if numbers:
+                # Usually the highest dollar amount on a card is the price
+                vals = [float(n.replace(',', '')) for n in numbers]
+                price = max(vals)
+
+        # 3. IMAGE
+        img_url = ""
+        try: img_url = card.find_element(By.TAG_NAME, "img").get_attribute("src")
+        except NoSuchElementException: pass
+
+        return {"lot_id": lot_id, "title": title, "price": price, "link": link,
+                "img_url": img_url, "card_text": card_text}
+    except Exception as e:
+        if errors: errors.count("parse_card", e)
+        return None
 
 def run_multi_city_scraper():
     print(f"--- SCRAPER V29.0 (THE INDUSTRIAL VACUUM) ---")
-    db_path = setup_db()
-    
-    chrome_options = Options()
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled") 
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    setup_db()
     
-    prefs = {
-        "profile.default_content_setting_values.geolocation": 2, 
-        "profile.default_content_setting_values.notifications": 2 
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
+    # Warm browser from browser_pool.py if it's running, else a fresh lean one
+    driver = browser_pool.acquire("scraper_past")
     
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
-    for target in TARGETS:
+    planned = coverage_planner.plan([t["zip"] for t in TARGETS], RADIUS)
+    cycle = coverage_planner.SeenSet()
+
+    # Picks up an interrupted run: finished cities are skipped, the current one resumes at its page
+    job = checkpoints.Job("scraper_past")
+
+    for target in [t for t in TARGETS if t["zip"] in planned]:
         city_name = target['name']
         zip_code = target['zip']
+
+        if job.done(f"zip:{zip_code}"):
+            print(f"\n✅ {city_name} already harvested in this run, skipping.")
+            continue
         
         print(f"\n==========================================")
         print(f"📍 TRAVELING TO: {city_name} ({zip_code})")
@@ -94,16 +163,32 @@ def run_multi_city_scraper():
                 try:
                      driver.find_element(By.CSS_SELECTOR, "a[href='/lots/past']").click()
                      time.sleep(5)
-                except: pass
+                except WebDriverException as e:
+                    job.error("history_mode_click", e, key=zip_code)
             else:
                 print("   ✅ History Mode Active.")
-        except: pass
+        except WebDriverException as e:
+            job.error("history_mode", e, key=zip_code)
 
         harvested_count = 0
         current_page = 1
+        pages_walked = 0
         missed_examples = 0
-        
-        while current_page <= MAX_PAGES_PER_CITY:
+
+        # Newest pages first until they're all known, then jump to where the backfill stopped
+        frontier = crawl_frontier.Frontier("past", zip_code)
+        cursor_page = frontier.next_page()
+        if cursor_page > 1:
+            print(f"   Backfill cursor at page {cursor_page}" + (" (history complete)" if frontier.exhausted() else ""))
+
+        resume_page = int(job.get(f"zip:{zip_code}:page", 1))
+        if resume_page > 1:
+            print(f"   [checkpoint] Resuming at page {resume_page}")
+            driver.get(crawl_frontier.page_url(base_url, resume_page))
+            time.sleep(5)
+            current_page = resume_page
+
+        while pages_walked < MAX_PAGES_PER_CITY:
             print(f"   [Page {current_page}] Vacuuming...")
             
             driver.execute_script("window.scrollBy(0, 1000);")
@@ -112,87 +197,39 @@ def run_multi_city_scraper():
             time.sleep(2)
             
             cards = driver.find_elements(By.TAG_NAME, "app-lot-tile")
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            for card in cards:
-                try:
-                    card_text = card.text.replace("\n", " | ")
-                    
-                    # 1. FIND LINK
-                    link_el = None
-                    try:
-                        links = card.find_elements(By.TAG_NAME, "a")
-                        for l in links:
-                            if "/lot/" in l.get_attribute("href"):
-                                link_el = l
-                                break
-                        if not link_el: link_el = card.find_element(By.CSS_SELECTOR, "h2 a")
-                    except: pass
-                    if not link_el: continue
-
-                    title = link_el.text.strip()
-                    link = link_el.get_attribute("href")
-                    lot_id = link.split('/')[-2] if 'lot' in link else link[-10:]
-
-                    # 2. EXTRACT PRICE (Aggressive Logic) 💰
-                    price = 0.0
-                    
-                    # Method A: Look for "Price Realized" or "High Bid" followed by ANY number
-                    # This catches "Price Realized: 10.00" even without "$"
-                    match = re.search(r'(?:Price Realized|Sold|High Bid)[^\d]*([\d,]+\.\d{2})', card_text)
-                    if match:
-                        price = float(match.group(1).replace(',', ''))
-                    
-                    # Method B: Look for specific HTML classes often used in archives
-                    if price == 0:
-                        try:
-                            # Try multiple class names used by HiBid
-                            for cls in ["lot-realized-price", "lot-high-bid", "lot-price"]:
-                                try:
-                                    el = card.find_element(By.CLASS_NAME, cls)
-                                    val = el.text.replace("$", "").replace("USD", "").replace(",", "").strip()
-                                    price = float(val)
-                                    if price > 0: break
-                                except: pass
-                        except: pass
-
-                    # Method C: Last Resort - Grab the biggest number that looks like money
-                    if price == 0:
-                        numbers = re.findall(r'\$([\d,]+\.\d{2})', card_text)
-                        if numbers:
-                            # Usually the highest dollar amount on a card is the price
-                            vals = [float(n.replace(',', '')) for n in numbers]
-                            price = max(vals)
-
-                    # LOGGING MISSED ITEMS (First 3 only)
-                    if price == 0:
-                        if missed_examples < 3:
-                            print(f"      [Skipped - No Price Detected]: {card_text[:80]}...")
-                            missed_examples += 1
-                        continue 
-
-                    # 3. IMAGE
-                    img_url = ""
-                    try: img_url = card.find_element(By.TAG_NAME, "img").get_attribute("src")
-                    except: pass
-                    
-                    # SAVE
-                    cursor.execute("""
-                        INSERT INTO lots (lot_id, title, final_price, status, url, image_url, location)
-                        VALUES (?, ?, ?, 'sold_history', ?, ?, ?)
-                        ON CONFLICT(lot_id) DO UPDATE SET
-                            final_price=excluded.final_price,
-                            status='sold_history',
-                            location=?, 
-                            last_seen=CURRENT_TIMESTAMP
-                    """, (lot_id, title, price, link, img_url, city_name, city_name))
-                    
-                    harvested_count += 1
-                except: continue
-            
-            conn.commit()
-            conn.close()
+            lots = [lot for lot in (parse_card(card, job.errors) for card in cards) if lot]
+
+            for lot in lots:
+                # LOGGING MISSED ITEMS (First 3 only)
+                if lot["price"] == 0 and missed_examples < 3:
+                    print(f"      [Skipped - No Price Detected]: {lot['card_text'][:80]}...")
+                    missed_examples += 1
+
+            ids = [lot["lot_id"] for lot in lots if lot["price"] > 0]
+            known = crawl_frontier.known_lot_ids(ids, "final_price IS NOT NULL")
+            frontier.observe(current_page, ids, known=set(ids) <= known)
+            lots = [lot for lot in cycle.filter(lots, key=lambda lot: lot["lot_id"]) if lot["price"] > 0]
+
+            db.run_write(save_page, lots, city_name, path=DB_NAME)
+            harvested_count += sum(1 for lot in lots if lot["lot_id"] not in known)
+            job.set(f"zip:{zip_code}:page", current_page + 1)
+
+            pages_walked += 1
+            if current_page + 1 > cursor_page:
+                cursor_page = current_page + 1
+                frontier.save_cursor(cursor_page)
+
+            # Caught up with what we already have: skip straight to the deepest page reached before
+            if frontier.done and current_page + 1 < cursor_page:
+                if frontier.exhausted():
+                    print(f"   [=] {city_name} history already complete past page {current_page}.")
+                    break
+                print(f"   [>>] Pages {current_page - frontier.streak + 1}-{current_page} already known, jumping to page {cursor_page}")
+                driver.get(crawl_frontier.page_url(base_url, cursor_page))
+                time.sleep(5)
+                current_page = cursor_page
+                frontier.streak = 0
+                continue
 
             # NEXT PAGE
             try:
@@ -203,13 +240,21 @@ def run_multi_city_scraper():
                 driver.execute_script("arguments[0].click();", next_btn)
                 time.sleep(3)
                 current_page += 1
-            except:
+            except TimeoutException:
                 print(f"   [X] End of {city_name} history.")
+                frontier.save_cursor(cursor_page, exhausted=True)
+                break
+            except WebDriverException as e:
+                # Not the end of history, just a failed click: the cursor stays put for next run
+                job.error("next_page", e, key=f"{zip_code}:{current_page}")
                 break
         
+        job.mark_done(f"zip:{zip_code}")
         print(f"✅ Finished {city_name}. Harvested: {harvested_count}")
 
-    driver.quit()
+    browser_pool.release(driver)
+    job.finish()
+    print(f"Coverage: {cycle.report()}")
     print("--- GLOBAL HARVEST COMPLETE ---")
 
 if __name__ == "__main__":
@@ -1,23 +1,41 @@
-import sqlite3
 import time
 import re
+import hashlib
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import lifecycle_manager
+import lot_events
+import bid_history
+import crawl_frontier
+import coverage_planner
+import browser_profile
+import browser_pool
+import checkpoints
+import db
+import metrics
 
 DB = "hibid_lots.db"
 
+LOTS_URL = "https://hibid.com/lots"   # bench/ points this at its local mock site
+
 ZIP_CODES = ["62629", "62704"]
 RADIUS = 50
 MAX_PAGES = 10
 
-CHROMIUM_PATH = "/usr/bin/chromium"
-CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
+# Unchanged tiles (same title/bid/count/image) skip the full upsert
+FP_TABLE = "tile_fingerprints"
+BUMP_EVERY_SECONDS = 300     # ...and only refresh last_seen/time left this often
+ALWAYS_WRITE_MINUTES = 60    # Lots this close to the end always get their time left written
+
+# Pages skipped by the early stop keep their old bid / time left until the next full
+# walk: twice per ending-soon window, so every lot is seen with 30+ minutes still to go
+FULL_SWEEP_SECONDS = ALWAYS_WRITE_MINUTES * 60 // 2
+
+# A crashed run is only resumed within about one scrape cycle; after that its ZIPs are stale
+RESUME_MAX_AGE = 15 * 60
 
 
 # ------------------------------
@@ -44,136 +62,285 @@ def parse_minutes(text):
 
 
 # ------------------------------
-# DB Connection
+# Selenium Driver
 # ------------------------------
-def get_db():
-    conn = sqlite3.connect(DB, timeout=30)
-    conn.execute("PRAGMA journal_mode=WAL")
-    return conn
+def get_driver():
+    # Warm browser from browser_pool.py if it's running, else a fresh lean one
+    return browser_pool.acquire("scraper_v9")
 
 
 # ------------------------------
-# Selenium Driver
+# Tile Parsing
 # ------------------------------
-def get_driver():
-    options = Options()
-    options.binary_location = CHROMIUM_PATH
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--window-size=1920,1080")
+def parse_tile(card, errors=None):
+    try:
+        link_el = card.find_element(By.TAG_NAME, "a")
+        link = link_el.get_attribute("href")
+        lot_id = link.split("/")[-2]
+        title = link_el.text.strip()
+
+        text = card.text
+
+        # Current bid
+        bid_match = re.search(r'\$([\d,]+\.?\d*)', text)
+        current_bid = float(bid_match.group(1).replace(",", "")) if bid_match else 0.0
 
-    service = Service(CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(service=service, options=options)
-    driver.set_page_load_timeout(30)
-    return driver
+        # Bid count
+        bid_count_match = re.search(r'(\d+)\s+Bid', text)
+        bid_count = int(bid_count_match.group(1)) if bid_count_match else 0
+
+        # Time remaining
+        time_match = re.search(r'(\d+d)?\s*(\d+h)?\s*(\d+m)', text)
+        time_remaining = time_match.group(0).strip() if time_match else None
+        minutes_left = parse_minutes(time_remaining)
+
+        # Image
+        try:
+            img_url = card.find_element(By.TAG_NAME, "img").get_attribute("src")
+        except NoSuchElementException:
+            img_url = None
+
+        status = "pending" if minutes_left and minutes_left > 0 else "ended"
+
+        return (lot_id, title, current_bid, bid_count, time_remaining, minutes_left, link, img_url, status)
+
+    except Exception as e:
+        if errors: errors.count("parse_tile", e)
+        return None
+
+
+# ------------------------------
+# Change Detection
+# ------------------------------
+def fingerprint(tile):
+    lot_id, title, current_bid, bid_count, _, _, _, img_url, _ = tile
+    key = f"{title}\x1f{current_bid}\x1f{bid_count}\x1f{img_url}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def setup_fingerprints(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FP_TABLE} (
+            lot_id TEXT PRIMARY KEY,
+            fingerprint TEXT
+        )
+    """)
+
+
+class TileFilter:
+    """
+    Last fingerprint per lot (in memory, persisted to tile_fingerprints so the
+    next run starts warm). Splits a page into tiles that need the full upsert
+    and tiles that only need a cheap last_seen bump.
+    """
+
+    def __init__(self):
+        db.run_write(setup_fingerprints, path=DB)
+        # Only live lots: anything else gets a full upsert if it shows up again
+        self.fps = dict(db.fetchall(f"""
+            SELECT f.lot_id, f.fingerprint
+            FROM {FP_TABLE} f JOIN lots l ON l.lot_id = f.lot_id
+            WHERE l.status = 'pending'
+        """, path=DB))
+        self.bumped = {}
+        self.updated = set()   # lot_ids written as changed this run
+
+    def split(self, tiles):
+        changed, bump = [], []
+        now = time.monotonic()
+
+        for tile in tiles:
+            lot_id, minutes_left = tile[0], tile[5]
+            if self.fps.get(lot_id) != fingerprint(tile):
+                changed.append(tile)
+            elif (minutes_left is not None and minutes_left <= ALWAYS_WRITE_MINUTES) \
+                    or now - self.bumped.get(lot_id, 0) >= BUMP_EVERY_SECONDS:
+                bump.append(tile)
+
+        return changed, bump
+
+    def commit(self, changed, bump):
+        # Only called after the write succeeded
+        now = time.monotonic()
+        for tile in changed:
+            self.fps[tile[0]] = fingerprint(tile)
+            self.updated.add(tile[0])
+        for tile in changed + bump:
+            self.bumped[tile[0]] = now
+
+
+def save_fingerprints(conn, tiles):
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {FP_TABLE} (lot_id, fingerprint) VALUES (?, ?)",
+        [(tile[0], fingerprint(tile)) for tile in tiles]
+    )
+
+
+def bump_tiles(conn, tiles):
+    # Same status rule as the upsert, without touching anything else
+    conn.executemany("""
+        UPDATE lots
+        SET time_remaining=?,
+            minutes_left=?,
+            status=CASE WHEN ? > 0 THEN 'pending' ELSE status END,
+            last_seen=CURRENT_TIMESTAMP
+        WHERE lot_id=?
+    """, [(t[4], t[5], t[5], t[0]) for t in tiles])
+
+
+def save_page(conn, changed, bump):
+    save_tiles(conn, changed)
+    save_fingerprints(conn, changed)
+    bump_tiles(conn, bump)
+
+
+# ------------------------------
+# Save One Page (runs on the DB writer thread)
+# ------------------------------
+def save_tiles(conn, tiles):
+    lot_events.setup(conn)
+    bid_history.setup(conn)
+    cursor = conn.cursor()
+    points = []
+
+    for tile in tiles:
+        lot_id, title, current_bid, bid_count, time_remaining, minutes_left, link, img_url, status = tile
+
+        # Previous values, so only real changes get published to the dashboard
+        old = cursor.execute("""
+            SELECT current_bid, bid_count, time_remaining, minutes_left, status
+            FROM lots WHERE lot_id=?
+        """, (lot_id,)).fetchone()
+
+        cursor.execute("""
+        INSERT INTO lots (
+            lot_id,
+            title,
+            current_bid,
+            bid_count,
+            time_remaining,
+            minutes_left,
+            url,
+            image_url,
+            status,
+            last_seen
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(lot_id) DO UPDATE SET
+            current_bid=excluded.current_bid,
+            bid_count=excluded.bid_count,
+            time_remaining=excluded.time_remaining,
+            minutes_left=excluded.minutes_left,
+            status=CASE
+                WHEN excluded.minutes_left > 0 THEN 'pending'
+                ELSE lots.status
+            END,
+            last_seen=CURRENT_TIMESTAMP
+        """, tile)
+
+        fresh = {
+            "current_bid": current_bid,
+            "bid_count": bid_count,
+            "time_remaining": time_remaining,
+            "minutes_left": minutes_left,
+        }
+        if old is None:
+            fresh.update(title=title, url=link, image_url=img_url, status=status)
+            lot_events.publish(conn, lot_id, fresh)
+        else:
+            fresh["status"] = "pending" if minutes_left and minutes_left > 0 else old[4]
+            changed = {k: v for k, v, prev in zip(fresh, fresh.values(), old) if v != prev}
+            if changed:
+                lot_events.publish(conn, lot_id, changed)
+
+        # Trajectory point for price_forecast: only when the bid actually moved
+        if old is None or (current_bid, bid_count) != (old[0], old[1]):
+            points.append((lot_id, current_bid, bid_count, minutes_left))
+
+    bid_history.record(conn, points)
 
 
 # ------------------------------
 # Scrape One ZIP
 # ------------------------------
-def scrape_zip(driver, zip_code):
+def scrape_zip(driver, zip_code, seen, cycle, job):
+
+    base_url = f"{LOTS_URL}?zip={zip_code}&miles={RADIUS}&lot_type=ONLINE"
+    with metrics.timer("page_load"):
+        driver.get(base_url)
+    with metrics.timer("browser_wait"):
+        time.sleep(3)
 
-    base_url = f"https://hibid.com/lots?zip={zip_code}&miles={RADIUS}&lot_type=ONLINE"
-    driver.get(base_url)
-    time.sleep(3)
+    # Stop once pages come back exactly as last time, except on the periodic full sweep
+    frontier = crawl_frontier.Frontier("active", zip_code, sweep_every=FULL_SWEEP_SECONDS)
+    full_sweep = frontier.full_sweep_due()
 
     for page in range(1, MAX_PAGES + 1):
 
         print(f"[ZIP {zip_code}] PAGE {page}")
+        page_start = time.perf_counter()
 
-        time.sleep(2)
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+        with metrics.timer("browser_wait"):
+            time.sleep(2)
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(2)
 
-        cards = driver.find_elements(By.TAG_NAME, "app-lot-tile")
+        with metrics.timer("dom_find_tiles"):
+            cards = driver.find_elements(By.TAG_NAME, "app-lot-tile")
 
         if not cards:
             break
 
-        conn = get_db()
-        cursor = conn.cursor()
-
-        for card in cards:
-            try:
-                link_el = card.find_element(By.TAG_NAME, "a")
-                link = link_el.get_attribute("href")
-                lot_id = link.split("/")[-2]
-                title = link_el.text.strip()
-
-                text = card.text
-
-                # Current bid
-                bid_match = re.search(r'\$([\d,]+\.?\d*)', text)
-                current_bid = float(bid_match.group(1).replace(",", "")) if bid_match else 0.0
-
-                # Bid count
-                bid_count_match = re.search(r'(\d+)\s+Bid', text)
-                bid_count = int(bid_count_match.group(1)) if bid_count_match else 0
-
-                # Time remaining
-                time_match = re.search(r'(\d+d)?\s*(\d+h)?\s*(\d+m)', text)
-                time_remaining = time_match.group(0).strip() if time_match else None
-                minutes_left = parse_minutes(time_remaining)
-
-                # Image
-                try:
-                    img_url = card.find_element(By.TAG_NAME, "img").get_attribute("src")
-                except:
-                    img_url = None
-
-                status = "pending" if minutes_left and minutes_left > 0 else "ended"
-
-                cursor.execute("""
-                INSERT INTO lots (
-                    lot_id,
-                    title,
-                    current_bid,
-                    bid_count,
-                    time_remaining,
-                    minutes_left,
-                    url,
-                    image_url,
-                    status,
-                    last_seen
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ON CONFLICT(lot_id) DO UPDATE SET
-                    current_bid=excluded.current_bid,
-                    bid_count=excluded.bid_count,
-                    time_remaining=excluded.time_remaining,
-                    minutes_left=excluded.minutes_left,
-                    status=CASE
-                        WHEN excluded.minutes_left > 0 THEN 'pending'
-                        ELSE lots.status
-                    END,
-                    last_seen=CURRENT_TIMESTAMP
-                """, (
-                    lot_id,
-                    title,
-                    current_bid,
-                    bid_count,
-                    time_remaining,
-                    minutes_left,
-                    link,
-                    img_url,
-                    status
-                ))
-
-            except Exception as e:
-                continue
-
-        conn.commit()
-        conn.close()
+        stats = browser_profile.page_stats(driver)
+        print(f"   page {(time.perf_counter() - page_start) * 1000:.0f} ms | {browser_profile.format_stats(stats)}")
+        metrics.count("pages")
+        metrics.count("page_bytes", stats["bytes"])
+
+        # Read every tile first, then hand only what changed to the writer thread
+        with metrics.timer("dom_parse_tiles"):
+            parsed = [t for t in (parse_tile(card, job.errors) for card in cards) if t]
+        ids = [t[0] for t in parsed]
+        changed, bump = seen.split(parsed)
+        # "Known" means this page looks as it did on this ZIP's last visit, judged on
+        # every tile: one another ZIP already wrote this cycle still counts if it changed
+        known = (not changed and not seen.updated.intersection(ids)
+                 and set(ids) == frontier.previous_ids(page))
+
+        # Overlapping radii: only the write skips tiles another ZIP ingested this cycle
+        fresh = {t[0] for t in cycle.filter(parsed)}
+        changed = [t for t in changed if t[0] in fresh]
+        bump = [t for t in bump if t[0] in fresh]
+        if changed or bump:
+            with metrics.timer("db_write"):
+                db.run_write(save_page, changed, bump, path=DB)
+            seen.commit(changed, bump)
+        metrics.count("tiles", len(parsed))
+        metrics.count("tiles_changed", len(changed))
+        metrics.count("tiles_bumped", len(bump))
+
+        ratio = len(changed) / len(fresh) if fresh else 0
+        print(f"   {len(changed)}/{len(fresh)} tiles changed ({ratio:.0%}), {len(bump)} bumped")
+
+        frontier.observe(page, ids, known=known)
+        if frontier.done and not full_sweep:
+            print(f"   Last {frontier.streak} pages unchanged, stopping early.")
+            break
 
         # Try next page
         try:
             next_btn = driver.find_element(By.XPATH, "//a[contains(@class,'page-link') and contains(.,'Next')]")
             driver.execute_script("arguments[0].click();", next_btn)
-            time.sleep(3)
-        except:
+            with metrics.timer("browser_wait"):
+                time.sleep(3)
+        except NoSuchElementException:
+            break
+        except WebDriverException as e:
+            job.error("next_page", e, key=f"{zip_code}:{page}")
             break
 
+    if full_sweep:
+        frontier.mark_full_sweep()
+
 
 # ------------------------------
 # Main Runner
@@ -181,16 +348,37 @@ def scrape_zip(driver, zip_code):
 def run_scraper():
 
     print("=== AUCTION SCRAPER (SELENIUM PRO) ===")
+    metrics.stage("scraper_v9")
+
+    zip_codes = coverage_planner.plan(ZIP_CODES, RADIUS)
+
+    with metrics.timer("browser_start"):
+        driver = get_driver()
+    seen = TileFilter()
+    cycle = coverage_planner.SeenSet()
+
+    # After a recent crash, ZIPs already scraped in that run are skipped
+    job = checkpoints.Job("scraper_v9", max_age=RESUME_MAX_AGE)
+
+    for zip_code in zip_codes:
+        if job.done(f"zip:{zip_code}"):
+            print(f"[ZIP {zip_code}] already scraped in this run, skipping.")
+            continue
+        with metrics.timer("zip_total"):
+            scrape_zip(driver, zip_code, seen, cycle, job)
+        job.mark_done(f"zip:{zip_code}")
+
+    job.finish()
 
-    driver = get_driver()
+    print(f"Coverage: {cycle.report()}")
 
-    for zip_code in ZIP_CODES:
-        scrape_zip(driver, zip_code)
+    browser_pool.release(driver)
 
-    driver.quit()
+    db.run_write(lambda conn: (lot_events.setup(conn), lot_events.prune(conn)), path=DB)
 
     print("Running lifecycle...")
-    lifecycle_manager.run_lifecycle()
+    with metrics.timer("lifecycle"):
+        lifecycle_manager.run_lifecycle()
 
     print("Scrape complete.")
 
@@ -1,5 +1,6 @@
-import sqlite3
-from twilio.rest import Client
+import db
+import asyncio
+import alerts
 
 DB = "hibid_lots.db"
 
@@ -11,15 +12,7 @@ TO_NUMBER = "YOUR_PHONE_NUMBER"
 
 ALERT_THRESHOLD = 60
 
-def send_sms(body):
-    client = Client(ACCOUNT_SID, AUTH_TOKEN)
-    client.messages.create(
-        body=body,
-        from_=FROM_NUMBER,
-        to=TO_NUMBER
-    )
-
-conn = sqlite3.connect(DB)
+conn = db.connect(DB)
 cursor = conn.cursor()
 
 cursor.execute("""
@@ -33,9 +26,19 @@ LIMIT 3;
 
 rows = cursor.fetchall()
 
-for lot_id, title, score in rows:
-    message = f"🔥 High Edge Deal\nLot: {lot_id}\nScore: {round(score,1)}\n{title[:80]}"
-    send_sms(message)
-
 conn.close()
-print("SMS alerts processed.")
+
+# One Twilio client for the whole run, and no repeat texts for the same lot/score band
+dispatcher = alerts.AlertDispatcher(
+    [alerts.SmsSink(ACCOUNT_SID, AUTH_TOKEN, FROM_NUMBER, TO_NUMBER)],
+    DB,
+    band_size=10,
+    name="sms_alerts"
+)
+deals = [
+    dispatcher.make_deal(lot_id, title, score, f"Score: {round(score, 1)}")
+    for lot_id, title, score in rows
+]
+sent = asyncio.run(dispatcher.dispatch(deals))
+dispatcher.close()
+print(f"SMS alerts processed ({sent} sent).")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline is flat scripts at the repo root; make them importable from tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
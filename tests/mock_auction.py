@@ -0,0 +1,126 @@
+import re
+import json
+import time
+import threading
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================
+# MOCK AUCTION
+# Lot pages with the selectors bid_service reads (high bid, time
+# left, bid form), a bid endpoint that records when each bid
+# landed against the lot's real end, and a FakePage that drives
+# it over HTTP so BiddingService runs without a browser.
+# ============================================================
+
+
+class MockAuction:
+    """with MockAuction() as site: site.add_lot("1", ends_in=5); site.url("1")"""
+
+    def __init__(self):
+        self.lots = {}
+        self.bids = []       # (lot_id, amount, seconds before end it landed)
+        self.page_loads = []
+        auction = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, body):
+                data = body.encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                m = re.match(r"^/lot/([^/?]+)", self.path)
+                if self.path.startswith("/home"):
+                    return self._reply(200, "<html>home</html>")
+                if not m or m.group(1) not in auction.lots:
+                    return self._reply(404, "")
+                auction.page_loads.append(m.group(1))
+                self._reply(200, auction.render(m.group(1)))
+
+            def do_POST(self):
+                m = re.match(r"^/lot/([^/]+)/bid$", self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+                lot = auction.lots.get(m.group(1)) if m else None
+                if lot is None:
+                    return self._reply(404, "")
+                amount = float(form["bidAmount"][0])
+                auction.bids.append((m.group(1), amount, lot["end"] - time.monotonic()))
+                if time.monotonic() < lot["end"] and amount > lot["bid"]:
+                    lot["bid"] = amount
+                self._reply(200, json.dumps({"ok": True}))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def add_lot(self, lot_id, ends_in, bid=10.0):
+        self.lots[lot_id] = {"end": time.monotonic() + ends_in, "bid": bid}
+
+    def url(self, lot_id):
+        return f"{self.base}/lot/{lot_id}"
+
+    def render(self, lot_id):
+        lot = self.lots[lot_id]
+        left = max(0, int(lot["end"] - time.monotonic()))
+        d, rest = divmod(left, 86400)
+        h, rest = divmod(rest, 3600)
+        m, s = divmod(rest, 60)
+        return f"""<html><body>
+            <div class="lot-high-bid">${lot['bid']:,.2f}</div>
+            <div class="lot-time-left">{d}d {h}h {m}m {s}s</div>
+            <form action="/lot/{lot_id}/bid" method="post">
+                <input name="bidAmount"><button class="lot-bid-button">Bid</button>
+            </form>
+        </body></html>"""
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+class FakePage:
+    """The slice of Playwright's Page that bid_service uses, over plain HTTP."""
+
+    def __init__(self):
+        self.url = "about:blank"
+        self.html = ""
+        self.fields = {}
+
+    async def goto(self, url, wait_until=None):
+        import asyncio
+        self.html = await asyncio.to_thread(lambda: urllib.request.urlopen(url).read().decode())
+        self.url = url
+
+    async def text_content(self, selector, timeout=None):
+        cls = selector.lstrip(".")
+        m = re.search(rf'class="{re.escape(cls)}">([^<]*)<', self.html)
+        if not m:
+            raise TimeoutError(selector)
+        return m.group(1)
+
+    async def fill(self, selector, value):
+        self.fields[selector] = value
+
+    async def click(self, selector, timeout=None):
+        import asyncio
+        if selector != "button.lot-bid-button":
+            raise TimeoutError(selector)
+        data = urllib.parse.urlencode({"bidAmount": self.fields["input[name='bidAmount']"]}).encode()
+        await asyncio.to_thread(lambda: urllib.request.urlopen(self.url + "/bid", data=data).read())
+
+    async def close(self):
+        pass
@@ -0,0 +1,165 @@
+import asyncio
+import json
+
+import httpx
+
+import alerts
+
+WEBHOOK = "https://discord.test/api/webhooks/1/abc"
+
+
+class MockWebhook:
+    """
+    Discord stand-in: records every delivered POST, answers 429 the first
+    `throttle` times and 500 to the posts numbered in `fail_at`.
+    """
+
+    def __init__(self, throttle=0, status=204, fail_at=()):
+        self.posts = []
+        self.throttle = throttle
+        self.status = status
+        self.fail_at = set(fail_at)
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        if self.throttle:
+            self.throttle -= 1
+            return httpx.Response(429, json={"retry_after": 0.01})
+        if self.calls in self.fail_at:
+            return httpx.Response(500)
+        self.posts.append(json.loads(request.content))
+        return httpx.Response(self.status)
+
+
+class FailingSink:
+    name = "broken"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def send(self, deals, delivered):
+        self.calls += 1
+        raise RuntimeError("down")
+
+
+class RecordingSink:
+    name = "stdout"
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, deals, delivered):
+        self.sent.extend(d["lot_id"] for d in deals)
+        delivered(deals)
+
+
+def _deals(dispatcher, n, score=55):
+    return [dispatcher.make_deal(f"lot{i}", f"Item {i}", score, "x", url="u") for i in range(n)]
+
+
+def _run(dispatcher, deals, webhook):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(webhook)) as client:
+            for sink in dispatcher.sinks:
+                if isinstance(sink, alerts.DiscordSink):
+                    sink.client = client
+            return await dispatcher.dispatch(deals)
+    return asyncio.run(go())
+
+
+def test_discord_batches_and_retries_after_429(tmp_path):
+    webhook = MockWebhook(throttle=1)
+    sink = alerts.DiscordSink(WEBHOOK, None, interval=0)
+    d = alerts.AlertDispatcher([sink], str(tmp_path / "t.db"), name="bidder")
+    try:
+        assert _run(d, _deals(d, 23), webhook) == 23
+        assert [len(p["embeds"]) for p in webhook.posts] == [10, 10, 3]
+        # Already in the ledger: nothing goes out again
+        assert _run(d, _deals(d, 23), webhook) == 0
+        assert len(webhook.posts) == 3
+    finally:
+        d.close()
+
+
+def test_batches_sent_before_a_failure_are_not_reposted(tmp_path):
+    webhook = MockWebhook(fail_at={2})
+    sink = alerts.DiscordSink(WEBHOOK, None, interval=0)
+    d = alerts.AlertDispatcher([sink], str(tmp_path / "t.db"), name="bidder")
+    try:
+        # Batch 2 fails, batch 3 never goes out; batch 1 is in the ledger
+        assert _run(d, _deals(d, 23), webhook) == 10
+        assert [len(p["embeds"]) for p in webhook.posts] == [10]
+
+        assert _run(d, _deals(d, 23), webhook) == 13
+        assert [len(p["embeds"]) for p in webhook.posts] == [10, 10, 3]
+        assert webhook.posts[1]["embeds"][0]["fields"][1]["value"] == "lot10"
+    finally:
+        d.close()
+
+
+def test_still_throttled_after_retry_is_not_marked(tmp_path):
+    webhook = MockWebhook(throttle=2)
+    sink = alerts.DiscordSink(WEBHOOK, None, interval=0)
+    d = alerts.AlertDispatcher([sink], str(tmp_path / "t.db"), name="bidder")
+    try:
+        assert _run(d, _deals(d, 3), webhook) == 0
+        assert _run(d, _deals(d, 3), webhook) == 3
+        assert len(webhook.posts) == 1
+    finally:
+        d.close()
+
+
+def test_failed_sink_only_retries_its_own_deals(tmp_path):
+    webhook = MockWebhook()
+    broken, ok = FailingSink(), alerts.DiscordSink(WEBHOOK, None, interval=0)
+    d = alerts.AlertDispatcher([ok, broken], str(tmp_path / "t.db"), name="bidder")
+    try:
+        assert _run(d, _deals(d, 5), webhook) == 5
+        assert len(webhook.posts) == 1
+
+        # Discord already has them; only the broken sink tries again
+        _run(d, _deals(d, 5), webhook)
+        assert len(webhook.posts) == 1
+        assert broken.calls == 2
+    finally:
+        d.close()
+
+
+def test_channels_do_not_block_each_other(tmp_path):
+    path = str(tmp_path / "t.db")
+    edge, sms = RecordingSink(), RecordingSink()
+    sms.name = "sms"
+    d1 = alerts.AlertDispatcher([edge], path, band_size=10, name="edge_alerts")
+    d2 = alerts.AlertDispatcher([sms], path, band_size=10, name="sms_alerts")
+    d3 = alerts.AlertDispatcher([RecordingSink()], path, band_size=25, name="bidder")
+    try:
+        assert asyncio.run(d1.dispatch(_deals(d1, 3))) == 3
+        assert asyncio.run(d2.dispatch(_deals(d2, 3))) == 3
+        assert asyncio.run(d3.dispatch(_deals(d3, 3))) == 3
+        assert sms.sent == ["lot0", "lot1", "lot2"]
+        # New band on one channel only re-alerts there
+        assert asyncio.run(d1.dispatch(_deals(d1, 3, score=65))) == 3
+        assert asyncio.run(d2.dispatch(_deals(d2, 3))) == 0
+    finally:
+        for d in (d1, d2, d3):
+            d.close()
+
+
+def test_old_ledger_rows_still_count_as_sent(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE alert_ledger (lot_id TEXT, score_band INTEGER, "
+                 "sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (lot_id, score_band))")
+    conn.execute("INSERT INTO alert_ledger (lot_id, score_band) VALUES ('lot0', 5)")
+    conn.commit()
+    conn.close()
+
+    sink = RecordingSink()
+    d = alerts.AlertDispatcher([sink], path, band_size=10, name="edge_alerts")
+    try:
+        asyncio.run(d.dispatch(_deals(d, 2)))
+        assert sink.sent == ["lot1"]
+    finally:
+        d.close()
@@ -0,0 +1,28 @@
+from bench import run
+
+
+def _ok(stage, seconds, ops=None):
+    return {"stage": stage, "status": "ok", "seconds": seconds, "ops": ops or {}}
+
+
+def test_median_of_repeats_ignores_one_slow_pass():
+    passes = [_ok("export", 2.0, {"pass": 1}), _ok("export", 9.0, {"pass": 2}), _ok("export", 2.1, {"pass": 3})]
+    result = run.median_result(passes)
+    assert result["seconds"] == 2.1 and result["ops"] == {"pass": 3}
+    assert result["samples"] == [2.0, 9.0, 2.1]
+
+    previous = {"stages": [_ok("export", 2.0)]}
+    assert run.regressions([result], previous) == []
+
+
+def test_failed_pass_fails_the_stage():
+    failed = {"stage": "export", "status": "error", "reason": "exit code 1"}
+    assert run.median_result([_ok("export", 2.0), failed])["status"] == "error"
+
+
+def test_short_stages_get_wider_tolerance():
+    previous = {"stages": [_ok("lifecycle", 0.6), _ok("export", 4.0)]}
+    # +40% on a 0.6 s stage is jitter; +40% on a 4 s stage is a regression
+    slow = run.regressions([_ok("lifecycle", 0.84), _ok("export", 5.6)], previous)
+    assert [s[0] for s in slow] == ["export"]
+    assert run.regressions([_ok("lifecycle", 0.95)], previous)[0][0] == "lifecycle"
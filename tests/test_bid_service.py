@@ -0,0 +1,179 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import config
+import bidder
+import bid_service
+from tests.mock_auction import MockAuction, FakePage
+
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setattr(config, "DRY_RUN", False)
+    with MockAuction() as auction:
+        yield auction
+
+
+def make_service(pool_size=3):
+    service = bid_service.BiddingService(pool_size=pool_size)
+    for _ in range(pool_size):
+        service._checkin(FakePage())
+    return service
+
+
+def test_parse_time_left():
+    assert bid_service.parse_time_left("1d 2h 3m 4s") == 93784
+    assert bid_service.parse_time_left("0d 0h 0m 9s") == 9
+    assert bid_service.parse_time_left("45m") == 2700
+    assert bid_service.parse_time_left("Closed") is None
+    assert bid_service.parse_time_left(None) is None
+
+
+def test_seconds_left_ages_db_value():
+    now = datetime(2026, 10, 1, 12, 0, 0)
+    seen = (now - timedelta(seconds=90)).strftime("%Y-%m-%d %H:%M:%S")
+    assert bidder.seconds_left(5, seen, now) == 210
+    assert bidder.seconds_left(1, seen, now) == 0
+    assert bidder.seconds_left(2, None, now) == 120
+
+
+def test_snipe_uses_page_clock_not_stale_db(site):
+    site.add_lot("7", ends_in=3.0)
+
+    async def go():
+        service = make_service()
+        # Scheduled off a stale DB row that thinks there's a minute to go...
+        service.schedule_snipe("7", site.url("7"), 25.0, 60, lead=1.0)
+        # ...then the warmed page's own clock moves it
+        left = await service.warm([("7", site.url("7"))])
+        service.schedule_snipe("7", site.url("7"), 25.0, left["7"], lead=1.0)
+        await service.wait_for_snipes()
+
+    asyncio.run(go())
+    assert len(site.bids) == 1
+    lot_id, amount, before_end = site.bids[0]
+    assert (lot_id, amount) == ("7", 25.0)
+    # Page time has whole-second resolution: lands 1-2.5 s before the end, never after
+    assert 0.5 < before_end < 2.5
+
+
+def test_fresher_end_time_reschedules(site):
+    site.add_lot("8", ends_in=2.0)
+
+    async def go():
+        service = make_service()
+        first = service.schedule_snipe("8", site.url("8"), 30.0, 120, lead=0.5)
+        same = service.schedule_snipe("8", site.url("8"), 30.0, 121, lead=0.5)
+        assert same is first
+        moved = service.schedule_snipe("8", site.url("8"), 30.0, 2.0, lead=0.5)
+        assert moved is not first
+        await service.wait_for_snipes()
+        assert first.cancelled()
+
+    asyncio.run(go())
+    assert len(site.bids) == 1
+    assert 0 < site.bids[0][2] < 1.5
+
+
+def test_snipe_gets_its_own_warmed_page(site):
+    for lot_id in ("a", "b", "c", "d"):
+        site.add_lot(lot_id, ends_in=30)
+
+    async def go():
+        service = make_service(pool_size=2)
+        await service.warm([("a", site.url("a")), ("b", site.url("b")), ("c", site.url("c"))])
+        assert set(service.warmed) == {"a", "b"}
+        loads = len(site.page_loads)
+        assert await service.place_bid(site.url("b"), 12.0, lot_id="b")
+        # b's page was already on b: no navigation before the bid
+        assert site.page_loads[loads:] == []
+        # Next poll: a no longer wanted, d is -> a's page is reused for d
+        await service.warm([("b", site.url("b")), ("d", site.url("d"))])
+        assert set(service.warmed) == {"b", "d"}
+
+    asyncio.run(go())
+
+
+def test_skips_lot_already_over_limit(site):
+    site.add_lot("9", ends_in=30, bid=50.0)
+
+    async def go():
+        service = make_service()
+        return await service.place_bid(site.url("9"), 40.0, max_current=40.0, lot_id="9")
+
+    assert asyncio.run(go()) is False
+    assert site.bids == []
+
+
+def test_real_browser_against_mock_auction(site, tmp_path, monkeypatch):
+    # Same flow through Playwright; only where a Chromium for it is installed
+    site.add_lot("5", ends_in=4.0)
+    monkeypatch.setattr(bid_service, "BASE_URL", site.base)
+    monkeypatch.setattr(bid_service.browser_pool, "try_checkout", lambda *a, **k: None)
+
+    async def go():
+        service = bid_service.BiddingService(pool_size=1, storage_state=str(tmp_path / "state.json"))
+        try:
+            await service.__aenter__()
+        except Exception as e:
+            pytest.skip(f"no Playwright browser: {e}")
+        try:
+            left = await service.warm([("5", site.url("5"))])
+            service.schedule_snipe("5", site.url("5"), 20.0, left["5"], lead=1.5)
+            await service.wait_for_snipes()
+        finally:
+            await service.__aexit__(None, None, None)
+
+    asyncio.run(go())
+    assert len(site.bids) == 1 and 0 < site.bids[0][2] < 3
+
+
+def test_finished_snipes_are_dropped(site):
+    site.add_lot("6", ends_in=1.0)
+
+    async def go():
+        service = make_service()
+        first = service.schedule_snipe("6", site.url("6"), 15.0, 120, lead=0.5)
+        service.schedule_snipe("6", site.url("6"), 15.0, 1.0, lead=0.5)
+        await service.wait_for_snipes()
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        assert service._snipes == {} and service._firing == set()
+        # A stale row still showing time left doesn't snipe it again
+        assert service.schedule_snipe("6", site.url("6"), 15.0, 30, lead=0.5) is None
+
+    asyncio.run(go())
+    assert len(site.bids) == 1
+
+
+def test_maintain_renews_then_swaps_browser_when_quiet(monkeypatch):
+    renewed, swaps = [], []
+    monkeypatch.setattr(bid_service.browser_pool, "renew", lambda lease: renewed.append(lease) or True)
+
+    async def go():
+        service = make_service()
+        service.lease = {"id": 0, "nonce": "n"}
+
+        async def swap():
+            swaps.append(service.page_loads)
+            service.page_loads = 0
+        service._disconnect = swap
+        service._connect = lambda: asyncio.sleep(0)
+
+        await service.maintain()
+        assert len(renewed) == 1 and swaps == []
+
+        # Due for recycling, but a snipe fires within the quiet window: wait
+        service.page_loads = bid_service.browser_pool.RECYCLE_AFTER_PAGES
+        service.schedule_snipe("x", "u", 10.0, 60)
+        await service.maintain()
+        assert swaps == []
+
+        service._snipes["x"][0].cancel()
+        await asyncio.sleep(0)
+        await service.maintain()
+        assert swaps == [bid_service.browser_pool.RECYCLE_AFTER_PAGES]
+
+    asyncio.run(go())
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+import browser_pool
+
+
+class FakeBrowser(browser_pool.PooledBrowser):
+    """No Chromium: start/restart just sleep, reset records the call."""
+
+    start_seconds = 0.0
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.up = True
+        self.resets = 0
+
+    def start(self):
+        time.sleep(self.start_seconds)
+        self.up = True
+
+    def stop(self):
+        self.up = False
+
+    def alive(self):
+        return self.up
+
+    def reset(self):
+        self.resets += 1
+
+    def stats(self):
+        return {"id": self.id, "busy": self.lease[0] if self.lease else None, "rss_mb": None}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(browser_pool, "PooledBrowser", FakeBrowser)
+    FakeBrowser.start_seconds = 0.0
+    return browser_pool.Pool(size=1)
+
+
+def test_late_checkin_cannot_release_new_holder(pool):
+    old = pool.checkout("scraper", ttl=0.05, wait=1)
+    time.sleep(0.1)
+    new = pool.checkout("validator", wait=1)
+    assert new is not None and new["nonce"] != old["nonce"]
+
+    # The expired holder comes back late: rejected, nothing reset
+    assert pool.checkin(old["id"], old["nonce"]) is False
+    assert pool.browsers[0].lease[0] == "validator"
+    assert pool.browsers[0].resets == 0
+
+    assert pool.checkin(new["id"], new["nonce"]) is True
+    assert pool.browsers[0].lease is None
+    assert pool.browsers[0].resets == 1
+
+
+def test_restart_happens_outside_the_lock(pool):
+    pool.browsers[0].up = False
+    FakeBrowser.start_seconds = 1.0
+
+    t = threading.Thread(target=pool.checkout, args=("scraper",))
+    t.start()
+    time.sleep(0.2)   # checkout is now restarting the dead browser
+
+    start = time.perf_counter()
+    assert pool.health()["browsers"][0]["busy"] == "scraper"
+    assert time.perf_counter() - start < 0.2
+    t.join()
+
+
+def test_failed_attach_checks_the_lease_back_in(pool, monkeypatch):
+    lease = pool.checkout("scraper", ttl=0, wait=1)
+    monkeypatch.setattr(browser_pool, "try_checkout", lambda stage: lease)
+    monkeypatch.setattr(browser_pool, "checkin", lambda lease, pages=0: pool.checkin(lease["id"], lease["nonce"], pages))
+
+    def broken_attach(lease):
+        raise RuntimeError("chromedriver version mismatch")
+    monkeypatch.setattr(browser_pool, "_attach", broken_attach)
+
+    with pytest.raises(RuntimeError):
+        browser_pool.acquire("scraper")
+    assert pool.checkout("scraper", wait=0) is not None
+
+
+def test_renewed_lease_is_not_reclaimed(pool):
+    lease = pool.checkout("bidder", ttl=0.2, wait=1)
+    time.sleep(0.15)
+    assert pool.renew(lease["id"], lease["nonce"])
+    time.sleep(0.1)
+    # 0.25 s since checkout, but only 0.1 s since the renew
+    assert pool.checkout("scraper", wait=0) is None
+
+    time.sleep(0.2)
+    assert pool.checkout("scraper", wait=0) is not None
+    assert not pool.renew(lease["id"], lease["nonce"])
@@ -0,0 +1,40 @@
+import db
+import checkpoints
+
+
+def _age_run(path, run_id, minutes):
+    def age(conn):
+        shift = f"-{minutes} minutes"
+        conn.execute("UPDATE job_runs SET started_at = datetime('now', ?) WHERE run_id=?", (shift, run_id))
+        conn.execute("UPDATE job_checkpoints SET updated_at = datetime('now', ?) WHERE run_id=?", (shift, run_id))
+    db.run_write(age, path=path)
+
+
+def test_recent_crash_resumes(tmp_path):
+    path = str(tmp_path / "t.db")
+    job = checkpoints.Job("scrape", path, max_age=600)
+    job.mark_done("zip:1")
+
+    again = checkpoints.Job("scrape", path, max_age=600)
+    assert again.resumed and again.run_id == job.run_id
+    assert again.done("zip:1")
+
+
+def test_stale_run_is_closed_not_resumed(tmp_path):
+    path = str(tmp_path / "t.db")
+    job = checkpoints.Job("scrape", path, max_age=600)
+    job.mark_done("zip:1")
+    _age_run(path, job.run_id, 60)
+
+    fresh = checkpoints.Job("scrape", path, max_age=600)
+    assert not fresh.resumed and fresh.run_id != job.run_id
+    assert not fresh.done("zip:1")
+    status = db.fetchall("SELECT status FROM job_runs WHERE run_id=?", (job.run_id,), path=path)[0][0]
+    assert status == "stale"
+
+
+def test_no_max_age_resumes_forever(tmp_path):
+    path = str(tmp_path / "t.db")
+    job = checkpoints.Job("validate", path)
+    _age_run(path, job.run_id, 60 * 24 * 7)
+    assert checkpoints.Job("validate", path).run_id == job.run_id
@@ -0,0 +1,131 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+import comps
+import db
+
+WORDS = ["drill", "saw", "makita", "dewalt", "lamp", "brass", "vintage", "chair",
+         "oak", "table", "cordless", "18v", "battery", "glass", "vase", "silver"]
+
+
+def _titles(n, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(WORDS, rng.randint(2, 5))) for _ in range(n)]
+
+
+@pytest.fixture
+def index():
+    titles = _titles(300, 1)
+    prices = [5 + (i * 7) % 90 for i in range(len(titles))]
+    return comps.CompIndex([f"s{i}" for i in range(len(titles))], titles, prices)
+
+
+def _dense_top(index, title, k, exclude=None):
+    # Brute force: every sold lot scored one at a time
+    vec = index._vector(comps.tokenize(title))
+    scores = np.zeros(len(index))
+    for term, weight in vec.items():
+        s = slice(index.post_start[term], index.post_start[term + 1])
+        np.add.at(scores, index.post_rows[s], index.post_weights[s] * weight)
+    if exclude is not None:
+        scores[index.lot_ids == exclude] = 0
+    top = [r for r in np.argsort(-scores, kind="stable") if scores[r] > 0][:k]
+    return scores[top]
+
+
+def test_batched_query_matches_brute_force(index, monkeypatch):
+    # Tiny batches, so the split across batches is exercised too
+    monkeypatch.setattr(comps, "BATCH_PAIRS", 500)
+    titles = _titles(40, 2) + ["nothing known here"]
+    qs, rows, sims = index.query_many(titles, k=5)
+
+    for qi, title in enumerate(titles):
+        np.testing.assert_allclose(sims[qs == qi], _dense_top(index, title, 5))
+
+
+def test_exclude_leaves_own_lot_out(index):
+    rows, sims = index.query("drill saw makita", k=300, exclude="s0")
+    assert 0 not in set(rows)
+    np.testing.assert_allclose(sims, _dense_top(index, "drill saw makita", 300, exclude="s0"))
+
+
+def test_estimate_many_matches_single_estimates(index):
+    titles = _titles(30, 3)
+    values, counts, best, _ = comps.estimate_many(index, titles)
+
+    for i, title in enumerate(titles):
+        rows, sims = index.query(title)
+        keep = sims >= comps.MIN_SIMILARITY
+        rows, sims = rows[keep], sims[keep]
+        assert counts[i] == len(rows)
+        if len(rows) < comps.MIN_COMPS:
+            assert np.isnan(values[i]) and best[i] is None
+            continue
+        prices = index.prices[rows]
+        order = np.argsort(prices, kind="stable")
+        cum = np.cumsum(sims[order])
+        assert values[i] == prices[order][np.searchsorted(cum, cum[-1] / 2)]
+        assert best[i] == index.lot_ids[rows[0]]
+
+
+def _comps_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(comps, "DB", str(tmp_path / "t.db"))
+    conn = sqlite3.connect(comps.DB)
+    conn.execute("""
+        CREATE TABLE lots (
+            lot_id TEXT PRIMARY KEY, title TEXT, status TEXT, final_price REAL,
+            market_value REAL, value_source TEXT, current_bid REAL, minutes_left INTEGER
+        )
+    """)
+    titles = _titles(200, 4)
+    conn.executemany("INSERT INTO lots VALUES (?, ?, 'sold_history', ?, ?, ?, NULL, NULL)", [
+        (f"s{i}", t, 10.0 + i % 20, 40.0 + i % 20 if i % 3 == 0 else None, "ebay" if i % 3 == 0 else None)
+        for i, t in enumerate(titles)
+    ])
+    conn.executemany("INSERT INTO lots VALUES (?, ?, 'pending', NULL, NULL, NULL, 5, 10)", [
+        (f"p{i}", t) for i, t in enumerate(titles[:20])
+    ])
+    conn.commit()
+    return conn
+
+
+def test_calibration_only_estimates_new_ebay_values(tmp_path, monkeypatch):
+    conn = _comps_db(tmp_path, monkeypatch)
+    comps.run_comps()
+    calibrated = conn.execute("SELECT COUNT(*) FROM comp_calibration").fetchone()[0]
+    assert calibrated == 67
+
+    seen = []
+    real = comps.estimate_many
+    monkeypatch.setattr(comps, "estimate_many",
+                        lambda index, titles, *a, **k: seen.append(len(titles)) or real(index, titles, *a, **k))
+
+    conn.execute("UPDATE lots SET market_value=99, value_source='ebay' WHERE lot_id='s1'")
+    conn.commit()
+    comps.run_comps()
+    # One calibration lot (the newly valued s1), then the 20 pending lots
+    assert seen == [1, 20]
+    conn.close()
+
+
+def test_bidders_skip_weak_comps_values(tmp_path, monkeypatch):
+    conn = _comps_db(tmp_path, monkeypatch)
+    db.run_write(comps.setup, path=comps.DB)
+    conn.executemany("UPDATE lots SET market_value=50, value_source='comps', comp_count=?, comp_similarity=? WHERE lot_id=?", [
+        (comps.BID_MIN_COMPS, 0.9, "p0"),
+        (comps.MIN_COMPS, 0.9, "p1"),
+        (comps.BID_MIN_COMPS, comps.MIN_SIMILARITY, "p2"),
+    ])
+    conn.execute("UPDATE lots SET market_value=50, value_source='ebay' WHERE lot_id='p3'")
+    conn.commit()
+
+    rows = db.fetchall(f"""
+        SELECT lot_id FROM lots
+        WHERE status='pending' AND market_value > 0 AND {comps.TRUSTED_VALUE_SQL}
+        ORDER BY lot_id
+    """, path=comps.DB)
+    assert [r[0] for r in rows] == ["p0", "p3"]
+    conn.close()
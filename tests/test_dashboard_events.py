@@ -0,0 +1,110 @@
+import sqlite3
+
+import pytest
+
+import dashboard_data
+import lifecycle_manager
+import lot_events
+
+MEDIANS = {}
+
+
+@pytest.fixture
+def hunt_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE lots (
+            lot_id TEXT PRIMARY KEY, title TEXT, url TEXT, image_url TEXT,
+            current_bid REAL, bid_count INTEGER, time_remaining TEXT,
+            minutes_left INTEGER, market_value REAL, buyers_premium REAL,
+            status TEXT DEFAULT 'pending', final_price REAL,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP, ended_at TIMESTAMP
+        )
+    """)
+    lot_events.setup(conn)
+    conn.commit()
+
+    pool = dashboard_data.open_pool(path)
+    monkeypatch.setattr(dashboard_data, "get_pool", lambda: pool)
+    monkeypatch.setattr(dashboard_data, "run_query", dashboard_data.read_sql)
+    yield conn
+    conn.close()
+
+
+def _add(conn, lot_id, minutes_left, title="widget", bid=5.0):
+    conn.execute(
+        "INSERT INTO lots (lot_id, title, current_bid, minutes_left) VALUES (?, ?, ?, ?)",
+        (lot_id, title, bid, minutes_left),
+    )
+    lot_events.publish(conn, lot_id, {"title": title, "current_bid": bid, "minutes_left": minutes_left})
+    conn.commit()
+
+
+def _page(page_size=3, search=""):
+    cursor = dashboard_data.latest_event_id()
+    df = dashboard_data.load_active_lots(MEDIANS, search, page_size=page_size)
+    return df, cursor
+
+
+def _poll(df, cursor, page_size=3, search=""):
+    events = dashboard_data.fetch_events(cursor)
+    return dashboard_data.apply_events(df, events, MEDIANS, search, page_size=page_size)
+
+
+def test_new_lot_in_the_window_reloads(hunt_db):
+    for lot_id, minutes in (("a", 10), ("b", 20), ("c", 30)):
+        _add(hunt_db, lot_id, minutes)
+    df, cursor = _page()
+
+    _add(hunt_db, "new", 15)
+    df, reload = _poll(df, cursor)
+    assert reload
+
+
+def test_new_lot_outside_filter_or_window_patches(hunt_db):
+    for lot_id, minutes in (("a", 10), ("b", 20), ("c", 30)):
+        _add(hunt_db, lot_id, minutes)
+    df, cursor = _page(search="widget")
+
+    _add(hunt_db, "late", 90)                       # sorts after the page
+    _add(hunt_db, "other", 5, title="gadget")       # fails the search
+    df, reload = _poll(df, cursor, search="widget")
+    assert not reload
+    assert list(df["lot_id"]) == ["a", "b", "c"]
+
+
+def test_empty_page_picks_up_first_lot(hunt_db):
+    df, cursor = _page()
+    _add(hunt_db, "a", 10)
+    df, reload = _poll(df, cursor)
+    assert reload
+
+
+def test_off_page_lot_moving_into_window_reloads(hunt_db):
+    for lot_id, minutes in (("a", 10), ("b", 20), ("c", 30), ("d", 40)):
+        _add(hunt_db, lot_id, minutes)
+    df, cursor = _page()
+    assert "d" not in set(df["lot_id"])
+
+    hunt_db.execute("UPDATE lots SET minutes_left=12 WHERE lot_id='d'")
+    lot_events.publish(hunt_db, "d", {"minutes_left": 12})
+    hunt_db.commit()
+    df, reload = _poll(df, cursor)
+    assert reload
+
+
+def test_lifecycle_end_drops_row_and_backfills(hunt_db, monkeypatch):
+    for lot_id, minutes in (("a", 10), ("b", 20), ("c", 30), ("d", 40)):
+        _add(hunt_db, lot_id, minutes)
+    df, cursor = _page()
+
+    hunt_db.execute("UPDATE lots SET minutes_left=0 WHERE lot_id='a'")
+    hunt_db.commit()
+    lifecycle_manager._lifecycle(hunt_db)
+    hunt_db.commit()
+
+    df, reload = _poll(df, cursor)
+    assert "a" not in set(df["lot_id"])
+    # Full page lost a row: d from the next page should move up
+    assert reload
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import export_data
+
+
+@pytest.fixture
+def lots_db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("hibid_lots.db")
+    conn.execute("""
+        CREATE TABLE lots (
+            lot_id TEXT PRIMARY KEY, title TEXT, current_bid REAL, bid_count INTEGER,
+            market_value REAL, buyers_premium REAL, final_price REAL,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    export_data.setup_changed_at(conn)
+    yield conn
+    conn.close()
+
+
+def _insert(conn, rows):
+    # changed_at pinned to last_seen, so the tests control the watermark second
+    conn.executemany("""
+        INSERT OR REPLACE INTO lots (lot_id, title, current_bid, bid_count, market_value,
+                                     buyers_premium, final_price, last_seen, changed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [row + (row[-1],) for row in rows])
+    conn.commit()
+
+
+def test_parquet_column_null_in_first_chunk(lots_db):
+    pytest.importorskip("pyarrow")
+    # final_price only shows up after the first chunk
+    _insert(lots_db, [(f"{i:03d}", "t", 5.0, None, 20.0, 0.15, None if i < 10 else 12.5,
+                       "2026-10-01 12:00:00") for i in range(25)])
+
+    filename = export_data.export("parquet", chunk_size=10)
+    df = pd.read_parquet(filename)
+    assert len(df) == 25
+    assert df["final_price"].notnull().sum() == 15
+    assert df["bid_count"].isnull().all()
+
+
+def test_since_keeps_rows_written_in_the_watermark_second(lots_db):
+    _insert(lots_db, [("a", "t", 1.0, 1, 5.0, 0.15, None, "2026-10-01 12:00:00"),
+                      ("c", "t", 1.0, 1, 5.0, 0.15, None, "2026-10-01 12:00:05")])
+    assert len(pd.read_csv(export_data.export("csv", since=True))) == 2
+
+    # Same second as the watermark, written after the export read it
+    _insert(lots_db, [("b", "t", 2.0, 1, 5.0, 0.15, None, "2026-10-01 12:00:05")])
+    delta = pd.read_csv(export_data.export("csv", since=True))
+    assert list(delta["lot_id"]) == ["b"]
+
+    # Nothing new: c and b are both remembered at that second
+    assert export_data.export("csv", since=True) is None
+
+
+def test_since_picks_up_updates_that_leave_last_seen_alone(lots_db):
+    _insert(lots_db, [("a", "t", 1.0, 1, None, 0.15, None, "2026-10-01 12:00:00"),
+                      ("b", "t", 1.0, 1, None, 0.15, None, "2026-10-01 12:00:00")])
+    export_data.export("csv", since=True)
+
+    # The validator and lifecycle only write their own columns
+    lots_db.execute("UPDATE lots SET market_value=40 WHERE lot_id='a'")
+    lots_db.commit()
+    delta = pd.read_csv(export_data.export("csv", since=True))
+    assert list(delta["lot_id"]) == ["a"] and delta["market_value"].iloc[0] == 40
+    assert delta["last_seen"].iloc[0] == "2026-10-01 12:00:00"
+
+
+def test_changed_at_starts_from_last_seen(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "t.db"))
+    conn.execute("CREATE TABLE lots (lot_id TEXT PRIMARY KEY, last_seen TIMESTAMP)")
+    conn.execute("INSERT INTO lots VALUES ('a', '2026-10-01 12:00:00')")
+    export_data.setup_changed_at(conn)
+    assert conn.execute("SELECT changed_at FROM lots").fetchone()[0] == "2026-10-01 12:00:00"
+    conn.close()
@@ -0,0 +1,35 @@
+import sqlite3
+
+import db
+import lifecycle_manager
+import scraper_v9
+
+
+def _tile(lot_id, minutes_left):
+    return (lot_id, "widget", 5.0, 1, f"{minutes_left}m", minutes_left, "u", "i", "pending")
+
+
+def test_fingerprints_pruned_with_the_lots(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.db")
+    monkeypatch.setattr(scraper_v9, "DB", path)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE lots (
+            lot_id TEXT PRIMARY KEY, status TEXT, minutes_left INTEGER,
+            final_price REAL, last_seen TIMESTAMP, ended_at TIMESTAMP
+        )
+    """)
+    conn.executemany("INSERT INTO lots VALUES (?, 'pending', ?, NULL, CURRENT_TIMESTAMP, NULL)",
+                     [("live", 30), ("done", 0)])
+    conn.commit()
+
+    scraper_v9.TileFilter()  # creates the table
+    db.run_write(scraper_v9.save_fingerprints, [_tile("live", 30), _tile("done", 0), _tile("gone", 5)], path=path)
+
+    _, _, pruned = db.run_write(lifecycle_manager._lifecycle, path=path)
+    assert pruned == 2
+    assert [r[0] for r in conn.execute("SELECT lot_id FROM tile_fingerprints")] == ["live"]
+
+    # A fresh run only loads live lots' fingerprints
+    assert set(scraper_v9.TileFilter().fps) == {"live"}
+    conn.close()
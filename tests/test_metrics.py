@@ -0,0 +1,43 @@
+import json
+import os
+
+import metrics
+
+
+def _registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    registry = metrics.Registry()
+    registry.stage = "bidder"
+    registry.count("polls")
+    return registry
+
+
+def _lines(tmp_path, name=metrics.JSONL_FILE):
+    with open(tmp_path / name) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_polling_writes_prom_every_time_jsonl_on_interval(tmp_path, monkeypatch):
+    registry = _registry(tmp_path, monkeypatch)
+    for _ in range(50):
+        registry.count("polls")
+        registry.write(every=metrics.SNAPSHOT_EVERY_SECONDS)
+
+    assert len(_lines(tmp_path)) == 1
+    assert 'name="polls"} 51' in (tmp_path / "bidder.prom").read_text()
+
+    registry.flush()  # exit always records the final state
+    lines = _lines(tmp_path)
+    assert len(lines) == 2 and lines[-1]["counters"]["polls"] == 51
+
+
+def test_jsonl_rotates_past_max_size(tmp_path, monkeypatch):
+    registry = _registry(tmp_path, monkeypatch)
+    monkeypatch.setattr(metrics, "JSONL_MAX_BYTES", 2000)
+    for _ in range(40):
+        registry.write()
+
+    size = os.path.getsize(tmp_path / metrics.JSONL_FILE)
+    assert size < 2000 + len(json.dumps(registry.snapshot())) + 1
+    assert (tmp_path / (metrics.JSONL_FILE + ".1")).exists()
+    assert len(_lines(tmp_path)) + len(_lines(tmp_path, metrics.JSONL_FILE + ".1")) < 40
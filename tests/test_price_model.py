@@ -0,0 +1,59 @@
+import sqlite3
+
+import numpy as np
+
+import price_model
+
+
+def test_features_ignore_bid_count():
+    # Same lot early in its auction and at the close: same features, same prediction
+    slots, values = price_model.featurize([("Makita 18V Drill", "tools", 0.9, "Denver")] * 2)
+    assert (slots[0] == slots[1]).all() and (values[0] == values[1]).all()
+    assert price_model.BIAS in slots[0] and slots[0].max() >= price_model.RESERVED
+
+
+def _sold_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE lots (
+            lot_id TEXT PRIMARY KEY, title TEXT, predicted_category TEXT,
+            classifier_confidence REAL, location TEXT, bid_count INTEGER,
+            final_price REAL, status TEXT
+        )
+    """)
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(400):
+        drill = i % 2 == 0
+        rows.append((f"s{i}", "makita drill kit" if drill else "glass vase", None, None, "Denver",
+                     int(rng.integers(0, 40)), 60.0 if drill else 8.0, "sold_history"))
+    rows.append(("p0", "makita drill kit", None, None, "Denver", 0, None, "pending"))
+    rows.append(("p1", "makita drill kit", None, None, "Denver", 35, None, "pending"))
+    rows.append(("p2", "glass vase", None, None, "Denver", 0, None, "pending"))
+    conn.executemany("INSERT INTO lots VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    return conn
+
+
+def test_train_and_score_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_model, "DB", str(tmp_path / "t.db"))
+    model_file = str(tmp_path / "model.npz")
+    conn = _sold_db(price_model.DB)
+
+    price_model.train(path=model_file)
+    assert price_model.score(path=model_file) == 3
+    p0, p1, p2 = [r[0] for r in conn.execute("SELECT predicted_value FROM lots WHERE status='pending' ORDER BY lot_id")]
+    # No bid count in the features: an unbid drill and a hot one price the same
+    assert p0 == p1 > p2
+    conn.close()
+
+
+def test_model_from_older_features_is_not_loaded(tmp_path):
+    path = str(tmp_path / "old.npz")
+    old = price_model.PriceModel()
+    old.meta.pop("features")
+    old.save(path)
+    assert price_model.load_model(path) is None
+
+    price_model.PriceModel().save(path + "2")
+    assert price_model.load_model(path + "2") is not None
@@ -0,0 +1,96 @@
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import pricing
+
+NAN = float("nan")
+
+# 0 / NaN / None / negative, the required-profit steps at 50 and 200 (either
+# side), the point where allowable spend turns positive, and the hard limit
+EDGE_VALUES = [0, NAN, None, -5, 0.01, 1, 14.99, 15, 49.99, 50, 50.01, 199.99, 200, 200.01,
+               400, 1000, 5000, 1e6]
+EDGE_BPS = [None, NAN, 0, -0.1, 0.1, config.DEFAULT_BP, 0.25]
+
+
+@pytest.mark.parametrize("bp", EDGE_BPS)
+def test_max_bid_scalar_and_array_agree(bp):
+    mv = EDGE_VALUES + list(np.linspace(0, 3000, 30001))
+    array = pricing.max_bid_array([NAN if v is None else v for v in mv],
+                                  None if bp is None else [bp] * len(mv))
+    scalar = [pricing.calculate_max_bid(v, bp) for v in mv]
+    assert list(array) == scalar
+
+
+# Every bucket edge and required-profit step, either side
+REFERENCE_VALUES = sorted({v + d for v in pricing.BUCKET_EDGES + [50, 200] for d in (-0.01, 0, 0.01)}
+                          | {0, 1, 15, 250, 300, 1000, 5000})
+
+
+@pytest.mark.parametrize("bp", [0, 0.1, config.DEFAULT_BP, 0.25])
+def test_max_bid_array_matches_reference(bp):
+    # The frozen legacy math, not just the scalar engine
+    expected = [pricing._reference_max_bid(v, bp) for v in REFERENCE_VALUES]
+    array = pricing.max_bid_array(REFERENCE_VALUES, [bp] * len(REFERENCE_VALUES))
+    np.testing.assert_allclose(array, expected, rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("bp", [0, 0.1, config.DEFAULT_BP, 0.25])
+def test_price_frame_matches_reference(bp):
+    df = pd.DataFrame({"market_value": REFERENCE_VALUES, "current_bid": 10.0,
+                       "buyers_premium": bp})
+    out = pricing.price_frame(df)
+    expected = [pricing._reference_max_bid(v, bp) for v in REFERENCE_VALUES]
+    np.testing.assert_allclose(out["my_max_bid"], expected, rtol=0, atol=1e-9)
+
+
+def test_max_bid_edges():
+    assert pricing.calculate_max_bid(NAN) == 0
+    assert pricing.calculate_max_bid(None) == 0
+    assert pricing.calculate_max_bid(0) == 0
+    assert pricing.calculate_max_bid(1e6) == config.HARD_MAX_BID_LIMIT
+
+
+@pytest.mark.parametrize("bp", EDGE_BPS)
+def test_expected_profit_scalar_and_array_agree(bp):
+    mv = [NAN if v is None else v for v in EDGE_VALUES]
+    bids = [0, NAN, 10, 49.99, 50, 200, 1e4]
+    for bid in bids:
+        array = pricing.expected_profit_array(mv, [bid] * len(mv), None if bp is None else [bp] * len(mv))
+        scalar = [pricing.expected_profit(v, bid, bp) for v in mv]
+        np.testing.assert_allclose(array, scalar, rtol=0, atol=1e-9)
+
+
+def _sql_deal_score(bids, medians):
+    # dashboard_data.deal_score_sql has to sort "Best Deal" the same way
+    import dashboard_data
+
+    expr, params = dashboard_data.deal_score_sql(medians)
+    conn = sqlite3.connect(":memory:")
+    out = [conn.execute(f"SELECT {expr} FROM (SELECT ? AS current_bid)", params + [b]).fetchone()[0]
+           for b in bids]
+    conn.close()
+    return out
+
+
+@pytest.mark.parametrize("medians", [
+    {"low": 20.0, "mid": 60.0, "high": 250.0, "premium": 900.0},
+    {"low": 20.0, "high": 250.0},            # missing buckets
+    {"low": 20.0, "mid": None, "high": 0},   # null / zero medians
+    {},
+])
+def test_deal_score_array_and_sql_agree(medians):
+    scale = 1 + config.DEFAULT_BP
+    # Bids whose adjusted price lands exactly on / just past each bucket edge
+    bids = [None, 0, 1, 5, 500, 5000]
+    for edge in pricing.BUCKET_EDGES:
+        bids += [edge / scale, edge / scale + 0.01]
+
+    array = pricing.deal_score_array([NAN if b is None else b for b in bids], medians)
+    sql = _sql_deal_score(bids, medians)
+    for a, s in zip(array, sql):
+        assert math.isclose(a, s, abs_tol=1e-9)
@@ -0,0 +1,24 @@
+import sqlite3
+
+import db
+import scraper_past
+
+
+def _lot(lot_id, price):
+    return {"lot_id": lot_id, "title": f"lot {lot_id}", "price": price,
+            "link": f"u{lot_id}", "img_url": "", "card_text": ""}
+
+
+def test_page_saved_through_the_writer(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.db")
+    monkeypatch.setattr(scraper_past, "DB_NAME", path)
+    scraper_past.setup_db()
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO lots (lot_id, title, status, location) VALUES ('1', 'lot 1', 'pending', 'Elsewhere')")
+    conn.commit()
+
+    db.run_write(scraper_past.save_page, [_lot("1", 12.5), _lot("2", 3.0)], "Chatham, IL", path=path)
+    rows = conn.execute("SELECT lot_id, final_price, status, location FROM lots ORDER BY lot_id").fetchall()
+    assert rows == [("1", 12.5, "sold_history", "Chatham, IL"), ("2", 3.0, "sold_history", "Chatham, IL")]
+    conn.close()
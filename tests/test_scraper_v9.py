@@ -0,0 +1,114 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+import coverage_planner
+import crawl_frontier
+import scraper_v9
+
+
+def _tile(lot_id, bid):
+    return (lot_id, f"lot {lot_id}", bid, 1, "5h", 300, f"u{lot_id}", "", "pending")
+
+
+class FakeDriver:
+    """Serves canned pages of tiles per ZIP; 'Next' exists until the last page."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.visits = []
+
+    def get(self, url):
+        self.zip = url.split("zip=")[1].split("&")[0]
+        self.page = 1
+        self.visits.append((self.zip, 1))
+
+    def execute_script(self, script, *args):
+        if args:  # click on Next
+            self.page += 1
+            self.visits.append((self.zip, self.page))
+        return {"load_ms": 0, "bytes": 0, "requests": 0}
+
+    def find_elements(self, by, tag):
+        return list(self.pages[self.zip][self.page - 1])
+
+    def find_element(self, by, xpath):
+        if self.page >= len(self.pages[self.zip]):
+            raise NoSuchElementException()
+        return object()
+
+
+@pytest.fixture
+def scrape(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE lots (lot_id TEXT PRIMARY KEY, status TEXT)")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(scraper_v9, "DB", path)
+    monkeypatch.setattr(crawl_frontier, "DB", path)
+    monkeypatch.setattr(scraper_v9.time, "sleep", lambda s: None)
+    monkeypatch.setattr(scraper_v9, "parse_tile", lambda card, errors: card)
+    written = []
+    monkeypatch.setattr(scraper_v9, "save_page", lambda conn, changed, bump: written.extend(changed))
+
+    job = SimpleNamespace(errors=None)
+    fps = {}
+
+    def run(driver, zips):
+        # One scraper run; fingerprints carry over as tile_fingerprints would
+        seen = scraper_v9.TileFilter()
+        seen.fps = fps
+        cycle = coverage_planner.SeenSet()
+        for zip_code in zips:
+            scraper_v9.scrape_zip(driver, zip_code, seen, cycle, job)
+
+    return run, written
+
+
+def test_overlap_written_by_another_zip_is_not_known(scrape):
+    run, written = scrape
+    a_pages = [[_tile("1", 5), _tile("2", 5)], [_tile("3", 5)], [_tile("4", 5)]]
+    run(FakeDriver({"A": a_pages}), ["A"])
+    run(FakeDriver({"A": a_pages}), ["A"])  # unchanged: full sweep already done, stops after 2 known pages
+
+    # Bids moved on pages 1-3; ZIP B's radius covers pages 1 and 2 and is scraped first
+    a_pages = [[_tile("1", 9), _tile("2", 9)], [_tile("3", 9)], [_tile("4", 9)]]
+    driver = FakeDriver({"B": [a_pages[0] + a_pages[1]], "A": a_pages})
+    written.clear()
+    run(driver, ["B", "A"])
+
+    # A's first two pages were all dupes of B's, but they did change: A walks on to page 3
+    assert ("A", 3) in driver.visits
+    assert sorted(t[0] for t in written) == ["1", "2", "3", "4"]
+
+
+def test_unchanged_overlap_still_stops_early(scrape):
+    run, written = scrape
+    a_pages = [[_tile("1", 5)], [_tile("2", 5)], [_tile("3", 5)]]
+    run(FakeDriver({"A": a_pages}), ["A"])
+
+    driver = FakeDriver({"B": [a_pages[0] + a_pages[1]], "A": a_pages})
+    run(driver, ["B", "A"])
+    assert ("A", 3) not in driver.visits
+
+
+def test_full_sweep_within_the_ending_soon_window(scrape, monkeypatch):
+    run, written = scrape
+    a_pages = [[_tile("1", 5)], [_tile("2", 5)], [_tile("3", 5)]]
+    run(FakeDriver({"A": a_pages}), ["A"])
+
+    # Half an ending-soon window later the skipped pages are walked again
+    now = crawl_frontier.time.time()
+    monkeypatch.setattr(crawl_frontier.time, "time", lambda: now + scraper_v9.FULL_SWEEP_SECONDS)
+    driver = FakeDriver({"A": a_pages})
+    run(driver, ["A"])
+    assert ("A", 3) in driver.visits
+
+    # ...and not again until the next one is due
+    driver = FakeDriver({"A": a_pages})
+    run(driver, ["A"])
+    assert ("A", 3) not in driver.visits
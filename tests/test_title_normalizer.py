@@ -0,0 +1,34 @@
+import pytest
+
+import title_normalizer
+from title_normalizer import normalize
+
+
+@pytest.mark.parametrize("title, query, quantity", [
+    # Short model numbers after a word stay in the query
+    ("iPhone 12", "iphone 12", 1),
+    ("(2) Apple iPhone 12 Pro", "apple iphone 12 pro", 2),
+    ("HP 61 ink", "hp 61 ink", 1),
+    ("Nintendo Switch Mario Kart 8", "nintendo switch mario kart", 1),
+    # Fractions are sizes, not quantities
+    ("3/4 inch drive socket set", "3/4 inch drive socket", 1),
+    ('Lot 204 | Craftsman 3/8" drive ratchet', "craftsman 3/8 drive ratchet", 1),
+    ('Milwaukee M18 Fuel 1/2" hammer drill x2', "milwaukee m18 fuel 1/2", 2),
+    # Quantities still come off
+    ("Set of 6 Pyrex bowls", "pyrex bowls", 6),
+    ("4 Funny Cat Paintings", "funny cat paintings", 4),
+    ("DeWalt DCD771C2 20V Drill w/ 2 batteries", "dewalt dcd771c2 20v drill", 1),
+    ("Black & Decker 12 cup coffee maker", "black decker 12 cup coffee", 1),
+    ("1985 Ford 9N Tractor", "9n 1985 ford tractor", 1),
+])
+def test_real_titles(title, query, quantity):
+    n = normalize(title)
+    assert (n.query, n.quantity) == (query, quantity)
+
+
+def test_same_product_same_key():
+    # What the validator's eBay search and value cache are keyed on
+    assert title_normalizer.canonical_query("(2) Apple iPhone 12 Pro") == \
+        title_normalizer.canonical_query("Apple iPhone 12 Pro - nice condition")
+    assert title_normalizer.canonical_query("Apple iPhone 12 Pro") != \
+        title_normalizer.canonical_query("Apple iPhone 11 Pro")
@@ -0,0 +1,27 @@
+import sqlite3
+
+import validator_v6
+
+
+def test_cached_value_by_canonical_query(tmp_path, monkeypatch):
+    path = str(tmp_path / "t.db")
+    monkeypatch.setattr(validator_v6, "DB_NAME", path)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE lots (
+            lot_id TEXT PRIMARY KEY, title TEXT, canonical_query TEXT, market_value REAL,
+            value_source TEXT, ref_image TEXT, ref_url TEXT, last_seen TIMESTAMP
+        )
+    """)
+    conn.executemany("INSERT INTO lots VALUES (?, ?, ?, ?, ?, 'img', 'url', datetime('now', ?))", [
+        ("1", "Apple iPhone 12 Pro", "apple iphone 12 pro", 300.0, "ebay", "-1 days"),
+        ("2", "Apple iPhone 11 Pro", "apple iphone 11 pro", 40.0, "comps", "-1 days"),
+        ("3", "HP 61 ink", "hp 61 ink", 20.0, "ebay", "-90 days"),
+    ])
+    conn.commit()
+    conn.close()
+
+    assert validator_v6.cached_value("lots", "apple iphone 12 pro") == (300.0, "img", "url")
+    assert validator_v6.cached_value("lots", "apple iphone 11 pro") is None   # not an eBay value
+    assert validator_v6.cached_value("lots", "hp 61 ink") is None             # too old
+    assert validator_v6.cached_value("lots", "") is None
@@ -0,0 +1,226 @@
+import re
+import time
+import argparse
+from functools import lru_cache
+from typing import NamedTuple
+
+import db
+
+# ============================================================
+# TITLE NORMALIZER
+# One place that turns a raw HiBid title into:
+#   tokens, brand, model number, quantity and a canonical_query
+# (the eBay search string / cache key / dedup key).
+# Every validator and the comp engine go through here.
+# ============================================================
+
+DB = "hibid_lots.db"
+
+MAX_QUERY_WORDS = 4
+BATCH_SIZE = 5000
+CACHE_SIZE = 200_000
+
+# ------------------------------
+# Word Lists
+# ------------------------------
+STOPWORDS = frozenset("""
+    a an and the of for with w in on to or by from at as is are
+    plus others other more etc misc assorted assortment various
+    lot lots item items group box boxes tote bag bin set sets pair pairs
+    new used nice good great excellent condition look see pics pictures photo photos
+    size sz approx approximately total qty quantity pcs pc pieces piece
+    nib nwt tags tag
+""".split())
+
+# Multi-word brands first, written as they should appear in the query
+BRANDS = [
+    "black and decker", "black decker", "le creuset", "ralph lauren", "louis vuitton",
+    "michael kors", "north face", "under armour", "hot wheels", "fisher price",
+    "lodge cast iron", "anchor hocking", "fire king", "royal doulton", "hummel",
+    "dewalt", "craftsman", "milwaukee", "makita", "ryobi", "bosch", "stanley", "snap on",
+    "husky", "kobalt", "ridgid", "porter cable", "stihl", "husqvarna", "echo", "toro",
+    "apple", "samsung", "sony", "nintendo", "playstation", "xbox", "bose", "jbl", "canon",
+    "nikon", "dell", "hp", "lenovo", "garmin", "fitbit", "dyson", "shark", "kitchenaid",
+    "cuisinart", "ninja", "keurig", "pyrex", "corningware", "corelle", "fiesta", "fenton",
+    "lenox", "waterford", "longaberger", "coach", "tignanello", "nike", "adidas", "levis",
+    "lego", "barbie", "mattel", "hasbro", "funko", "marvel", "disney", "pokemon", "topps",
+    "panini", "upper deck", "rolex", "seiko", "timex", "fossil", "chicco", "graco", "yeti",
+    "coleman", "remington", "winchester", "ruger", "weber", "traeger", "john deere", "ertl",
+    "rogers", "oneida", "zippo", "case xx", "buck",
+]
+
+WORD_QUANTITIES = {
+    "pair": 2, "pairs": 2, "couple": 2, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "dozen": 12,
+}
+
+# ------------------------------
+# Compiled Patterns
+# ------------------------------
+_LOT_PREFIX = re.compile(r'^\s*(?:lot|item)\s*#?\s*\d+\s*[:\-\.|]?\s*', re.IGNORECASE)
+_QTY_LEAD = re.compile(r'^\s*(?:\(?(\d{1,4})(?![\d/]|\.\d)\)?\s*(?:x\s+|pcs?\b|pieces?\b)?|(?:set|lot|box|pair|group)\s+of\s+(\d{1,4}))\s*(?:of\s+)?', re.IGNORECASE)
+_QTY_ANY = re.compile(r'\b(?:x\s*(\d{1,3})|(\d{1,3})\s*(?:pcs?|pieces?|count|ct)\b|\((\d{1,3})\))', re.IGNORECASE)
+_MODEL = re.compile(r'\b(?=[a-z\-]*\d)(?=[\d\-]*[a-z])[a-z0-9]+(?:-[a-z0-9]+)*\b')
+_WORD = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*")   # "3/4" stays one token
+_SLASH = re.compile(r'(?<!\d)/|/(?!\d)')                # ...every other slash is a space
+_SPACES = re.compile(r'\s+')
+_BRANDS = re.compile(
+    r'\b(' + "|".join(re.escape(b).replace(r'\ ', r'[\s&\-]+(?:and\s+)?') for b in BRANDS) + r')\b'
+)
+
+
+class Normalized(NamedTuple):
+    tokens: tuple
+    brand: str
+    model: str
+    quantity: int
+    query: str
+
+
+# ------------------------------
+# Normalizing
+# ------------------------------
+def strip_lot_prefix(title):
+    # "Lot 204 | Craftsman leaf blower" -> "Craftsman leaf blower"
+    title = title or ""
+    if "|" in title:
+        title = title.split("|", 1)[1]
+    return _LOT_PREFIX.sub("", title).strip()
+
+
+def _quantity(text):
+    """
+    Leading quantity ("4 Funny Cat Paintings", "Set of 6 ...", "Pair of ...")
+    or an explicit count anywhere ("x3", "12 pcs", "(2)"). Returns (qty, rest).
+    """
+    first = text.split(" ", 1)[0].lower()
+    if first in WORD_QUANTITIES:
+        return WORD_QUANTITIES[first], re.sub(r'^\s*of\s+', '', text[len(first):])
+
+    m = _QTY_LEAD.match(text)
+    if m and (m.group(1) or m.group(2)):
+        qty = int(m.group(1) or m.group(2))
+        # A leading year or model number is not a quantity ("1985 Ford 9N")
+        if 0 < qty < 100:
+            return qty, text[m.end():]
+
+    m = _QTY_ANY.search(text)
+    if m:
+        qty = int(next(g for g in m.groups() if g))
+        if 0 < qty < 100:
+            return qty, text[:m.start()] + text[m.end():]
+
+    return 1, text
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(title):
+    text = strip_lot_prefix(title).lower()
+    text = _SLASH.sub(" ", text.replace("&", " and "))
+    quantity, text = _quantity(text)
+
+    brand = ""
+    brand_span = (0, 0)
+    m = _BRANDS.search(text)
+    if m:
+        brand = _SPACES.sub(" ", re.sub(r'[&\-]', " ", m.group(1))).replace(" and ", " ").strip()
+        brand_span = m.span()
+
+    model = ""
+    m = _MODEL.search(text[:brand_span[0]] + " " + text[brand_span[1]:])
+    if m:
+        model = m.group(0).replace("-", "")
+
+    # A short number right after a word is part of the name ("iphone 12",
+    # "hp 61 ink"); the quantity is already gone, so a lone one is noise
+    tokens = []
+    prev = None
+    for t in _WORD.finditer(text):
+        w = t.group(0).replace("-", "")
+        named = prev is not None and not prev.isdigit() and prev not in STOPWORDS
+        prev = w
+        if brand_span[0] <= t.start() < brand_span[1]:
+            continue
+        if w in STOPWORDS or w in tokens or (w.isdigit() and len(w) < 3 and not named):
+            continue
+        tokens.append(w)
+
+    # Brand and model go first: they're what actually pins an eBay search down
+    head = [p for p in (brand, model) if p]
+    rest = [w for w in tokens if w != model]
+    query = " ".join((head + rest)[:MAX_QUERY_WORDS])
+
+    return Normalized(tuple(tokens), brand, model, quantity, query)
+
+
+def canonical_query(title):
+    return normalize(title).query
+
+
+def normalize_many(titles):
+    # Repeated titles (common across auctions) come straight from the cache
+    return [normalize(t) for t in titles]
+
+
+# ------------------------------
+# DB Backfill
+# ------------------------------
+def setup(conn, table="lots"):
+    cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+    if not cols:
+        return False
+    if "canonical_query" not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN canonical_query TEXT")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_canonical_query ON {table}(canonical_query)")
+    return True
+
+
+def _save(conn, table, rows):
+    conn.executemany(f"UPDATE {table} SET canonical_query = ? WHERE lot_id = ?", rows)
+
+
+def run_normalize(rebuild=False, batch_size=BATCH_SIZE):
+    """
+    Fills canonical_query in keyset-paged batches. Only rows that don't
+    have one yet unless rebuild (after changing the rules above).
+    """
+    start = time.perf_counter()
+    total = 0
+
+    # lots_history only exists once archive_history has run
+    for table in ("lots", "lots_history"):
+        if not db.run_write(setup, table, path=DB):
+            continue
+
+        where = "" if rebuild else "AND canonical_query IS NULL"
+        last_id = ""
+        while True:
+            rows = db.fetchall(f"""
+                SELECT lot_id, title FROM {table}
+                WHERE lot_id > ? {where}
+                ORDER BY lot_id LIMIT ?
+            """, (last_id, batch_size), path=DB)
+            if not rows:
+                break
+
+            normed = normalize_many(title for _, title in rows)
+            db.run_write(_save, table, [(n.query, lot_id) for n, (lot_id, _) in zip(normed, rows)], path=DB)
+            total += len(rows)
+            last_id = rows[-1][0]
+
+    info = normalize.cache_info()
+    print(f"Normalized {total} titles in {time.perf_counter() - start:.1f}s "
+          f"(cache hits {info.hits}, misses {info.misses}).")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill lots.canonical_query")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every row, not just new ones")
+    parser.add_argument("--show", help="print how one title normalizes and exit")
+    args = parser.parse_args()
+
+    if args.show:
+        print(normalize(args.show))
+    else:
+        run_normalize(args.rebuild)
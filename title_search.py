@@ -0,0 +1,170 @@
+import re
+import sys
+import time
+import argparse
+import db
+
+# ============================================================
+# TITLE SEARCH (SQLite FTS5)
+# lot_titles indexes every title in lots AND lots_history.
+# Triggers keep it in sync, so nothing in the pipeline has to
+# remember to update it. FTS rowid = lots.rowid for hot rows,
+# -lots_history.rowid for archived ones.
+# ============================================================
+
+DB = "hibid_lots.db"
+FTS_TABLE = "lot_titles"
+
+
+def _has_table(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name=?", (name,)
+    ).fetchone() is not None
+
+
+def _triggers(table, sign):
+    rid = "new.rowid" if sign > 0 else "-new.rowid"
+    old_rid = "old.rowid" if sign > 0 else "-old.rowid"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, title, lot_id, status)
+            VALUES ({rid}, new.title, new.lot_id, new.status);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = {old_rid};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF title, status ON {table}
+        WHEN old.title IS NOT new.title OR old.status IS NOT new.status BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = {old_rid};
+            INSERT INTO {FTS_TABLE} (rowid, title, lot_id, status)
+            VALUES ({rid}, new.title, new.lot_id, new.status);
+        END
+        """,
+    ]
+
+
+def setup(conn):
+    """
+    Creates the index + triggers and backfills whatever isn't indexed yet.
+    Safe to call every run.
+    """
+    if not _has_table(conn, "lots"):
+        return
+
+    created = not _has_table(conn, FTS_TABLE)
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            title,
+            lot_id UNINDEXED,
+            status UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+
+    for sql in _triggers("lots", 1):
+        conn.execute(sql)
+    if created:
+        conn.execute(f"""
+            INSERT INTO {FTS_TABLE} (rowid, title, lot_id, status)
+            SELECT rowid, title, lot_id, status FROM lots
+        """)
+
+    history = "lots_history"
+    if _has_table(conn, history) and not _has_table(conn, f"{history}_fts_insert"):
+        for sql in _triggers(history, -1):
+            conn.execute(sql)
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, lot_id, status)
+            SELECT -rowid, title, lot_id, status FROM {history}
+        """)
+
+
+# ------------------------------
+# Query Building
+# ------------------------------
+def to_fts_query(text, prefix_last=True):
+    """
+    User text -> safe FTS5 query.
+      drill press     -> "drill" "press"*     (all words, last one as a prefix)
+      "miter saw" dew*  -> "miter saw" "dew"*  (phrase + explicit prefix)
+    """
+    parts = re.findall(r'"([^"]+)"|(\S+)', text or "")
+    terms = []
+    for i, (phrase, word) in enumerate(parts):
+        if phrase:
+            words = re.findall(r"\w+", phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+            continue
+
+        prefix = word.endswith("*") or (prefix_last and i == len(parts) - 1)
+        for w in re.findall(r"\w+", word):
+            terms.append(f'"{w}"')
+        if terms and prefix and re.search(r"\w", word):
+            terms[-1] += "*"
+
+    return " ".join(terms)
+
+
+def match_rowids_sql():
+    """
+    SQL fragment for `lots.rowid IN (...)` filters on the hot table.
+    """
+    return f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? AND rowid > 0"
+
+
+def search(conn, text, status=None, limit=50, offset=0):
+    """
+    bm25-ranked matches over active and sold lots.
+    Returns [(lot_id, title, status, score)], best first.
+    """
+    query = to_fts_query(text)
+    if not query:
+        return []
+
+    where = f"{FTS_TABLE} MATCH ?"
+    params = [query]
+    if status:
+        where += " AND status = ?"
+        params.append(status)
+
+    return conn.execute(f"""
+        SELECT lot_id, title, status, bm25({FTS_TABLE}) AS score
+        FROM {FTS_TABLE}
+        WHERE {where}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    """, (*params, limit, offset)).fetchall()
+
+
+# ------------------------------
+# CLI
+# ------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search lot titles (active + sold)")
+    parser.add_argument("query", nargs="?", help='words, "phrases" or prefix*')
+    parser.add_argument("--status", help="e.g. pending or sold_history")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--rebuild", action="store_true", help="create/backfill the index and exit")
+    args = parser.parse_args()
+
+    db.run_write(setup, path=DB)
+    if args.rebuild or not args.query:
+        print("Title index ready.")
+        sys.exit(0)
+
+    conn = db.connect(DB, readonly=True)
+    start = time.perf_counter()
+    rows = search(conn, args.query, args.status, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    conn.close()
+
+    for lot_id, title, status, score in rows:
+        print(f"{score:8.2f}  [{status}] {lot_id}  {title}")
+    print(f"\n{len(rows)} results in {elapsed:.1f} ms")
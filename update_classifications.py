@@ -1,5 +1,7 @@
 import os
-import sqlite3
+import db
+import metrics
+import archive_history
 import requests
 import torch
 import torch.nn as nn
@@ -68,34 +70,63 @@ transform = transforms.Compose([
 ])
 
 # -----------------------------
-# DB CONNECTION
+# DB ACCESS (shared pool + writer thread, see db.py)
 # -----------------------------
 
-def get_unclassified_lots(conn):
-    cursor = conn.cursor()
-    cursor.execute("""
+def source_tables():
+    # Hot lots first; archived ones too, or a lot sold before it was classified never gets a category
+    conn = db.connect(DB_PATH, readonly=True)
+    try:
+        history = archive_history.all_lots(conn) != "lots"
+    finally:
+        conn.close()
+    return ["lots", archive_history.HISTORY_TABLE] if history else ["lots"]
+
+def get_unclassified_lots(table="lots", after_id=""):
+    # Keyset on lot_id: a lot whose image failed stays NULL but isn't picked again this cycle
+    return db.fetchall(f"""
         SELECT lot_id, image_url
-        FROM lots
+        FROM {table}
         WHERE predicted_category IS NULL
         AND image_url IS NOT NULL
+        AND lot_id > ?
+        ORDER BY lot_id
         LIMIT ?
-    """, (BATCH_SIZE,))
-    return cursor.fetchall()
+    """, (after_id, BATCH_SIZE), path=DB_PATH)
 
-def update_lot(conn, lot_id, category, confidence):
-    cursor = conn.cursor()
-    cursor.execute("""
+def update_lot(lot_id, category, confidence):
+    # Queued, not committed per row: the writer folds a batch into one commit
+    return db.writer(DB_PATH).execute("""
         UPDATE lots
         SET predicted_category = ?,
             classifier_confidence = ?
         WHERE lot_id = ?
-    """, (category, confidence, lot_id))
-    conn.commit()
+    """, (category, confidence, lot_id), wait=False)
+
+def _update_history(conn, results):
+    """
+    Archived lots are re-inserted rather than updated: the new rowid is what
+    analytics.py and price_model.py watermark on, so they pick the category up.
+    """
+    table = archive_history.HISTORY_TABLE
+    for lot_id, category, confidence in results:
+        cur = conn.execute(f"SELECT * FROM {table} WHERE lot_id = ?", (lot_id,))
+        row = cur.fetchone()
+        if row is None:
+            continue
+        cols = [d[0] for d in cur.description]
+        values = dict(zip(cols, row), predicted_category=category, classifier_confidence=confidence)
+        conn.execute(f"DELETE FROM {table} WHERE lot_id = ?", (lot_id,))
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            [values[c] for c in cols]
+        )
 
 # -----------------------------
 # IMAGE DOWNLOAD
 # -----------------------------
 
+@metrics.timed("image_download")
 def download_image(url):
     try:
         response = requests.get(url, timeout=10)
@@ -109,6 +140,7 @@ def download_image(url):
 # INFERENCE
 # -----------------------------
 
+@metrics.timed("inference")
 def classify_image(image):
     input_tensor = transform(image).unsqueeze(0).to(device)
     outputs = model(input_tensor)
@@ -122,33 +154,50 @@ def classify_image(image):
 
 def main():
     logging.info("Starting inference cycle")
+    metrics.stage("update_classifications")
+
+    for table in source_tables():
+        after_id = ""
+        while True:
+            with metrics.timer("db_read"):
+                lots = get_unclassified_lots(table, after_id)
+            pending_writes = []
+            history_rows = []
+
+            if not lots:
+                logging.info(f"No more unclassified lots in {table}.")
+                break
+            after_id = lots[-1][0]
+
+            for lot_id, image_url in lots:
+                try:
+                    image = download_image(image_url)
+
+                    if image is None:
+                        metrics.count("download_failed")
+                        continue
+
+                    category, confidence = classify_image(image)
+
+                    if table == "lots":
+                        pending_writes.append(update_lot(lot_id, category, confidence))
+                    else:
+                        history_rows.append((lot_id, category, confidence))
+                    metrics.count("lots_classified")
+
+                    logging.info(f"Lot {lot_id} classified as {category} ({confidence:.3f})")
+
+                except Exception as e:
+                    logging.error(f"Failed processing lot {lot_id}: {e}")
+                    metrics.count("lots_failed")
+
+            with metrics.timer("db_write"):
+                for fut in pending_writes:
+                    fut.result()
+                if history_rows:
+                    db.run_write(_update_history, history_rows, path=DB_PATH)
+                    metrics.count("history_classified", len(history_rows))
 
-    conn = sqlite3.connect(DB_PATH)
-
-    while True:
-        lots = get_unclassified_lots(conn)
-
-        if not lots:
-            logging.info("No more unclassified lots. Exiting.")
-            break
-
-        for lot_id, image_url in lots:
-            try:
-                image = download_image(image_url)
-
-                if image is None:
-                    continue
-
-                category, confidence = classify_image(image)
-
-                update_lot(conn, lot_id, category, confidence)
-
-                logging.info(f"Lot {lot_id} classified as {category} ({confidence:.3f})")
-
-            except Exception as e:
-                logging.error(f"Failed processing lot {lot_id}: {e}")
-
-    conn.close()
     logging.info("Inference cycle complete")
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ import statistics
 from playwright.async_api import async_playwright
 import urllib.parse
 import random
+import title_normalizer
 
 DB_NAME = 'hibid_lots.db'
 BATCH_SIZE = 50 
@@ -13,10 +14,7 @@ BATCH_SIZE = 50
 BAD_WORDS = ['assortment', 'misc', 'group of', 'box of', 'pallet', 'shelf contents', 'lot of', 'bundle']
 
 def clean_title(title):
-    if '|' in title: title = title.split('|', 1)[1]
-    title = re.sub(r'^(Lot|Item)\s*[\#\d]+[:\-\.]?\s*', '', title, flags=re.IGNORECASE)
-    title = re.sub(r'[^a-zA-Z0-9\s]', '', title)
-    return title.strip()
+    return title_normalizer.canonical_query(title)
 
 async def get_ebay_sold_price(page, search_query):
     encoded_query = urllib.parse.quote_plus(search_query)
@@ -111,7 +109,7 @@ async def process_lots():
             for lot_id, raw_title in lots:
                 cleaned = clean_title(raw_title)
                 
-                if any(bad in cleaned.lower() for bad in BAD_WORDS):
+                if any(bad in raw_title.lower() for bad in BAD_WORDS):
                     print(f"Skipping junk: {cleaned}")
                     await db.execute("UPDATE lots SET status='skipped' WHERE lot_id=?", (lot_id,))
                     await db.commit()
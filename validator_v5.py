@@ -3,6 +3,7 @@ from playwright.async_api import async_playwright
 import aiosqlite
 import urllib.parse
 import random
+import title_normalizer
 
 # CONFIGURATION
 DB_NAME = 'hibid_lots.db'
@@ -18,8 +19,7 @@ async def init_db():
             await db.commit()
 
 async def get_ebay_value(context, title):
-    # Clean title for search (remove "Lot 123 |")
-    clean_title = title.split('|')[-1].strip()
+    clean_title = title_normalizer.canonical_query(title)
     encoded_query = urllib.parse.quote(clean_title)
     
     # eBay "Sold Items" Search URL
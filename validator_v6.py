@@ -1,12 +1,17 @@
-import sqlite3
+import db
 import time
 import re
 import logging
 import random
-from selenium import webdriver
+import lot_events
+import title_normalizer
+import archive_history
+import checkpoints
+import browser_profile
+import browser_pool
+import metrics
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
 
 # ============================================================
 # ======================= CONFIGURATION ======================
@@ -14,14 +19,13 @@ from selenium.webdriver.chrome.options import Options
 
 DB_NAME = "hibid_lots.db"
 LOG_FILE = "validator_log.txt"
-
-CHROMIUM_PATH = "/usr/bin/chromium"
-CHROMEDRIVER_PATH = "/usr/bin/chromedriver"
+EBAY_SEARCH_URL = "https://www.ebay.com/sch/i.html"   # bench/ points this at its local mock site
 
 MAX_ITEMS_PER_RUN = 25
 MAX_EBAY_RESULTS = 15
 MIN_VALID_PRICE = 2.0
 MAX_VALID_PRICE = 5000.0
+CACHE_DAYS = 30     # eBay values of same-canonical_query lots seen this recently are reused
 DEBUG_MODE = True   # 🔥 Toggle deep debugging here
 
 
@@ -44,45 +48,63 @@ logging.basicConfig(
 # ============================================================
 
 def setup_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     try:
-        cursor.execute("ALTER TABLE lots ADD COLUMN ref_url TEXT")
+        db.execute("ALTER TABLE lots ADD COLUMN ref_url TEXT", path=DB_NAME)
     except:
         pass
-    conn.commit()
-    conn.close()
+    try:
+        db.execute("ALTER TABLE lots ADD COLUMN value_source TEXT", path=DB_NAME)
+    except:
+        pass
+    db.run_write(title_normalizer.setup, path=DB_NAME)
 
 
 def get_pending_lots(limit):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT lot_id, title
+    return db.fetchall("""
+        SELECT lot_id, title, canonical_query
         FROM lots
         WHERE (market_value IS NULL OR market_value = 0)
         AND status='pending'
         LIMIT ?
-    """, (limit,))
-
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-
-def update_lot_value(lot_id, avg_price, img_url, best_link):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """, (limit,), path=DB_NAME)
+
+
+def cached_value(table, search_query):
+    """
+    (market_value, ref_image, ref_url) eBay already gave another lot with the
+    same canonical_query, or None. One search per product, not per lot.
+    """
+    if not search_query:
+        return None
+    rows = db.fetchall(f"""
+        SELECT market_value, ref_image, ref_url
+        FROM {table}
+        WHERE canonical_query = ?
+        AND value_source = 'ebay' AND market_value > 0
+        AND last_seen >= datetime('now', ?)
+        ORDER BY last_seen DESC
+        LIMIT 1
+    """, (search_query, f"-{CACHE_DAYS} days"), path=DB_NAME)
+    return tuple(rows[0]) if rows else None
+
+
+def _save_lot_value(conn, lot_id, avg_price, img_url, best_link):
+    conn.execute("""
         UPDATE lots
-        SET market_value = ?, ref_image = ?, ref_url = ?
+        SET market_value = ?, ref_image = ?, ref_url = ?, value_source = 'ebay'
         WHERE lot_id = ?
     """, (avg_price, img_url, best_link, lot_id))
 
-    conn.commit()
-    conn.close()
+    lot_events.setup(conn)
+    lot_events.publish(conn, lot_id, {"market_value": avg_price, "ref_image": img_url, "ref_url": best_link})
+
+
+def update_lot_value(lot_id, avg_price, img_url, best_link):
+    # Queued on the shared writer thread; no new connection per lot
+    fut = db.writer(DB_NAME).submit(_save_lot_value, lot_id, avg_price, img_url, best_link)
+    fut.add_done_callback(
+        lambda f: f.exception() and logging.error(f"   ❌ DB write failed for {lot_id}: {f.exception()}")
+    )
 
 
 # ============================================================
@@ -90,37 +112,19 @@ def update_lot_value(lot_id, avg_price, img_url, best_link):
 # ============================================================
 
 def get_driver():
-    options = Options()
-    options.binary_location = CHROMIUM_PATH
-
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-
-    service = Service(CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(service=service, options=options)
-    driver.set_page_load_timeout(30)
-
-    return driver
+    # Warm browser from browser_pool.py if it's running, else a fresh lean one.
+    # Either way the image URL is read from the src attribute, never downloaded
+    return browser_pool.acquire("validator_v6")
 
 
 # ============================================================
 # ====================== SEARCH CLEANER ======================
 # ============================================================
 
-def build_search_query(title):
-    clean = re.sub(r'Lot\s+#?\d+', '', title, flags=re.IGNORECASE)
-    clean = re.sub(r'[^\w\s]', '', clean)
-    words = clean.split()
-
-    # Remove quantity numbers at start
-    if words and words[0].isdigit():
-        words = words[1:]
-
-    return " ".join(words[:4])
+def build_search_query(title, canonical_query=None):
+    # Same key comps, caches and dedup use (title_normalizer.py); the stored
+    # column when title_normalizer.py has filled it
+    return canonical_query or title_normalizer.canonical_query(title)
 
 
 # ============================================================
@@ -129,17 +133,20 @@ def build_search_query(title):
 
 def fetch_ebay_results(driver, search_query):
     url = (
-        "https://www.ebay.com/sch/i.html?"
+        f"{EBAY_SEARCH_URL}?"
         f"_nkw={search_query.replace(' ', '+')}"
         "&LH_Sold=1&LH_Complete=1"
     )
 
-    driver.get(url)
-    time.sleep(random.uniform(2.5, 4.5))
+    with metrics.timer("ebay_page_load"):
+        driver.get(url)
+    with metrics.timer("browser_wait"):
+        time.sleep(random.uniform(2.5, 4.5))
 
     if DEBUG_MODE:
         logging.info(f"   Page title: {driver.title}")
         logging.info(f"   URL: {driver.current_url}")
+        logging.info(f"   Load: {browser_profile.format_stats(browser_profile.page_stats(driver))}")
 
     if DEBUG_MODE:
         with open("debug_page.html", "w", encoding="utf-8") as f:
@@ -147,14 +154,16 @@ def fetch_ebay_results(driver, search_query):
         logging.info("   🔍 Saved debug_page.html")
 
 
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
+    with metrics.timer("browser_wait"):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(1)
 
 
-    items = driver.find_elements(
-        By.XPATH,
-        "//*[contains(@class,'s-item')]"
-    )
+    with metrics.timer("dom_find_items"):
+        items = driver.find_elements(
+            By.XPATH,
+            "//*[contains(@class,'s-item')]"
+        )
 
 
 
@@ -164,7 +173,8 @@ def fetch_ebay_results(driver, search_query):
     return items
 
 
-def extract_prices_from_items(items):
+@metrics.timed("dom_read_prices")
+def extract_prices_from_items(items, errors=None):
     found_data = []
 
     for item in items[:MAX_EBAY_RESULTS]:
@@ -181,12 +191,13 @@ def extract_prices_from_items(items):
                 try:
                     link_el = item.find_element(By.TAG_NAME, "a")
                     link = link_el.get_attribute("href")
-                except:
+                except NoSuchElementException:
                     link = ""
 
                 found_data.append((price, link))
 
-        except:
+        except (WebDriverException, ValueError) as e:
+            if errors: errors.count("extract_price", e)
             continue
 
     return found_data
@@ -205,15 +216,16 @@ def compute_average_price(found_data):
     return sum(prices) / len(prices)
 
 
-def extract_reference_image(driver):
+@metrics.timed("dom_read_image")
+def extract_reference_image(driver, errors=None):
     try:
         imgs = driver.find_elements(By.CSS_SELECTOR, ".s-item__image-img")
         for img in imgs:
             src = img.get_attribute("src")
             if src and "ebayimg" in src:
                 return src
-    except:
-        pass
+    except WebDriverException as e:
+        if errors: errors.count("reference_image", e)
 
     return ""
 
@@ -224,43 +236,81 @@ def extract_reference_image(driver):
 
 def run_validator():
     logging.info("=== VALIDATOR STARTED (CLOUD MODE) ===")
+    metrics.stage("validator_v6")
 
     setup_db()
-    driver = get_driver()
 
-    rows = get_pending_lots(MAX_ITEMS_PER_RUN)
+    # An interrupted run resumes: lots it already looked up aren't fetched from eBay again
+    job = checkpoints.Job("validator_v6")
+    done = sum(1 for v in job.state.values() if v == checkpoints.DONE)
+    rows = [r for r in get_pending_lots(MAX_ITEMS_PER_RUN + done) if not job.done(r[0])][:MAX_ITEMS_PER_RUN]
     logging.info(f"Found {len(rows)} items to validate")
 
-    for i, (lot_id, title) in enumerate(rows, start=1):
+    conn = db.connect(DB_NAME, readonly=True)
+    table = archive_history.all_lots(conn)
+    conn.close()
+
+    # canonical_query -> (value, image, link), or None for "eBay had no comps", this run
+    looked_up = {}
+
+    with metrics.timer("browser_start"):
+        driver = get_driver()
 
-        search_query = build_search_query(title)
+    for i, (lot_id, title, canonical_query) in enumerate(rows, start=1):
+
+        search_query = build_search_query(title, canonical_query)
         logging.info(f"[{i}/{len(rows)}] Checking: {search_query}")
 
+        if search_query not in looked_up:
+            cached = cached_value(table, search_query)
+            if cached:
+                looked_up[search_query] = cached
+        if search_query in looked_up:
+            # Same product as a lot already valued: no eBay fetch
+            if looked_up[search_query]:
+                update_lot_value(lot_id, *looked_up[search_query])
+                metrics.count("lots_valued_from_cache")
+                logging.info(f"   ♻️ Cached: ${looked_up[search_query][0]:.2f}")
+            job.mark_done(lot_id)
+            continue
+
         try:
-            items = fetch_ebay_results(driver, search_query)
-            found_data = extract_prices_from_items(items)
+            with metrics.timer("ebay_fetch"):
+                items = fetch_ebay_results(driver, search_query)
+            found_data = extract_prices_from_items(items, job.errors)
 
             if not found_data:
                 logging.info("   ⚠️ No comps found")
+                metrics.count("lots_no_comps")
 
                 if DEBUG_MODE:
                     driver.save_screenshot(f"debug_{lot_id}.png")
 
+                looked_up[search_query] = None
+                job.mark_done(lot_id)
                 continue
 
             avg_price = compute_average_price(found_data)
             best_link = min(found_data, key=lambda x: abs(x[0] - avg_price))[1]
-            img_url = extract_reference_image(driver)
+            img_url = extract_reference_image(driver, job.errors)
 
+            # Same writer queue, so the value commits no later than the checkpoint
             update_lot_value(lot_id, avg_price, img_url, best_link)
+            looked_up[search_query] = (avg_price, img_url, best_link)
+            with metrics.timer("checkpoint_write"):
+                job.mark_done(lot_id)
+            metrics.count("lots_valued")
 
             logging.info(f"   ✅ Avg: ${avg_price:.2f}")
 
         except Exception as e:
-            logging.error(f"   ❌ Error: {e}")
+            kind = job.error("lookup", e, key=lot_id)
+            metrics.count("lookup_errors")
+            logging.error(f"   ❌ Error ({kind}): {e}")
             continue
 
-    driver.quit()
+    browser_pool.release(driver)
+    job.finish()
     logging.info("=== VALIDATOR FINISHED ===")
 
 